@@ -0,0 +1,185 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+from .database import DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+# Yoklama isteği kabul kontrolü. Kova: saniyede RATE jeton, en fazla BURST (0 = kapalı).
+CHECKIN_DEVICE_RATE = float(os.getenv("CHECKIN_DEVICE_RATE", "0.5"))
+CHECKIN_DEVICE_BURST = int(os.getenv("CHECKIN_DEVICE_BURST", "5"))
+CHECKIN_STUDENT_RATE = float(os.getenv("CHECKIN_STUDENT_RATE", "0.5"))
+CHECKIN_STUDENT_BURST = int(os.getenv("CHECKIN_STUDENT_BURST", "5"))
+
+# Aynı anda en fazla CHECKIN_CONCURRENCY yoklama işlenir (varsayılan: DB havuzu kadar); fazlası
+# sırada en fazla CHECKIN_WAIT_SECONDS bekler. Sıra CHECKIN_WAIT_QUEUE_MAX'ta doluysa hemen 429.
+CHECKIN_CONCURRENCY = int(os.getenv("CHECKIN_CONCURRENCY", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+CHECKIN_WAIT_QUEUE_MAX = int(os.getenv("CHECKIN_WAIT_QUEUE_MAX", "500"))
+CHECKIN_WAIT_SECONDS = float(os.getenv("CHECKIN_WAIT_SECONDS", "5"))
+CHECKIN_RETRY_AFTER_SECONDS = int(os.getenv("CHECKIN_RETRY_AFTER_SECONDS", "2"))
+
+# Kova sözlüklerinin sınırı ve boşta kalan (yeniden dolmuş) kovaların temizlenme aralığı
+ADMISSION_MAX_KEYS = int(os.getenv("ADMISSION_MAX_KEYS", "100000"))
+ADMISSION_EVICT_SECONDS = int(os.getenv("ADMISSION_EVICT_SECONDS", "30"))
+
+
+class TokenBuckets:
+    """
+    key -> [jeton, son güncelleme]. Yalnız event loop'tan kullanılır, kilit yok.
+    BURST/RATE saniye boşta kalan kova zaten dolmuştur; silinmesi davranışı değiştirmez, evict() bunları atar.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = ADMISSION_MAX_KEYS):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self.items = {}
+
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def wait(self, key, now: float) -> float:
+        """
+        Jeton almadan: varsa 0, yoksa bir sonraki jetona kalan saniye.
+        """
+        b = self.items.get(key)
+        if b is None:
+            return 0.0
+        tokens = min(self.burst, b[0] + (now - b[1]) * self.rate)
+        return 0.0 if tokens >= 1.0 else (1.0 - tokens) / self.rate
+
+    def take(self, key, now: float) -> float:
+        """
+        Jeton varsa alır ve 0 döner; yoksa bir sonraki jetona kalan saniyeyi.
+        """
+        b = self.items.get(key)
+        if b is None:
+            if len(self.items) >= self.max_keys:
+                # sınır: en eski kova (dict ekleme sırası) yer açar
+                del self.items[next(iter(self.items))]
+            self.items[key] = [self.burst - 1.0, now]
+            return 0.0
+
+        tokens = min(self.burst, b[0] + (now - b[1]) * self.rate)
+        b[1] = now
+        if tokens >= 1.0:
+            b[0] = tokens - 1.0
+            return 0.0
+        b[0] = tokens
+        self.limited += 1
+        return (1.0 - tokens) / self.rate
+
+    def evict(self, now: float):
+        idle = self.burst / self.rate
+        for key in [k for k, b in self.items.items() if now - b[1] >= idle]:
+            del self.items[key]
+
+
+class ConcurrencyLimit:
+    """
+    Eşzamanlılık sınırı + sınırlı bekleme sırası (FIFO). Slot, release()'te sıradakine devredilir.
+    """
+
+    def __init__(self, limit: int, queue_max: int, wait_seconds: float):
+        self.limit = max(1, limit)
+        self.queue_max = queue_max
+        self.wait_seconds = wait_seconds
+        self.active = 0
+        self.waiters = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self.waiters) >= self.queue_max:
+            self.rejected += 1
+            return False
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(fut, self.wait_seconds)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return False
+        except asyncio.CancelledError:
+            # istemci koptu; slot bize devredilmişse sıradakine geçsin
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self.waiters.remove(fut)
+            except ValueError:
+                pass
+        self.admitted += 1
+        return True
+
+    def release(self):
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+
+class CheckinAdmission:
+    """
+    Yoklama isteği DB'ye gitmeden önce: cihaz (device_id cookie) ve öğrenci (sub) başına jeton kovası,
+    ardından global eşzamanlılık sınırı. Reddedilen istek hemen 429 + Retry-After alır.
+    Bellek içi, worker başına.
+    """
+
+    def __init__(self):
+        self.devices = TokenBuckets(CHECKIN_DEVICE_RATE, CHECKIN_DEVICE_BURST)
+        self.students = TokenBuckets(CHECKIN_STUDENT_RATE, CHECKIN_STUDENT_BURST)
+        self.slots = ConcurrencyLimit(CHECKIN_CONCURRENCY, CHECKIN_WAIT_QUEUE_MAX, CHECKIN_WAIT_SECONDS)
+        self.next_evict = time.monotonic() + ADMISSION_EVICT_SECONDS
+
+    def rate_limit(self, device_id: str | None, student_id: int) -> int | None:
+        """
+        Kova doluysa Retry-After saniyesi, değilse None.
+        """
+        now = time.monotonic()
+        if now >= self.next_evict:
+            self.devices.evict(now)
+            self.students.evict(now)
+            self.next_evict = now + ADMISSION_EVICT_SECONDS
+
+        # önce iki kova da bakılır, jeton yalnız ikisi de geçerse alınır: cihazı sınırda olan
+        # öğrencinin kovası boşuna azalmasın
+        buckets = [(self.students, student_id)] if self.students.enabled else []
+        if device_id and self.devices.enabled:
+            buckets.append((self.devices, device_id))
+        waits = [(bucket, bucket.wait(key, now)) for bucket, key in buckets]
+        if any(wait for _, wait in waits):
+            for bucket, wait in waits:
+                if wait:
+                    bucket.limited += 1
+            return math.ceil(max(wait for _, wait in waits))
+        for bucket, key in buckets:
+            bucket.take(key, now)
+        return None
+
+    async def run(self, produce):
+        """
+        produce() slot alınabilirse çalışır; alınamazsa None (çağıran 429 döner).
+        """
+        if not await self.slots.acquire():
+            return None
+        try:
+            return await produce()
+        finally:
+            self.slots.release()
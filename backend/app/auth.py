@@ -1,15 +1,41 @@
 import os
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from fastapi import Request
+from starlette.requests import HTTPConnection
+
+from .metrics import operation_seconds
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
 ALGORITHM = "HS256"
 COOKIE_NAME = "access_token"
 
+# Doğrulanmış token'ların LRU'su (0 = kapalı). Panel yoklaması ve QR okutmaları HMAC'i atlar.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+
+# Argon2 maliyetleri (passlib varsayılanları). Değişince eski hash'ler login'de yeniden üretilir.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# Aynı anda en fazla PASSWORD_WORKERS hash/verify (bellek ~ PASSWORD_WORKERS * ARGON2_MEMORY_COST),
+# sırada en fazla PASSWORD_QUEUE_MAX istek; fazlası PasswordPoolBusy alır.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "64"))
+
 # Argon2: bcrypt 72 byte derdi yok, Windows'ta daha stabil
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -17,18 +43,126 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordPool:
+    """
+    Argon2 işleri için ayrı, boyutu sınırlı thread havuzu (argon2-cffi GIL'i bırakır).
+    depth = çalışan + sırada bekleyen iş sayısı.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_max: int = PASSWORD_QUEUE_MAX):
+        self.workers = workers
+        self.queue_max = queue_max
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self.depth = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        if self.depth >= self.workers + self.queue_max:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+        self.depth += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._timed, fn, *args)
+        finally:
+            self.depth -= 1
+
+    @staticmethod
+    def _timed(fn, *args):
+        # yalnız hash/verify süresi; havuzda bekleme hariç
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            operation_seconds.observe(("argon2_" + fn.__name__,), time.perf_counter() - t0)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        """
+        (doğru mu, yeni hash). Maliyet parametreleri değiştiyse yeni hash döner, DB'ye yazılmalı.
+        """
+        return await self._run(pwd_context.verify_and_update, password, password_hash)
+
+
+password_pool = PasswordPool()
+
 def create_access_token(data: dict, expires_minutes: int = 60 * 24 * 7) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_user_from_cookie(request: Request):
-    token = request.cookies.get(COOKIE_NAME)
-    if not token:
-        return None
+class TokenCache:
+    """
+    token -> (exp, payload). LRU; süresi dolan kayıt okunurken düşer (jose'nin exp kontrolüyle aynı).
+    Sync route'lar threadpool'dan çağırır, erişim kilitli. Geçersiz token saklanmaz.
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> dict | None:
+        with self.lock:
+            item = self.items.get(token)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= time.time():
+                del self.items[token]
+                self.misses += 1
+                return None
+            self.items.move_to_end(token)
+            self.hits += 1
+            return item[1]
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if self.maxsize <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self.lock:
+            self.items[token] = (exp, payload)
+            self.items.move_to_end(token)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token: str) -> dict | None:
+    """
+    İmzayı ve exp'i doğrular; geçersizse None. Dönen payload önbellekle paylaşılır, değiştirilmemeli.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    token_cache.put(token, payload)
+    return payload
+
+
+def get_user_from_cookie(request: HTTPConnection):
+    """
+    Cookie'deki kullanıcı (ya da None). İstek başına bir kez çözülür, request.state.user'da tutulur;
+    require_login / require_teacher / require_student aynı istekte tekrar çağırsa da decode yok.
+    WebSocket için de kullanılır.
+    """
+    if hasattr(request.state, "user"):
+        return request.state.user
+    token = request.cookies.get(COOKIE_NAME)
+    request.state.user = decode_token(token) if token else None
+    return request.state.user
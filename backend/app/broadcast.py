@@ -0,0 +1,653 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from collections import OrderedDict, deque
+
+from .metrics import operation_seconds
+
+# memory: tek süreç | unix: aynı makinedeki worker'lar arası | postgres: LISTEN/NOTIFY
+WS_BROADCAST_BACKEND = os.getenv("WS_BROADCAST_BACKEND", "memory")
+# Boşsa DB adresinden türetilir: aynı makinedeki ayrı kurulumlar birbirinin olayını almaz
+WS_HUB_DIR = os.getenv("WS_HUB_DIR", "")
+# unix: diğer worker'ların soket listesi bu aralıkla dizinden yenilenir (yeni worker açılışta kendini duyurur)
+WS_HUB_REFRESH_SECONDS = float(os.getenv("WS_HUB_REFRESH_SECONDS", "5"))
+# unix: alıcı worker'ın kuyruğu doluyken ona gidecek olaylar bu sınıra kadar bekletilir, fazlası düşer
+WS_HUB_SEND_QUEUE_MAX = int(os.getenv("WS_HUB_SEND_QUEUE_MAX", "10000"))
+WS_PG_CHANNEL = os.getenv("WS_PG_CHANNEL", "yoklama_ws")
+# postgres: yayınlar bu sıraya konur, arka plandaki yayıncı kendi bağlantısıyla en fazla
+# WS_PG_PUBLISH_BATCH'lik gruplar halinde pg_notify eder. Sıra doluysa olay düşer.
+WS_PG_PUBLISH_QUEUE_MAX = int(os.getenv("WS_PG_PUBLISH_QUEUE_MAX", "10000"))
+WS_PG_PUBLISH_BATCH = 100
+# postgres: LISTEN bağlantısı koparsa artan beklemeyle (en fazla bu kadar saniye) yeniden bağlanılır
+WS_PG_RECONNECT_MAX_SECONDS = float(os.getenv("WS_PG_RECONNECT_MAX_SECONDS", "30"))
+WS_PG_RECONNECT_MIN_SECONDS = 0.5
+
+# Soket başına giden kuyruk (frame) sınırı; dolarsa alıcı yavaş sayılır ve düşürülür
+WS_SEND_QUEUE_MAX = int(os.getenv("WS_SEND_QUEUE_MAX", "32"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+# Patlamaları tek frame'de birleştir: en fazla WS_COALESCE_MAX olay / WS_COALESCE_MS
+WS_COALESCE_MS = int(os.getenv("WS_COALESCE_MS", "100"))
+WS_COALESCE_MAX = int(os.getenv("WS_COALESCE_MAX", "50"))
+
+# Yavaş alıcı kapatılırken kullanılan kod (istemci yeniden bağlanabilir)
+WS_CLOSE_SLOW_CONSUMER = 4408
+
+# Yeniden bağlanan istemciye kaçırdıkları buradan gönderilir: oturum başına son WS_RESUME_BUFFER olay,
+# en fazla WS_RESUME_SESSIONS oturum (LRU). Tekrar oynatma WS_REPLAY_FRAME_MAX olayluk frame'lerle.
+WS_RESUME_BUFFER = int(os.getenv("WS_RESUME_BUFFER", "512"))
+WS_RESUME_SESSIONS = int(os.getenv("WS_RESUME_SESSIONS", "1000"))
+WS_REPLAY_FRAME_MAX = int(os.getenv("WS_REPLAY_FRAME_MAX", "200"))
+
+# Soketlere gitmeyen, worker'lar arası kontrol mesajları (önbellek geçersizleme) bu "oturum"dan
+# yayınlanır; oturum id'leri 1'den başlar
+CONTROL_SESSION_ID = 0
+
+logger = logging.getLogger(__name__)
+
+
+class WSClient:
+    """
+    Tek bir sokete yazan task + sınırlı kuyruk. Yayın yapan taraf hiç beklemez;
+    offer() kuyruk doluysa False döner.
+    """
+
+    def __init__(self, ws, on_dead, maxsize: int = WS_SEND_QUEUE_MAX):
+        self.ws = ws
+        self.on_dead = on_dead
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.task = asyncio.create_task(self._writer())
+
+    def offer(self, text: str) -> bool:
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _writer(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(self.ws.send_text(text), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.on_dead(self)
+
+    async def close(self, code: int):
+        self.task.cancel()
+        try:
+            await asyncio.wait_for(self.ws.close(code=code), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+
+class WSManager:
+    """
+    Yerel soketleri tutar; yayın backend üzerinden gider (memory / unix / postgres),
+    böylece --workers N ile başka worker'daki hoca soketine de ulaşır.
+
+    Yerel teslimde sakin dönemdeki ilk olay hemen gider; WS_COALESCE_MS penceresi
+    içinde gelenler oturum bazında biriktirilir, JSON bir kez üretilir ve her soketin kendi kuyruğuna konur (frame = olay listesi).
+
+    "cursor" alanı olan olaylar (yerel soket olmasa da) oturumun halka tamponuna yazılır; yeniden
+    bağlanan istemci son gördüğü cursor'ı verir, yalnız ondan sonra gelenler tekrar gönderilir.
+
+    control() ile yayınlanan mesajlar soketlere gitmez; her worker'da (yayınlayan dahil)
+    on_control dinleyicilerine verilir.
+    """
+
+    def __init__(self, backend, resume_size: int = WS_RESUME_BUFFER, resume_sessions: int = WS_RESUME_SESSIONS):
+        self.active = {}  # session_id -> {ws: WSClient}
+        self.backend = backend
+        self.pending = {}  # session_id -> [message, ...]
+        self.timers = {}  # session_id -> TimerHandle
+        self.tasks = set()
+        self.resume_size = resume_size
+        self.resume_sessions = resume_sessions
+        self.history = OrderedDict()  # session_id -> deque[(cursor, message)]
+        self.control_listeners = []  # fn(message) — kontrol mesajı gelince
+
+        self.frames_sent = 0
+        self.dropped_slow = 0
+        self.replayed = 0
+        self.controls_received = 0
+
+    async def start(self):
+        await self.backend.start(self.send_local)
+
+    async def stop(self):
+        for handle in self.timers.values():
+            handle.cancel()
+        self.timers.clear()
+        for clients in list(self.active.values()):
+            for client in list(clients.values()):
+                client.task.cancel()
+        await self.backend.stop()
+
+    async def connect(self, session_id: int, ws):
+        await ws.accept()
+        client = WSClient(ws, lambda c: self.disconnect(session_id, c.ws))
+        self.active.setdefault(session_id, {})[ws] = client
+
+    def disconnect(self, session_id: int, ws):
+        clients = self.active.get(session_id)
+        if clients is None:
+            return
+        client = clients.pop(ws, None)
+        if client is not None:
+            client.task.cancel()
+        if not clients:
+            self.active.pop(session_id, None)
+
+    def forget(self, session_id: int):
+        """
+        Oturum kapanınca halka tamponunu bırakır.
+        """
+        self.history.pop(session_id, None)
+
+    def replay(self, session_id: int, after: str) -> list[dict] | None:
+        """
+        after cursor'lı olaydan sonra bu worker'a gelen olaylar (geliş sırasıyla).
+        Tampon bu cursor'ı artık içermiyorsa (taşmış / worker yeni açılmış) None: çağıran DB'ye düşer.
+        """
+        ring = self.history.get(session_id)
+        if not ring:
+            return None
+        missed = []
+        for cursor, message in reversed(ring):
+            if cursor == after:
+                missed.reverse()
+                return missed
+            missed.append(message)
+        return None
+
+    async def send_replay(self, session_id: int, ws, messages: list[dict]):
+        """
+        Kaçırılan olayları soketin kendi kuyruğuna koyar (canlı olaylarla aynı sırada yazılır);
+        kuyruk doluysa WS_SEND_TIMEOUT_SECONDS'a kadar yer açılmasını bekler, açılmazsa yavaş alıcı.
+        """
+        for i in range(0, len(messages), WS_REPLAY_FRAME_MAX):
+            client = self.active.get(session_id, {}).get(ws)
+            if client is None:
+                return
+            text = json.dumps(messages[i:i + WS_REPLAY_FRAME_MAX], ensure_ascii=False)
+            try:
+                await asyncio.wait_for(client.queue.put(text), timeout=WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self._drop_slow(session_id, ws, client)
+                return
+            self.replayed += len(messages[i:i + WS_REPLAY_FRAME_MAX])
+
+    def _remember(self, session_id: int, message: dict):
+        cursor = message.get("cursor")
+        if cursor is None or self.resume_size <= 0:
+            return
+        ring = self.history.get(session_id)
+        if ring is None:
+            ring = self.history[session_id] = deque(maxlen=self.resume_size)
+            while len(self.history) > self.resume_sessions:
+                self.history.popitem(last=False)
+        else:
+            self.history.move_to_end(session_id)
+        ring.append((cursor, message))
+
+    def on_control(self, fn):
+        self.control_listeners.append(fn)
+        return fn
+
+    async def control(self, message: dict):
+        await self.backend.publish(CONTROL_SESSION_ID, message)
+
+    async def broadcast(self, session_id: int, message: dict):
+        await self.backend.publish(session_id, message)
+
+    async def send_local(self, session_id: int, message: dict):
+        if session_id == CONTROL_SESSION_ID:
+            self.controls_received += 1
+            for fn in self.control_listeners:
+                try:
+                    fn(message)
+                except Exception:
+                    logger.exception("kontrol mesajı işlenemedi: %s", message)
+            return
+        self._remember(session_id, message)
+        if session_id not in self.active:
+            return
+        batch = self.pending.setdefault(session_id, [])
+        batch.append(message)
+        if session_id not in self.timers:
+            # sakin dönemde ilk olay beklemeden gider, ardından gelenler pencere sonunda
+            self._flush(session_id)
+            self._arm(session_id)
+        elif len(batch) >= WS_COALESCE_MAX:
+            self._flush(session_id)
+
+    def _arm(self, session_id: int):
+        loop = asyncio.get_running_loop()
+        self.timers[session_id] = loop.call_later(WS_COALESCE_MS / 1000.0, self._tick, session_id)
+
+    def _tick(self, session_id: int):
+        self.timers.pop(session_id, None)
+        if self.pending.get(session_id):
+            self._flush(session_id)
+            self._arm(session_id)
+
+    def _flush(self, session_id: int):
+        batch = self.pending.pop(session_id, None)
+        clients = self.active.get(session_id)
+        if not batch or not clients:
+            return
+
+        t0 = time.perf_counter()
+        text = json.dumps(batch, ensure_ascii=False)
+        self.frames_sent += 1
+        for ws, client in list(clients.items()):
+            if not client.offer(text):
+                self._drop_slow(session_id, ws, client)
+        operation_seconds.observe(("ws_fanout",), time.perf_counter() - t0)
+
+    def _drop_slow(self, session_id: int, ws, client: WSClient):
+        self.dropped_slow += 1
+        self.disconnect(session_id, ws)
+        task = asyncio.create_task(client.close(WS_CLOSE_SLOW_CONSUMER))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+class MemoryBackend:
+    """
+    Süreç içi yayın: publish doğrudan yerel soketlere teslim eder.
+    """
+
+    def __init__(self):
+        self.deliver = None
+
+    async def start(self, deliver):
+        self.deliver = deliver
+
+    async def stop(self):
+        self.deliver = None
+
+    async def publish(self, session_id: int, message: dict):
+        if self.deliver is not None:
+            await self.deliver(session_id, message)
+
+
+def default_hub_dir(engine=None) -> str:
+    """
+    tmp/yoklama-ws-hub-<DB adresinin özeti>: aynı DB'yi kullanan worker'lar aynı dizinde buluşur.
+    """
+    if engine is None:
+        return os.path.join(tempfile.gettempdir(), "yoklama-ws-hub")
+    url = engine.url
+    if url.get_backend_name() == "sqlite" and url.database:
+        url = url.set(database=os.path.abspath(url.database))
+    key = hashlib.sha1(url.render_as_string(hide_password=True).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"yoklama-ws-hub-{key}")
+
+
+class HubPeer:
+    """
+    Başka bir worker'ın soketine bağlı (connect edilmiş) datagram soketi + gönderilemeyenlerin sırası.
+    Bağlı sokette yazılabilirlik alıcının kuyruğunu izler: alıcı doluysa (EAGAIN) mesaj sıraya
+    girer, soket yazılabilir olunca (loop.add_writer) sırayla gönderilir.
+    """
+
+    __slots__ = ("path", "sock", "queue", "waiting")
+
+    def __init__(self, path: str, sock: socket.socket):
+        self.path = path
+        self.sock = sock
+        self.queue = deque()
+        self.waiting = False
+
+
+class UnixSocketBackend:
+    """
+    Her worker hub dizininde kendi datagram soketini açar; publish olayı kendi soketlerine süreç
+    içinde teslim eder, diğer worker'lara birer bağlı soketten gönderir. Merkezi bir hub süreci gerekmez.
+    Soket listesi bellekte tutulur, WS_HUB_REFRESH_SECONDS'ta bir dizinden yenilenir; açılan worker
+    diğerlerine "hello" gönderir, böylece yenilemeyi beklemeden listeye girer.
+
+    Alıcının kuyruğu doluysa (net.unix.max_dgram_qlen küçüktür) mesaj düşmez, o worker'ın sırasında
+    bekler; sıra WS_HUB_SEND_QUEUE_MAX'ı aşarsa düşer ve dropped sayılır (/metrics).
+    Ölü worker'ların soket dosyaları ilk gönderim hatasında silinir.
+    """
+
+    def __init__(self, hub_dir: str, refresh_seconds: float = WS_HUB_REFRESH_SECONDS,
+                 queue_max: int = WS_HUB_SEND_QUEUE_MAX):
+        self.hub_dir = hub_dir
+        self.refresh_seconds = refresh_seconds
+        self.queue_max = queue_max
+        self.path = None
+        self.sock = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.deliver = None
+        self.tasks = set()
+        self.peers = {}  # path -> HubPeer
+        self.peers_at = 0.0
+
+        self.dropped = 0
+
+    async def start(self, deliver):
+        self.deliver = deliver
+        self.loop = asyncio.get_running_loop()
+        os.makedirs(self.hub_dir, exist_ok=True)
+        self.path = os.path.join(self.hub_dir, f"worker-{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        self.loop.add_reader(self.sock.fileno(), self._on_readable)
+
+        self._refresh_peers()
+        hello = json.dumps({"hello": self.path}).encode()
+        for peer in list(self.peers.values()):
+            self._send(peer, hello)
+
+    async def stop(self):
+        for peer in list(self.peers.values()):
+            self._close_peer(peer)
+        if self.sock is not None:
+            self.loop.remove_reader(self.sock.fileno())
+            self.sock.close()
+            self.sock = None
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            env = json.loads(data)
+            if "hello" in env:
+                self._add_peer(env["hello"])
+                continue
+            self._deliver(env["session_id"], env["message"])
+
+    def _deliver(self, session_id: int, message: dict):
+        task = asyncio.create_task(self.deliver(session_id, message))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _add_peer(self, path: str):
+        if path == self.path or path in self.peers:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            sock.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # worker kapanmış; dosyası kalmış
+            sock.close()
+            self._unlink(path)
+            return
+        self.peers[path] = HubPeer(path, sock)
+
+    def _close_peer(self, peer: HubPeer, dead: bool = False):
+        if self.peers.get(peer.path) is peer:
+            del self.peers[peer.path]
+        if peer.waiting:
+            self.loop.remove_writer(peer.sock.fileno())
+            peer.waiting = False
+        peer.sock.close()
+        if dead:
+            self.dropped += len(peer.queue)
+            self._unlink(peer.path)
+        peer.queue.clear()
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def _refresh_peers(self):
+        paths = {os.path.join(self.hub_dir, name) for name in os.listdir(self.hub_dir) if name.endswith(".sock")}
+        for path, peer in list(self.peers.items()):
+            if path not in paths:
+                self._close_peer(peer)
+        for path in paths:
+            self._add_peer(path)
+        self.peers_at = time.monotonic() + self.refresh_seconds
+
+    def _try_send(self, peer: HubPeer, data: bytes) -> bool:
+        """
+        Gönderildiyse (ya da geri dönüşsüz düştüyse) True; alıcı doluysa False.
+        """
+        try:
+            peer.sock.send(data)
+        except (BlockingIOError, InterruptedError):
+            return False
+        except (ConnectionRefusedError, FileNotFoundError):
+            # worker kapanmış; sırası da düşer
+            self._close_peer(peer, dead=True)
+        except OSError:
+            self._drop(peer, "gönderilemedi")
+        return True
+
+    def _drop(self, peer: HubPeer, reason: str):
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning("WS hub: %s için olay düştü (%s), toplam %d", peer.path, reason, self.dropped)
+
+    def _send(self, peer: HubPeer, data: bytes):
+        # sırada bekleyen varsa sıra bozulmasın: arkasına eklenir
+        if not peer.queue and self._try_send(peer, data):
+            return
+        if len(peer.queue) >= self.queue_max:
+            self._drop(peer, "sıra dolu")
+            return
+        peer.queue.append(data)
+        if not peer.waiting:
+            peer.waiting = True
+            self.loop.add_writer(peer.sock.fileno(), self._drain, peer)
+
+    def _drain(self, peer: HubPeer):
+        while peer.queue:
+            if not self._try_send(peer, peer.queue[0]):
+                return
+            if peer.sock.fileno() == -1:
+                return  # kapandı, sırası düşüldü
+            peer.queue.popleft()
+        peer.waiting = False
+        self.loop.remove_writer(peer.sock.fileno())
+
+    async def publish(self, session_id: int, message: dict):
+        if time.monotonic() >= self.peers_at:
+            self._refresh_peers()
+        data = json.dumps({"session_id": session_id, "message": message}).encode()
+        for peer in list(self.peers.values()):
+            self._send(peer, data)
+        # bu worker'ın soketleri: datagram'a gerek yok
+        await self.deliver(session_id, message)
+
+
+class PostgresNotifyBackend:
+    """
+    Postgres LISTEN/NOTIFY: her worker kanalı dinler, publish pg_notify ile yayınlar.
+    Yayınlayan worker da dinlediği için mesaj ona da NOTIFY üzerinden gelir.
+
+    publish beklemez: mesaj sıraya konur, yayıncı task'i kendi ayrı bağlantısıyla (uygulamanın DB
+    havuzunu kullanmadan) toplu pg_notify yapar. Yoklama cevabı NOTIFY gidiş-dönüşünü beklemez.
+
+    LISTEN bağlantısı koparsa (DB yeniden başladı, boşta zaman aşımı, failover) okuyucu kaldırılır,
+    artan beklemeyle yeniden bağlanılıp LISTEN tekrar verilir; kopukluk loglanır ve sayılır
+    (listen_lost). Aradaki olaylar bu worker'a gelmez; panel cursor'la yeniden bağlanınca tamamlar.
+    """
+
+    def __init__(self, engine, channel: str = WS_PG_CHANNEL, queue_max: int = WS_PG_PUBLISH_QUEUE_MAX):
+        self.engine = engine
+        self.channel = channel
+        self.queue_max = queue_max
+        self.conn = None
+        self.conn_fd = None
+        self.out_conn = None
+        self.outbox: asyncio.Queue | None = None
+        self.publisher: asyncio.Task | None = None
+        self.relisten: asyncio.Task | None = None
+        self.deliver = None
+        self.tasks = set()
+
+        self.dropped = 0
+        self.listen_lost = 0
+
+    def _connect(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        dsn = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    def _listen(self):
+        conn = self._connect()
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _attach(self, conn):
+        self.conn = conn
+        self.conn_fd = conn.fileno()
+        asyncio.get_running_loop().add_reader(self.conn_fd, self._on_readable)
+
+    def _detach(self):
+        if self.conn_fd is not None:
+            asyncio.get_running_loop().remove_reader(self.conn_fd)
+            self.conn_fd = None
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    async def start(self, deliver):
+        self.deliver = deliver
+        self._attach(await asyncio.to_thread(self._listen))
+
+        self.out_conn = await asyncio.to_thread(self._connect)
+        self.outbox = asyncio.Queue(maxsize=self.queue_max)
+        self.publisher = asyncio.create_task(self._publish_loop())
+
+    async def stop(self):
+        if self.publisher is not None:
+            # sıradakiler gitsin (DB yoksa en fazla WS_SEND_TIMEOUT_SECONDS beklenir)
+            try:
+                await asyncio.wait_for(self.outbox.join(), WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.publisher.cancel()
+            try:
+                await self.publisher
+            except asyncio.CancelledError:
+                pass
+            self.publisher = None
+        if self.relisten is not None:
+            self.relisten.cancel()
+            try:
+                await self.relisten
+            except asyncio.CancelledError:
+                pass
+            self.relisten = None
+        if self.out_conn is not None:
+            self.out_conn.close()
+            self.out_conn = None
+        self._detach()
+
+    def _on_readable(self):
+        import psycopg2
+
+        try:
+            self.conn.poll()
+        except InterruptedError:
+            return
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.listen_lost += 1
+            logger.warning("LISTEN bağlantısı koptu, yeniden bağlanılıyor", exc_info=True)
+            self._detach()
+            self.relisten = asyncio.create_task(self._reconnect())
+            return
+        while self.conn.notifies:
+            n = self.conn.notifies.pop(0)
+            env = json.loads(n.payload)
+            task = asyncio.create_task(self.deliver(env["session_id"], env["message"]))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _reconnect(self):
+        delay = WS_PG_RECONNECT_MIN_SECONDS
+        attempt = 0
+        while True:
+            await asyncio.sleep(delay)
+            attempt += 1
+            try:
+                conn = await asyncio.to_thread(self._listen)
+            except Exception:
+                delay = min(delay * 2, WS_PG_RECONNECT_MAX_SECONDS)
+                logger.warning("LISTEN yeniden bağlanamadı (deneme %d), %.1f sn sonra tekrar", attempt, delay,
+                               exc_info=True)
+                continue
+            self._attach(conn)
+            self.relisten = None
+            logger.warning("LISTEN yeniden bağlandı (%d deneme)", attempt)
+            return
+
+    def _notify(self, payloads: list[str]):
+        """
+        Yayıncı thread'inde: tek gidiş-dönüşte sırayla pg_notify; bağlantı koptuysa yeniden açılır.
+        """
+        if self.out_conn is None or self.out_conn.closed:
+            self.out_conn = self._connect()
+        params = []
+        for payload in payloads:
+            params += [self.channel, payload]
+        with self.out_conn.cursor() as cur:
+            cur.execute("SELECT " + ", ".join(["pg_notify(%s, %s)"] * len(payloads)), params)
+
+    async def _publish_loop(self):
+        while True:
+            payloads = [await self.outbox.get()]
+            while len(payloads) < WS_PG_PUBLISH_BATCH and not self.outbox.empty():
+                payloads.append(self.outbox.get_nowait())
+            try:
+                await asyncio.to_thread(self._notify, payloads)
+            except Exception:
+                self.dropped += len(payloads)
+                logger.warning("pg_notify gönderilemedi, %d WS olayı düştü", len(payloads), exc_info=True)
+                if self.out_conn is not None:
+                    self.out_conn.close()
+            finally:
+                for _ in payloads:
+                    self.outbox.task_done()
+
+    async def publish(self, session_id: int, message: dict):
+        payload = json.dumps({"session_id": session_id, "message": message})
+        try:
+            self.outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+def make_backend(name: str = WS_BROADCAST_BACKEND, engine=None):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "unix":
+        return UnixSocketBackend(WS_HUB_DIR or default_hub_dir(engine))
+    if name == "postgres":
+        if engine is None or engine.dialect.name != "postgresql":
+            raise RuntimeError("WS_BROADCAST_BACKEND=postgres için DATABASE_URL Postgres olmalı.")
+        return PostgresNotifyBackend(engine)
+    raise ValueError(f"Bilinmeyen WS_BROADCAST_BACKEND: {name}")
@@ -0,0 +1,346 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from .database import dialect_insert, run_db
+from .models import User, Attendance, DeviceCheckin
+from .metrics import operation_seconds
+
+# Write-behind modu: yoklama isteği kuyruğa atılır, toplu INSERT arka planda yapılır.
+CHECKIN_WRITE_BEHIND = os.getenv("CHECKIN_WRITE_BEHIND", "0") == "1"
+CHECKIN_BATCH_SIZE = int(os.getenv("CHECKIN_BATCH_SIZE", "200"))
+CHECKIN_BATCH_MS = int(os.getenv("CHECKIN_BATCH_MS", "50"))
+CHECKIN_QUEUE_MAX = int(os.getenv("CHECKIN_QUEUE_MAX", "10000"))
+# Yazılamayan batch bu kadar kez tekrar denenir (bekleme CHECKIN_RETRY_BACKOFF_MS'ten başlayıp ikiye katlanır)
+CHECKIN_WRITE_RETRIES = int(os.getenv("CHECKIN_WRITE_RETRIES", "5"))
+CHECKIN_RETRY_BACKOFF_MS = int(os.getenv("CHECKIN_RETRY_BACKOFF_MS", "200"))
+CHECKIN_RETRY_BACKOFF_MAX_MS = 5000
+# Öğrenciye cevap yoklama commit edilince verilir; bu süreyi aşarsa "tekrar dene" (yoklama kuyrukta kalır)
+CHECKIN_COMMIT_TIMEOUT_MS = int(os.getenv("CHECKIN_COMMIT_TIMEOUT_MS", "8000"))
+
+logger = logging.getLogger(__name__)
+
+
+def ping(db):
+    db.execute(text("SELECT 1"))
+
+
+class CheckinQueue:
+    """
+    Doğrulanmış yoklamaları bellekte kuyruğa alır; flusher task'i bunları
+    CHECKIN_BATCH_SIZE adet / CHECKIN_BATCH_MS süre dolunca tek transaction'da yazar.
+    Yazılan satırlar on_written(rows) ile (WS yayını için) bildirilir.
+
+    Her yoklamanın future'ı batch commit edilince sonucuyla ("ok" | "duplicate" | "device_used")
+    tamamlanır; çağıran cevabı bunu bekleyip verir, yazılmamış yoklama için "alındı" denmez.
+    Yazım hata verirse batch artan beklemeyle tekrar denenir; bu sürede (ve DB'ye tekrar ulaşılana
+    kadar) failing True'dur ve submit "failing" döner: çağıran senkron yola düşer. Tekrarlar
+    tükenirse future'lar "failed" ile tamamlanır.
+    """
+
+    def __init__(self, on_written, batch_size: int = CHECKIN_BATCH_SIZE,
+                 batch_ms: int = CHECKIN_BATCH_MS, maxsize: int = CHECKIN_QUEUE_MAX,
+                 retries: int = CHECKIN_WRITE_RETRIES, backoff_ms: int = CHECKIN_RETRY_BACKOFF_MS,
+                 commit_timeout_ms: int = CHECKIN_COMMIT_TIMEOUT_MS):
+        self.on_written = on_written
+        self.batch_size = max(1, batch_size)
+        self.batch_ms = max(0, batch_ms)
+        self.retries = max(0, retries)
+        self.backoff_ms = max(1, backoff_ms)
+        self.commit_timeout = max(0, commit_timeout_ms) / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.task: asyncio.Task | None = None
+        self.notify_tasks = set()
+
+        # Tekrar/cihaz kontrolü DB'ye gitmeden yapılsın diye oturum bazlı indeks. Worker başına ve
+        # restart'ta boş: indekste olmayan yoklama batch'e girer, sonucu ON CONFLICT belirler.
+        self.students = {}  # session_id -> set(student_id)
+        self.devices = {}  # session_id -> {device_id: student_id}
+        self.pending = {}  # (session_id, student_id) -> future (commit bekleyen)
+        self.failing = False
+
+        self.written = 0
+        self.batches = 0
+        self.retried = 0
+        self.failed = 0
+        self.lost_lock = 0
+        self.timed_out = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        await self.queue.join()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def forget(self, session_id: int):
+        self.students.pop(session_id, None)
+        self.devices.pop(session_id, None)
+
+    def _known(self, session_id: int, student_id: int, device_id: str) -> str | None:
+        owner = self.devices.get(session_id, {}).get(device_id)
+        if owner is not None and owner != student_id:
+            return "device_used"
+        if student_id in self.students.get(session_id, ()):
+            return "duplicate"
+        return None
+
+    def _index(self, session_id: int, student_id: int, device_id: str):
+        self.students.setdefault(session_id, set()).add(student_id)
+        self.devices.setdefault(session_id, {})[device_id] = student_id
+
+    def _unindex(self, item: dict):
+        self.students.get(item["session_id"], set()).discard(item["student_id"])
+        devices = self.devices.get(item["session_id"], {})
+        if devices.get(item["device_id"]) == item["student_id"]:
+            del devices[item["device_id"]]
+
+    def submit(self, session_id: int, student_id: int, device_id: str,
+               started_at: datetime) -> str | asyncio.Future:
+        """
+        Hemen belli olan sonuç ("duplicate" | "device_used" | "full" | "failing") ya da yoklamanın
+        commit sonucunu verecek future (outcome() ile beklenir). DB'ye gidilmez.
+        """
+        if self.failing:
+            return "failing"
+        pending = self.pending.get((session_id, student_id))
+        if pending is not None:
+            # aynı öğrencinin yazılmayı bekleyen yoklaması var (çift dokunuş / başka worker değil)
+            return self._repeat(pending)
+        known = self._known(session_id, student_id, device_id)
+        if known is not None:
+            return known
+
+        fut = asyncio.get_running_loop().create_future()
+        item = {
+            "session_id": session_id,
+            "student_id": student_id,
+            "device_id": device_id,
+            "timestamp": datetime.utcnow(),
+            "started_at": started_at,
+            "future": fut,
+        }
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            return "full"
+
+        self._index(session_id, student_id, device_id)
+        self.pending[(session_id, student_id)] = fut
+        return fut
+
+    @staticmethod
+    def _repeat(pending: asyncio.Future) -> asyncio.Future:
+        """
+        Bekleyen yoklamanın tekrarı: ilki yazılınca bu "duplicate" alır, diğer sonuçlar aynen geçer.
+        """
+        fut = asyncio.get_running_loop().create_future()
+
+        def done(p: asyncio.Future):
+            if not fut.done():
+                fut.set_result("duplicate" if p.result() == "ok" else p.result())
+
+        pending.add_done_callback(done)
+        return fut
+
+    async def outcome(self, fut: asyncio.Future) -> str:
+        """
+        "ok" | "duplicate" | "device_used" | "failed" | "timeout". Zaman aşımında yoklama kuyrukta
+        kalır; öğrenci tekrar denediğinde aynı yoklamanın sonucunu bekler.
+        """
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), self.commit_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return "timeout"
+
+    def _resolve(self, item: dict, result: str):
+        self.pending.pop((item["session_id"], item["student_id"]), None)
+        if not item["future"].done():
+            item["future"].set_result(result)
+
+    async def _next_batch(self) -> list[dict]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_ms / 1000.0
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write_retrying(self, batch: list[dict]) -> tuple[list[dict], dict]:
+        delay = self.backoff_ms / 1000.0
+        for attempt in range(self.retries + 1):
+            try:
+                return await run_db(self._write, batch)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.failing = True
+                self.retried += 1
+                logger.warning("yoklama batch'i yazılamadı (%d satır), %.1f sn sonra tekrar (%d/%d)",
+                               len(batch), delay, attempt + 1, self.retries, exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, CHECKIN_RETRY_BACKOFF_MAX_MS / 1000.0)
+
+    async def _wait_for_db(self):
+        delay = self.backoff_ms / 1000.0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await run_db(ping)
+                return
+            except Exception:
+                delay = min(delay * 2, CHECKIN_RETRY_BACKOFF_MAX_MS / 1000.0)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            t0 = time.perf_counter()
+            try:
+                rows, results = await self._write_retrying(batch)
+            except Exception:
+                # Tekrarlar tükendi: her yoklama loglanır ve beklenen cevap "failed" olur ("alındı"
+                # denmemişti); indeksten düşer ki öğrenci tekrar okuttuğunda gerçek sonucu alsın
+                self.failed += len(batch)
+                logger.exception("yoklama batch'i %d denemede yazılamadı, %d yoklama kaydedilmedi: %s",
+                                 self.retries + 1, len(batch),
+                                 ", ".join(f"oturum={i['session_id']} öğrenci={i['student_id']}" for i in batch))
+                for item in batch:
+                    self._unindex(item)
+                    self._resolve(item, "failed")
+                rows = None
+            for _ in batch:
+                self.queue.task_done()
+
+            if rows is None:
+                # DB'ye ulaşılana kadar yeni yoklamalar senkron yoldan gider (failing True kalır)
+                await self._wait_for_db()
+                self.failing = False
+                continue
+
+            self.failing = False
+            for item in batch:
+                result = results[(item["session_id"], item["student_id"])]
+                if result == "device_used":
+                    # cihazı başka worker'da / restart öncesi başka öğrenci kilitlemiş
+                    self.lost_lock += 1
+                    self._unindex(item)
+                elif result == "duplicate":
+                    # öğrenci zaten yoklamada (kilidi başka cihazla alınmış olabilir): cihaz ona ait değil
+                    devices = self.devices.get(item["session_id"], {})
+                    if devices.get(item["device_id"]) == item["student_id"]:
+                        del devices[item["device_id"]]
+                self._resolve(item, result)
+            operation_seconds.observe(("checkin_batch_write",), time.perf_counter() - t0)
+            self.written += len(rows)
+            self.batches += 1
+            if rows:
+                # Yavaş bir WS alıcısı flusher'ı bekletmesin
+                task = asyncio.create_task(self.on_written(rows))
+                self.notify_tasks.add(task)
+                task.add_done_callback(self.notify_tasks.discard)
+
+    def _lost_locks(self, db, batch: list[dict], locked: list) -> list[dict]:
+        """
+        Cihaz kilidi alınamayan yoklamalardan öğrencinin kendi kilidi olmayanlar: cihazı başka
+        worker'da / restart öncesi başka öğrenci kilitlemiştir. Kilidi olan öğrenci zaten yoklamadadır.
+        Kaybeden yoksa sorgu yok.
+        """
+        got = {(sid, stid) for sid, stid in locked}
+        lost = [i for i in batch if (i["session_id"], i["student_id"]) not in got]
+        if not lost:
+            return []
+        present = {
+            (r.session_id, r.student_id)
+            for r in db.execute(
+                select(DeviceCheckin.session_id, DeviceCheckin.student_id).where(
+                    DeviceCheckin.session_id.in_({i["session_id"] for i in lost}),
+                    DeviceCheckin.student_id.in_({i["student_id"] for i in lost}),
+                )
+            )
+        }
+        return [i for i in lost if (i["session_id"], i["student_id"]) not in present]
+
+    def _write(self, db, batch: list[dict]) -> tuple[list[dict], dict]:
+        """
+        Çok satırlı INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Önce cihaz kilidi (uq_session_device / uq_session_student_once), kilidi
+        alınabilen öğrenciler için Attendance (uq_session_student).
+        (yazılan satırlar, (session_id, student_id) -> "ok" | "duplicate" | "device_used") döner.
+        """
+        by_key = {(i["session_id"], i["student_id"]): i for i in batch}
+        results = dict.fromkeys(by_key, "duplicate")
+
+        insert = dialect_insert(db.get_bind())
+
+        locked = db.execute(
+            insert(DeviceCheckin)
+            .values([
+                {"session_id": i["session_id"], "device_id": i["device_id"], "student_id": i["student_id"]}
+                for i in batch
+            ])
+            .on_conflict_do_nothing()
+            .returning(DeviceCheckin.session_id, DeviceCheckin.student_id)
+        ).all()
+
+        for i in self._lost_locks(db, batch, locked):
+            results[(i["session_id"], i["student_id"])] = "device_used"
+        if not locked:
+            db.commit()
+            return [], results
+
+        inserted = db.execute(
+            insert(Attendance)
+            .values([
+                {"session_id": sid, "student_id": stid, "timestamp": by_key[(sid, stid)]["timestamp"]}
+                for sid, stid in locked
+            ])
+            .on_conflict_do_nothing()
+            .returning(Attendance.id, Attendance.session_id, Attendance.student_id, Attendance.timestamp)
+        ).all()
+        if not inserted:
+            db.commit()
+            return [], results
+
+        # commit'ten önce: commit sonrası hata olursa tekrar deneme çift yazmasın / yayını kaçırmasın
+        users = {
+            u.id: u
+            for u in db.execute(
+                select(User.id, User.username, User.full_name)
+                .where(User.id.in_({r.student_id for r in inserted}))
+            )
+        }
+        db.commit()
+
+        rows = []
+        for r in inserted:
+            results[(r.session_id, r.student_id)] = "ok"
+            u = users.get(r.student_id)
+            rows.append({
+                "id": r.id,
+                "session_id": r.session_id,
+                "student_id": r.student_id,
+                "timestamp": r.timestamp,
+                "started_at": by_key[(r.session_id, r.student_id)]["started_at"],
+                "username": u.username if u else "",
+                "full_name": u.full_name if u else "",
+            })
+        return rows, results
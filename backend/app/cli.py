@@ -0,0 +1,160 @@
+"""
+Yönetim komutları (uvicorn worker'larından önce bir kez çalıştırılır):
+
+    python -m app.cli init-db     # alembic upgrade head + seed kullanıcılar
+    python -m app.cli enroll --teacher yavuz --course Matematik 2025001 2025002 ...
+    python -m app.cli import-students ogrenciler.xlsx [--teacher yavuz --course Matematik]
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from .database import Base, engine, SessionLocal
+from . import models  # noqa: F401  (tablolar Base.metadata'ya kaydolsun)
+from .models import User
+from .roster import get_or_create_course, enroll
+from .seed import seed_users
+from .student_import import (
+    IMPORT_CHUNK_ROWS, IMPORT_EXTENSIONS, IMPORT_HASH_WORKERS, import_students, read_rows, roster_records,
+)
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None) -> Config:
+    cfg = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def add_missing_columns(conn):
+    """
+    create_all var olan tablolara yeni kolon eklemez; sonradan eklenen nullable kolonları
+    ALTER TABLE ile ekler (ör. class_sessions.course_id).
+    """
+    insp = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing or not col.nullable:
+                continue
+            col_type = col.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+
+
+def adopt_legacy_schema(conn):
+    """
+    Alembic öncesi create_all ile kurulmuş DB'yi baseline'a getirip işaretler;
+    sonraki migration'lar normal şekilde uygulanır.
+    """
+    Base.metadata.create_all(bind=conn)
+    add_missing_columns(conn)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+    command.stamp(alembic_config(conn), BASELINE_REVISION)
+
+
+def migrate():
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        if insp.has_table("users") and not insp.has_table("alembic_version"):
+            adopt_legacy_schema(conn)
+        command.upgrade(alembic_config(conn), "head")
+
+
+def init_db():
+    migrate()
+    db = SessionLocal()
+    try:
+        seed_users(db)
+    finally:
+        db.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("init-db", help="migration'ları uygula ve seed kullanıcıları ekle")
+    p_enroll = sub.add_parser("enroll", help="öğrencileri hocanın dersine kaydet")
+    p_enroll.add_argument("--teacher", required=True, help="hoca kullanıcı adı")
+    p_enroll.add_argument("--course", required=True, help="ders adı (yoksa oluşturulur)")
+    p_enroll.add_argument("students", nargs="+", help="öğrenci numaraları")
+    p_import = sub.add_parser("import-students", help="CSV / XLSX'ten toplu öğrenci ekle (yeniden çalıştırılabilir)")
+    p_import.add_argument("file", help="numara, ad soyad, şifre kolonları (başlıklı ya da bu sırayla)")
+    p_import.add_argument("--teacher", help="hoca kullanıcı adı (--course ile)")
+    p_import.add_argument("--course", help="öğrencileri bu derse de kaydet")
+    p_import.add_argument("--chunk", type=int, default=IMPORT_CHUNK_ROWS, help="parça başına satır")
+    p_import.add_argument("--workers", type=int, default=IMPORT_HASH_WORKERS, help="hash süreç sayısı")
+    args = ap.parse_args()
+
+    if args.command == "init-db":
+        t0 = time.perf_counter()
+        init_db()
+        print(f"init-db: {time.perf_counter() - t0:.2f}s")
+
+    elif args.command == "enroll":
+        with SessionLocal() as db:
+            teacher = db.query(User).filter(User.username == args.teacher, User.role == "teacher").first()
+            if teacher is None:
+                raise SystemExit(f"Hoca bulunamadı: {args.teacher}")
+            found = dict(
+                db.query(User.username, User.id)
+                .filter(User.username.in_(args.students), User.role == "student")
+                .all()
+            )
+            missing = [u for u in args.students if u not in found]
+            course = get_or_create_course(db, teacher.id, args.course.strip())
+            added = enroll(db, course, list(found.values()))
+            course_name = course.name
+            db.commit()
+        print(f"enroll: {course_name} +{added} öğrenci" + (f", bulunamayan: {', '.join(missing)}" if missing else ""))
+
+    elif args.command == "import-students":
+        if not args.file.lower().endswith(IMPORT_EXTENSIONS):
+            raise SystemExit("Desteklenen dosya türleri: .csv, .xlsx")
+        if bool(args.teacher) != bool(args.course):
+            raise SystemExit("--teacher ve --course birlikte verilmeli")
+
+        course_id = None
+        if args.course:
+            with SessionLocal() as db:
+                teacher = db.query(User).filter(User.username == args.teacher, User.role == "teacher").first()
+                if teacher is None:
+                    raise SystemExit(f"Hoca bulunamadı: {args.teacher}")
+                course_id = get_or_create_course(db, teacher.id, args.course.strip()).id
+                db.commit()
+
+        def progress(r):
+            print(f"  {r.rows} satır: +{r.inserted} yeni, {r.existing} mevcut, {r.duplicates} tekrar, "
+                  f"{r.invalid} geçersiz ({r.rate:.1f} satır/s)", flush=True)
+
+        # ✅ Argon2 hash'leri süreç havuzunda; her parça ayrı transaction, tekrar çalıştırınca mevcutlar atlanır
+        workers = max(1, args.workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hash_map = partial(pool.map, chunksize=max(1, args.chunk // (workers * 4)))
+            report = import_students(roster_records(read_rows(args.file)), hash_map, course_id, args.chunk,
+                                     on_chunk=progress)
+
+        print(f"import-students: {report.rows} satır, +{report.inserted} yeni, {report.existing} mevcut, "
+              f"{report.duplicates} tekrar, {report.invalid} geçersiz"
+              + (f", derse +{report.enrolled}" if course_id is not None else "")
+              + f" — {report.elapsed:.1f}s, {report.rate:.1f} satır/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,65 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from starlette.concurrency import run_in_threadpool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
 
+# Havuz ayarları (sync ve async engine için aynı)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Async sürücüler: sqlite+aiosqlite / postgresql+asyncpg
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+SYNC_DRIVERS = {"sqlite": "sqlite", "postgresql": "postgresql+psycopg2"}
+
+
+def _backend(url: str) -> str:
+    return make_url(url).get_backend_name()
+
+
+# DATABASE_URL async sürücü içeriyorsa ya da DB_ASYNC=1 ise hot route'lar AsyncSession kullanır
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1" or make_url(DATABASE_URL).get_driver_name() in ("aiosqlite", "asyncpg")
+
+SYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername=SYNC_DRIVERS.get(_backend(DATABASE_URL), make_url(DATABASE_URL).drivername))
+
 connect_args = {}
 if DATABASE_URL.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, connect_args=connect_args)
+pool_args = {}
+if SYNC_DATABASE_URL.database not in (None, "", ":memory:"):
+    pool_args = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+engine = create_engine(SYNC_DATABASE_URL, pool_pre_ping=True, connect_args=connect_args, **pool_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    async_pool_args = dict(pool_args)
+    if pool_args:
+        # aiosqlite varsayılanı NullPool; havuz ayarları uygulansın diye açıkça kuyruklu havuz
+        async_pool_args["poolclass"] = AsyncAdaptedQueuePool
+
+    async_engine = create_async_engine(
+        SYNC_DATABASE_URL.set(drivername=ASYNC_DRIVERS[_backend(DATABASE_URL)]),
+        pool_pre_ping=True,
+        **async_pool_args,
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
@@ -20,3 +69,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def run_db(fn, *args):
+    """
+    fn(db: Session, *args) çağrısını event loop'u bloklamadan çalıştırır:
+    async engine varsa AsyncSession.run_sync ile, yoksa threadpool'da sync Session ile.
+    async def route'lar DB'ye bununla gider.
+    """
+    if async_engine is not None:
+        async with AsyncSessionLocal() as adb:
+            return await adb.run_sync(fn, *args)
+
+    def call():
+        with SessionLocal() as db:
+            return fn(db, *args)
+
+    return await run_in_threadpool(call)
+
+def dialect_insert(bind):
+    """
+    ON CONFLICT DO NOTHING destekleyen insert() döndürür (SQLite / Postgres).
+    """
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT desteklenmiyor: {bind.dialect.name}")
+    return insert
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unicodedata
+import zipfile
+from datetime import datetime
+from urllib.parse import quote
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Dosya / CSV çıktısı istemciye bu büyüklükte parçalarla gönderilir
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
+
+DATETIME_FORMAT = "DD.MM.YYYY HH:MM:SS"
+
+
+class XlsxReport:
+    """
+    openpyxl write-only çalışma kitabı: satırlar eklendikçe geçici dosyaya yazılır,
+    bellekte tüm tablo tutulmaz. save_temp() sonrası stream_file() ile parça parça gönderilir.
+    """
+
+    def __init__(self, title: str, widths: list[int]):
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(title=title[:31])
+        # write-only modda kolon genişlikleri ilk satırdan önce verilmeli
+        for i, w in enumerate(widths):
+            self.ws.column_dimensions[get_column_letter(i + 1)].width = w
+        self.bold = Font(bold=True)
+
+    def _cell(self, value, bold: bool):
+        # düz değerler doğrudan yazılır; hücre nesnesi yalnız biçim gerekiyorsa (hız için)
+        if not bold and not isinstance(value, datetime):
+            return value
+        cell = WriteOnlyCell(self.ws, value=value)
+        if isinstance(value, datetime):
+            cell.number_format = DATETIME_FORMAT
+        if bold:
+            cell.font = self.bold
+        return cell
+
+    def row(self, *values, bold: bool = False):
+        self.ws.append([self._cell(v, bold) for v in values])
+
+    def save_temp(self) -> str:
+        fd, path = tempfile.mkstemp(prefix="yoklama-", suffix=".xlsx")
+        os.close(fd)
+        self.wb.save(path)
+        return path
+
+
+def attachment(filename: str) -> dict:
+    """
+    Content-Disposition başlığı. Başlıklar latin-1 olduğu için Türkçe ders adları
+    filename*=UTF-8'' ile, eski tarayıcılar için ASCII karşılığıyla birlikte verilir.
+    """
+    fallback = unicodedata.normalize("NFKD", filename.replace("ı", "i").replace("İ", "I"))
+    fallback = fallback.encode("ascii", "ignore").decode().replace('"', "")
+    return {"Content-Disposition": f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"}
+
+
+def stream_file(path: str, chunk_size: int = EXPORT_CHUNK_BYTES):
+    """
+    Dosyayı parça parça okur, bitince (ya da istemci koparsa) siler.
+    """
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def text_chunks(lines, chunk_size: int = EXPORT_CHUNK_BYTES):
+    """
+    Satırları ~chunk_size büyüklüğünde birleştirip UTF-8 olarak verir (satır başına bir yield yerine).
+    """
+    buf = []
+    size = 0
+    for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+            size = 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def zip_temp(files: list[tuple[str, str]]) -> str:
+    """
+    (arşivdeki ad, diskteki yol) listesini geçici bir ZIP'e yazar, kaynak dosyaları siler.
+    """
+    fd, path = tempfile.mkstemp(prefix="yoklama-", suffix=".zip")
+    os.close(fd)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, src in files:
+            zf.write(src, arcname=name)
+            os.unlink(src)
+    return path
@@ -0,0 +1,125 @@
+import asyncio
+import os
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from .database import run_db
+from .models import ClassSession, Attendance, DeviceCheckin
+
+# Bu kadar oturuma kadar silme istek içinde tek seferde yapılır; fazlası arka planda parça parça.
+HISTORY_DELETE_SYNC_MAX = int(os.getenv("HISTORY_DELETE_SYNC_MAX", "5000"))
+HISTORY_DELETE_CHUNK = int(os.getenv("HISTORY_DELETE_CHUNK", "2000"))
+
+
+def count_sessions(db: Session, teacher_id: int) -> tuple[int, int | None]:
+    """
+    (oturum sayısı, en büyük oturum id'si). id silme sınırıdır: silme sürerken başlatılan oturum silinmez.
+    """
+    total, last_id = db.execute(
+        select(func.count(ClassSession.id), func.max(ClassSession.id)).where(ClassSession.teacher_id == teacher_id)
+    ).one()
+    return total, last_id
+
+
+def purge_sessions(db: Session, teacher_id: int, session_ids: list[int] | None = None,
+                   up_to: int | None = None) -> tuple[int, list]:
+    """
+    Hocanın oturumlarını (session_ids verilirse yalnız onları, up_to verilirse id'si en fazla o olanları)
+    yoklama ve cihaz kayıtlarıyla birlikte siler. Oturum sayısından bağımsız 4 ifade: aktif kodlar +
+    3 DELETE ... IN (SELECT ...). (silinen oturum sayısı, aktif olanların (id, session_code) listesi)
+    döner; bunlar registry'den düşürülüp duyurulmalı.
+    """
+    owned = select(ClassSession.id).where(ClassSession.teacher_id == teacher_id)
+    if session_ids is not None:
+        owned = owned.where(ClassSession.id.in_(session_ids))
+    if up_to is not None:
+        owned = owned.where(ClassSession.id <= up_to)
+
+    active = db.execute(
+        select(ClassSession.id, ClassSession.session_code)
+        .where(ClassSession.id.in_(owned), ClassSession.is_active == True)
+    ).all()
+    db.execute(delete(Attendance).where(Attendance.session_id.in_(owned)))
+    db.execute(delete(DeviceCheckin).where(DeviceCheckin.session_id.in_(owned)))
+    deleted = db.execute(delete(ClassSession).where(ClassSession.id.in_(owned))).rowcount
+    db.commit()
+    return deleted, active
+
+
+def purge_chunk(db: Session, teacher_id: int, chunk_size: int, up_to: int) -> tuple[int, list]:
+    """
+    id'si en fazla up_to olan en eski chunk_size oturumu kendi transaction'ında siler (kilit süresi
+    kısa kalsın diye). up_to iş başlarken alınır; silme sürerken başlatılan oturumlar kalır.
+    """
+    ids = list(db.scalars(
+        select(ClassSession.id).where(ClassSession.teacher_id == teacher_id, ClassSession.id <= up_to)
+        .order_by(ClassSession.id).limit(chunk_size)
+    ))
+    if not ids:
+        return 0, []
+    return purge_sessions(db, teacher_id, ids)
+
+
+class PurgeJob:
+    __slots__ = ("teacher_id", "total", "up_to", "deleted", "done", "error", "task")
+
+    def __init__(self, teacher_id: int, total: int, up_to: int):
+        self.teacher_id = teacher_id
+        self.total = total
+        self.up_to = up_to
+        self.deleted = 0
+        self.done = False
+        self.error = None
+        self.task: asyncio.Task | None = None
+
+    def as_dict(self) -> dict:
+        return {"total": self.total, "deleted": self.deleted, "done": self.done, "error": self.error}
+
+
+class HistoryPurger:
+    """
+    Büyük geçmişleri arka planda HISTORY_DELETE_CHUNK'lık parçalarla siler; hoca başına tek iş.
+    İlerleme bu worker'ın belleğindedir (--workers N ile başka worker'a düşen durum isteği boş döner).
+    """
+
+    def __init__(self, on_removed=None, chunk_size: int = HISTORY_DELETE_CHUNK):
+        self.on_removed = on_removed  # fn([(id, session_code)]) — aktif oturum silinince
+        self.chunk_size = max(1, chunk_size)
+        self.jobs = {}  # teacher_id -> PurgeJob
+
+    def status(self, teacher_id: int) -> PurgeJob | None:
+        return self.jobs.get(teacher_id)
+
+    def running(self, teacher_id: int) -> bool:
+        job = self.jobs.get(teacher_id)
+        return job is not None and not job.done
+
+    def start(self, teacher_id: int, total: int, up_to: int) -> PurgeJob:
+        if self.running(teacher_id):
+            return self.jobs[teacher_id]
+        job = PurgeJob(teacher_id, total, up_to)
+        job.task = asyncio.create_task(self._run(job))
+        self.jobs[teacher_id] = job
+        return job
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.task is not None and not job.done:
+                job.task.cancel()
+
+    async def _run(self, job: PurgeJob):
+        try:
+            while True:
+                deleted, active = await run_db(purge_chunk, job.teacher_id, self.chunk_size, job.up_to)
+                if active and self.on_removed is not None:
+                    self.on_removed(active)
+                if deleted == 0:
+                    break
+                job.deleted += deleted
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            job.done = True
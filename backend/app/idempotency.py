@@ -0,0 +1,69 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Yoklama isteğindeki Idempotency-Key: aynı anahtarla gelen tekrar (mobil ağda kaybolan cevap)
+# ilk isteğin cevabını alır, DB'ye gitmez.
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX = 64
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "20000"))
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+
+
+class IdempotencyCache:
+    """
+    key -> (bitiş, future). LRU + TTL; yalnız event loop'tan (async route) kullanılır, kilit yok.
+    İlk istek sürerken aynı anahtarla gelen tekrar onun sonucunu bekler. keep(result) False ise
+    (ör. 503) ya da istisna olursa sonuç saklanmaz, bekleyen tekrar kendisi dener.
+    Bellek içi, worker başına: başka worker'a düşen tekrar normal yoldan gider.
+    """
+
+    def __init__(self, maxsize: int = IDEMPOTENCY_CACHE_SIZE, ttl: int = IDEMPOTENCY_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    async def cached(self, key):
+        """
+        Anahtarın saklı sonucu (ilk istek sürüyorsa onu bekler); yoksa ya da saklanmadıysa None.
+        """
+        item = self.items.get(key)
+        if item is None or item[0] <= time.monotonic():
+            return None
+        result = await asyncio.shield(item[1])
+        if result is not None:
+            self.hits += 1
+        return result
+
+    async def run(self, key, produce, keep=lambda result: True):
+        item = self.items.get(key)
+        if item is not None and item[0] > time.monotonic():
+            result = await asyncio.shield(item[1])
+            if result is not None:
+                self.hits += 1
+                return result
+            return await produce()
+
+        self.misses += 1
+        if self.maxsize <= 0:
+            return await produce()
+
+        fut = asyncio.get_running_loop().create_future()
+        self.items[key] = (time.monotonic() + self.ttl, fut)
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+        result = None
+        try:
+            result = await produce()
+            return result
+        finally:
+            kept = result is not None and keep(result)
+            if not kept and self.items.get(key, (None, None))[1] is fut:
+                del self.items[key]
+            fut.set_result(result if kept else None)
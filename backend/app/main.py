@@ -2,25 +2,40 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
 import secrets
 import uuid
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from io import BytesIO
+from urllib.parse import quote
 
-import qrcode
-
-from fastapi import FastAPI, Request, Depends, Form, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from fastapi import FastAPI, Request, Depends, Form, File, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func, distinct, case, or_, and_, select
 
-from .database import Base, engine, get_db, SessionLocal
+from .database import engine, async_engine, SessionLocal, get_db, run_db, dialect_insert
 from .models import User, ClassSession, Attendance, DeviceCheckin
-from .auth import verify_password, create_access_token, get_user_from_cookie, COOKIE_NAME
-from .seed import seed_users
+from .auth import create_access_token, get_user_from_cookie, password_pool, token_cache, PasswordPoolBusy, COOKIE_NAME
+from .cli import init_db
+from .checkin_queue import CheckinQueue, CHECKIN_WRITE_BEHIND
+from .session_registry import ActiveSessionRegistry
+from .broadcast import WSManager, make_backend
+from .qr_cache import QRCache, MEDIA_TYPES
+from .exports import XlsxReport, XLSX_MEDIA_TYPE, attachment, stream_file, text_chunks, zip_temp
+from .roster import get_or_create_course, roster_clause, course_of, course_rosters, session_course_ids
+from .history_purge import HistoryPurger, count_sessions, purge_sessions, HISTORY_DELETE_SYNC_MAX
+from .student_import import StudentImporter, save_upload, IMPORT_EXTENSIONS
+from .idempotency import IdempotencyCache, IDEMPOTENCY_HEADER, IDEMPOTENCY_KEY_MAX
+from .admission import CheckinAdmission, CHECKIN_RETRY_AFTER_SECONDS
+from .session_expiry import SessionExpiryScheduler
+from .qr_tokens import QR_ROTATE_SECONDS, make_token, verify_token, current_window, window_remaining
+from .metrics import metrics, MetricsMiddleware, instrument_engine, METRICS_TOKEN, METRICS_CONTENT_TYPE
 
 from zoneinfo import ZoneInfo
 
@@ -71,10 +86,30 @@ def get_or_set_device_id(request: Request, resp: Response | None = None) -> str:
     return device_id
 
 
-app = FastAPI(title="QR Yoklama Sistemi")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_INIT_ON_STARTUP:
+        await run_in_threadpool(init_db)
+    await ws_manager.start()
+    await session_expiry.start()
+    if checkin_queue is not None:
+        checkin_queue.start()
+    yield
+    await session_expiry.stop()
+    await history_purger.stop()
+    await student_importer.stop()
+    if checkin_queue is not None:
+        await checkin_queue.stop()
+    await ws_manager.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(title="QR Yoklama Sistemi", lifespan=lifespan)
 
 BASE_URL = os.getenv("BASE_URL", "http://127.0.0.1:8000").rstrip("/")
 LATE_MINUTES_DEFAULT = int(os.getenv("LATE_MINUTES_DEFAULT", "10"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
 
 # Paths
 APP_DIR = os.path.dirname(os.path.abspath(__file__))   # backend/app
@@ -84,43 +119,175 @@ templates = Jinja2Templates(directory=os.path.join(BACKEND_DIR, "templates"))
 static_dir = os.path.join(BACKEND_DIR, "static")
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
-# DB init
-Base.metadata.create_all(bind=engine)
-
-# Seed users
-db_seed = SessionLocal()
-try:
-    seed_users(db_seed)
-finally:
-    db_seed.close()
+# DB init: import sırasında DB işi yok. Şema + seed `python -m app.cli init-db` ile bir kez;
+# tek süreçli geliştirmede DB_INIT_ON_STARTUP=1 ile lifespan'de.
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "0") == "1"
 
 
 # ---------------- WebSocket manager ----------------
-class WSManager:
-    def __init__(self):
-        self.active = {}  # session_id -> set(ws)
+ws_manager = WSManager(make_backend(engine=engine))
+
+
+# ---------------- Write-behind yoklama kuyruğu ----------------
+async def broadcast_written_checkins(rows: list[dict]):
+    """
+    Flusher batch'i DB'ye yazdıktan sonra çağrılır; WS yayını yazılan satırlar için yapılır.
+    """
+    for r in rows:
+        await ws_manager.broadcast(r["session_id"], attendance_event(
+            r["started_at"], r["id"], r["timestamp"], r["username"], r["full_name"]
+        ))
+
 
-    async def connect(self, session_id: int, ws: WebSocket):
-        await ws.accept()
-        self.active.setdefault(session_id, set()).add(ws)
+checkin_queue = CheckinQueue(broadcast_written_checkins) if CHECKIN_WRITE_BEHIND else None
 
-    def disconnect(self, session_id: int, ws: WebSocket):
-        if session_id in self.active and ws in self.active[session_id]:
-            self.active[session_id].remove(ws)
 
-    async def broadcast(self, session_id: int, message: dict):
-        conns = list(self.active.get(session_id, []))
-        for ws in conns:
-            try:
-                await ws.send_json(message)
-            except Exception:
-                self.disconnect(session_id, ws)
+# ---------------- Aktif oturum kaydı ----------------
+active_sessions = ActiveSessionRegistry()
+qr_cache = QRCache()
 
+active_sessions.on_evict(lambda entry: qr_cache.invalidate(entry.session_code))
+active_sessions.on_evict(lambda entry: ws_manager.forget(entry.id))
 
-ws_manager = WSManager()
+if checkin_queue is not None:
+    active_sessions.on_evict(lambda entry: checkin_queue.forget(entry.id))
+
+
+# ✅ Durdurulan / silinen / süresi dolan oturum her worker'ın kaydından hemen düşer (kontrol mesajı);
+# ACTIVE_SESSION_RECHECK_SECONDS'lık DB kontrolü yalnız mesaj kaybolursa devreye girer.
+@ws_manager.on_control
+def drop_gone_session(message: dict):
+    if message.get("type") == "session_gone":
+        active_sessions.remove(message["session_code"])
+
+
+# ---------------- Oturum süre dolumu (arka planda) ----------------
+# Bitişi gelen oturum DB'de kapatılır (is_active=False), önbelleklerden düşer, dashboard'a olay gider.
+async def announce_session_closed(session_id: int, session_code: str, reason: str):
+    await ws_manager.control({"type": "session_gone", "session_code": session_code})
+    await ws_manager.broadcast(session_id, {"type": "session_closed", "session_id": session_id, "reason": reason})
+
+
+session_expiry = SessionExpiryScheduler(on_due=active_sessions.remove, on_closed=announce_session_closed)
+active_sessions.on_put(lambda entry: session_expiry.schedule(entry.id, entry.session_code, entry.expires_at))
+
+
+def drop_sessions(sessions: list, reason: str):
+    """
+    Kapanan / silinen oturumlar ((id, session_code)): bu worker'da hemen düşer, diğer worker'lara
+    ve hoca paneline duyurulur.
+    """
+    for s in sessions:
+        active_sessions.remove(s[1])
+    session_expiry.announce(sessions, reason)
+
+
+# ---------------- Yoklama cevapları (Idempotency-Key) ----------------
+checkin_replies = IdempotencyCache()
+
+
+# ---------------- Yoklama kabul kontrolü (kova + eşzamanlılık sınırı) ----------------
+checkin_admission = CheckinAdmission()
+
+
+# ---------------- Geçmiş silme (büyük geçmişler arka planda) ----------------
+history_purger = HistoryPurger(on_removed=lambda sessions: drop_sessions(sessions, "deleted"))
+
+
+# ---------------- Toplu öğrenci içe aktarma (arka planda) ----------------
+student_importer = StudentImporter()
+
+
+# ---------------- Metrikler (/metrics) ----------------
+# İstek/SQL/sıcak yol süreleri histogramlarda; sayaç ve kuyruk derinlikleri scrape anında okunur.
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+
+def ws_clients():
+    return [c for clients in ws_manager.active.values() for c in clients.values()]
+
+
+def running_jobs(worker) -> int:
+    return sum(1 for job in list(worker.jobs.values()) if not job.done)
+
+
+metrics.gauge("yoklama_ws_sessions", "Bu worker'da soketi açık oturum sayısı", lambda: len(ws_manager.active))
+metrics.gauge("yoklama_ws_connections", "Bu worker'daki açık WebSocket sayısı", lambda: len(ws_clients()))
+metrics.gauge("yoklama_ws_send_queue_depth", "WS giden kuyruklarında bekleyen frame",
+              lambda: sum(c.queue.qsize() for c in ws_clients()))
+metrics.counter("yoklama_ws_frames_total", "Gönderilen yayın frame'i", lambda: ws_manager.frames_sent)
+metrics.counter("yoklama_ws_dropped_slow_total", "Yavaş diye kapatılan soket", lambda: ws_manager.dropped_slow)
+metrics.counter("yoklama_ws_publish_dropped_total", "Worker'lar arası yayında düşen olay (sıra dolu / gönderim hatası)",
+                lambda: getattr(ws_manager.backend, "dropped", 0))
+metrics.counter("yoklama_ws_listen_lost_total", "Kopan LISTEN bağlantısı (yeniden bağlanılır)",
+                lambda: getattr(ws_manager.backend, "listen_lost", 0))
+metrics.counter("yoklama_ws_replayed_events_total", "Yeniden bağlanana tekrar gönderilen olay",
+                lambda: ws_manager.replayed)
+metrics.counter("yoklama_ws_control_received_total", "Worker'lar arası kontrol mesajı (oturum kaydı geçersizleme)",
+                lambda: ws_manager.controls_received)
+metrics.gauge("yoklama_password_queue_depth", "Argon2 havuzunda çalışan + bekleyen iş", lambda: password_pool.depth)
+metrics.counter("yoklama_password_rejected_total", "Havuz dolu diye reddedilen login", lambda: password_pool.rejected)
+if checkin_queue is not None:
+    metrics.gauge("yoklama_checkin_queue_depth", "Write-behind kuyruğunda bekleyen yoklama",
+                  lambda: checkin_queue.queue.qsize())
+    metrics.counter("yoklama_checkin_written_total", "Write-behind ile yazılan yoklama", lambda: checkin_queue.written)
+    metrics.counter("yoklama_checkin_write_retries_total", "Tekrar denenen write-behind batch'i",
+                    lambda: checkin_queue.retried)
+    metrics.counter("yoklama_checkin_write_failed_total", "Tekrarlara rağmen yazılamayan yoklama",
+                    lambda: checkin_queue.failed)
+    metrics.counter("yoklama_checkin_late_device_conflicts_total",
+                    "Cihaz kilidi batch yazımında başka öğrencide çıkan yoklama (403 ile cevaplandı)",
+                    lambda: checkin_queue.lost_lock)
+    metrics.counter("yoklama_checkin_commit_timeouts_total", "Commit beklerken zaman aşımına uğrayan yoklama cevabı",
+                    lambda: checkin_queue.timed_out)
+    metrics.gauge("yoklama_checkin_queue_failing", "Write-behind yazamıyor (yoklamalar senkron yoldan)",
+                  lambda: int(checkin_queue.failing))
+if hasattr(engine.pool, "checkedout"):
+    metrics.gauge("yoklama_db_pool_checked_out", "Havuzdan alınmış DB bağlantısı", engine.pool.checkedout)
+metrics.gauge("yoklama_background_jobs", "Süren arka plan işi", lambda: {
+    ("history_purge",): running_jobs(history_purger),
+    ("student_import",): running_jobs(student_importer),
+}, ("job",))
+metrics.gauge("yoklama_session_expiry_scheduled", "Bitişi beklenen oturum", lambda: len(session_expiry.deadlines))
+metrics.counter("yoklama_session_expiry_closed_total", "Süresi dolunca kapatılan oturum", lambda: session_expiry.closed)
+metrics.counter("yoklama_session_expiry_batches_total", "Süre dolumu UPDATE'i", lambda: session_expiry.batches)
+metrics.counter("yoklama_session_expiry_errors_total", "Hata verip tekrar denenen süre dolumu UPDATE'i",
+                lambda: session_expiry.errors)
+metrics.gauge("yoklama_checkin_admission_active", "Şu an işlenen yoklama", lambda: checkin_admission.slots.active)
+metrics.gauge("yoklama_checkin_admission_waiting", "Eşzamanlılık sırasında bekleyen yoklama",
+              lambda: len(checkin_admission.slots.waiters))
+metrics.gauge("yoklama_checkin_admission_tracked_keys", "Bellekteki kova sayısı", lambda: {
+    ("device",): len(checkin_admission.devices.items),
+    ("student",): len(checkin_admission.students.items),
+}, ("bucket",))
+metrics.counter("yoklama_checkin_admission_total", "Yoklama kabul kontrolü sonucu", lambda: {
+    ("admitted",): checkin_admission.slots.admitted,
+    ("rejected_queue_full",): checkin_admission.slots.rejected,
+    ("rejected_wait_timeout",): checkin_admission.slots.timed_out,
+    ("limited_device",): checkin_admission.devices.limited,
+    ("limited_student",): checkin_admission.students.limited,
+}, ("result",))
+metrics.counter("yoklama_checkin_admission_queued_total", "Sırada bekleyerek işlenmeye çalışılan yoklama",
+                lambda: checkin_admission.slots.queued)
+metrics.counter("yoklama_cache_hits_total", "Önbellek isabeti", lambda: {
+    ("token",): token_cache.hits,
+    ("qr",): qr_cache.hits,
+    ("active_session",): active_sessions.hits,
+    ("checkin_reply",): checkin_replies.hits,
+}, ("cache",))
+metrics.counter("yoklama_cache_misses_total", "Önbellek ıskası", lambda: {
+    ("token",): token_cache.misses,
+    ("qr",): qr_cache.misses,
+    ("active_session",): active_sessions.misses,
+    ("checkin_reply",): checkin_replies.misses,
+}, ("cache",))
 
 
 # ---------------- Helpers ----------------
+# ✅ Token istek başına bir kez çözülür (request.state.user); aşağıdakiler Depends() ile de kullanılabilir
 def require_login(request: Request):
     return get_user_from_cookie(request)
 
@@ -139,6 +306,32 @@ def require_student(request: Request):
     return payload
 
 
+def late_status(started_at: datetime, timestamp: datetime, late_minutes: int = LATE_MINUTES_DEFAULT) -> str:
+    diff_min = (timestamp - started_at).total_seconds() / 60.0
+    return "GEÇ" if diff_min > late_minutes else "ZAMANINDA"
+
+
+def encode_attendance_cursor(timestamp: datetime, attendance_id: int) -> str:
+    # sabit genişlik: istemci cursor'ları string olarak karşılaştırabilsin
+    return f"{timestamp.strftime('%Y%m%d%H%M%S%f')}-{attendance_id:010d}"
+
+
+def attendance_event(started_at: datetime, attendance_id: int, timestamp: datetime,
+                     username: str | None, full_name: str | None) -> dict:
+    """
+    Hoca paneline giden yoklama olayı (WS yayını, yeniden bağlanma ve delta endpoint'i aynı biçim).
+    """
+    return {
+        "id": attendance_id,
+        "cursor": encode_attendance_cursor(timestamp, attendance_id),
+        "username": username or "",
+        "full_name": full_name or "",
+        "timestamp": timestamp.isoformat() + "Z",
+        "time_tr": fmt_tr(timestamp),
+        "status": late_status(started_at, timestamp, LATE_MINUTES_DEFAULT),
+    }
+
+
 def compute_status(session: ClassSession, att: Attendance | None, late_minutes: int = LATE_MINUTES_DEFAULT) -> str:
     """
     Status hesabı: started_at'tan itibaren late_minutes dakika sonrası GEÇ.
@@ -146,8 +339,51 @@ def compute_status(session: ClassSession, att: Attendance | None, late_minutes:
     """
     if not att:
         return "YOK"
-    diff_min = (att.timestamp - session.started_at).total_seconds() / 60.0
-    return "GEÇ" if diff_min > late_minutes else "ZAMANINDA"
+    return late_status(session.started_at, att.timestamp, late_minutes)
+
+
+def attendance_counts(db: Session, session: ClassSession, late_minutes: int = LATE_MINUTES_DEFAULT) -> tuple[int, int, int]:
+    """
+    (toplam öğrenci, katılan, geç) tek SQL sorgusunda.
+    Geç kuralı compute_status ile aynı: timestamp > started_at + late_minutes.
+    """
+    late_after = session.started_at + timedelta(minutes=late_minutes)
+    students_total = (
+        db.query(func.count(User.id))
+        .filter(roster_clause(db, [course_of(db, session)], [session.id]))
+        .scalar_subquery()
+    )
+    row = (
+        db.query(
+            students_total,
+            func.count(distinct(Attendance.student_id)),
+            func.coalesce(func.sum(case((Attendance.timestamp > late_after, 1), else_=0)), 0),
+        )
+        .filter(Attendance.session_id == session.id)
+        .one()
+    )
+    return int(row[0] or 0), int(row[1] or 0), int(row[2] or 0)
+
+
+def close_active_sessions(db: Session, teacher_id: int) -> list:
+    """
+    Hocanın aktif oturumlarını kapatır, kapatılanların (id, session_code) listesini döner.
+    """
+    closed = (
+        db.query(ClassSession.id, ClassSession.session_code)
+        .filter(ClassSession.teacher_id == teacher_id, ClassSession.is_active == True)
+        .all()
+    )
+    if not closed:
+        return []
+
+    db.query(ClassSession).filter(
+        ClassSession.id.in_([c.id for c in closed])
+    ).update({"is_active": False}, synchronize_session=False)
+    db.commit()
+
+    drop_sessions(closed, "stopped")
+    return closed
 
 
 def safe_next(n: str | None) -> str | None:
@@ -204,17 +440,29 @@ def login_page(request: Request):
 
 
 @app.post("/login")
-def login(
+async def login(
     request: Request,
-    db: Session = Depends(get_db),
     username: str = Form(...),
     password: str = Form(...),
     next: str = Form("", alias="next"),
 ):
-    user = db.query(User).filter(User.username == username.strip()).first()
-    if not user or not verify_password(password, user.password_hash):
+    user = await run_db(find_user, username.strip())
+    if not user:
         return HTMLResponse("Hatalı giriş.", status_code=400)
 
+    # ✅ Argon2 ayrı, sınırlı havuzda (event loop ve threadpool bloklanmaz)
+    try:
+        ok, new_hash = await password_pool.verify_and_update(password, user.password_hash)
+    except PasswordPoolBusy:
+        return HTMLResponse("Sistem yoğun, birkaç saniye sonra tekrar dene.", status_code=503,
+                            headers={"Retry-After": "2"})
+    if not ok:
+        return HTMLResponse("Hatalı giriş.", status_code=400)
+
+    # Argon2 parametreleri değiştiyse hash'i yenile
+    if new_hash:
+        await run_db(update_password_hash, user.id, new_hash)
+
     token = create_access_token({"sub": str(user.id), "role": user.role, "name": user.full_name})
 
     next_safe = safe_next(next)
@@ -232,6 +480,15 @@ def login(
     return resp
 
 
+def find_user(db: Session, username: str) -> User | None:
+    return db.query(User).filter(User.username == username).first()
+
+
+def update_password_hash(db: Session, user_id: int, password_hash: str):
+    db.query(User).filter(User.id == user_id).update({"password_hash": password_hash})
+    db.commit()
+
+
 @app.get("/logout")
 def logout():
     resp = RedirectResponse("/login", status_code=302)
@@ -255,41 +512,25 @@ def teacher_dashboard(request: Request, db: Session = Depends(get_db)):
         .first()
     )
 
-    attendances = []
     qr_url = None
-    attendances_view = []
+    present_count = 0
+    late_count = 0
 
     if active_session:
         qr_url = f"{BASE_URL}/s/{active_session.session_code}"
-        attendances = (
-            db.query(Attendance)
-            .filter(Attendance.session_id == active_session.id)
-            .order_by(desc(Attendance.timestamp))
-            .all()
-        )
 
-        for a in attendances:
-            stu = db.query(User).filter(User.id == a.student_id).first()
-            attendances_view.append({
-                "student_no": stu.username if stu else "",
-                "full_name": stu.full_name if stu else "",
-                "time_tr": fmt_tr(a.timestamp),
-                "status": compute_status(active_session, a, LATE_MINUTES_DEFAULT),
-                "timestamp_iso": a.timestamp.isoformat() + "Z",
-            })
+        # ✅ Katılan listesi sayfaya gömülmez: teacher_ws.js tarayıcıdaki kopyasını
+        # /teacher/session/{id}/attendances?after=<cursor> ile tamamlar (yenilemede yalnız eksikler)
 
         # template için TR tarih alanları
         active_session.started_at_tr = fmt_tr(active_session.started_at)
         active_session.expires_at_tr = fmt_tr(active_session.expires_at)
 
-    students_total = db.query(User).filter(User.role == "student").count()
-    present_count = len({a.student_id for a in attendances}) if active_session else 0
-    late_count = 0
-    if active_session:
-        for a in attendances:
-            if compute_status(active_session, a, LATE_MINUTES_DEFAULT) == "GEÇ":
-                late_count += 1
-    absent_count = (students_total - present_count) if active_session else students_total
+        students_total, present_count, late_count = attendance_counts(db, active_session, LATE_MINUTES_DEFAULT)
+    else:
+        students_total = db.query(User).filter(User.role == "student").count()
+
+    absent_count = students_total - present_count
 
     return templates.TemplateResponse(
         "teacher_dashboard.html",
@@ -298,15 +539,15 @@ def teacher_dashboard(request: Request, db: Session = Depends(get_db)):
             "teacher_name": payload.get("name"),
             "active_session": active_session,
             "qr_url": qr_url,
-            "attendances": attendances,
-            "attendances_view": attendances_view,
             "late_minutes": LATE_MINUTES_DEFAULT,
+            "qr_rotate_seconds": QR_ROTATE_SECONDS,
             "students_total": students_total,
             "present_count": present_count,
             "late_count": late_count,
             "absent_count": absent_count,
             "expires_at_iso": (active_session.expires_at.isoformat() + "Z") if active_session else None,
             "now_iso": utcnow().isoformat() + "Z",
+            "student_import": student_importer.status(teacher_id),
         },
     )
 
@@ -324,17 +565,15 @@ def teacher_start(
 
     teacher_id = int(payload["sub"])
 
-    db.query(ClassSession).filter(
-        ClassSession.teacher_id == teacher_id,
-        ClassSession.is_active == True
-    ).update({"is_active": False})
-    db.commit()
+    close_active_sessions(db, teacher_id)
 
     code = secrets.token_urlsafe(8).replace("-", "").replace("_", "")[:10]
     now = utcnow()
 
+    course = get_or_create_course(db, teacher_id, course_name.strip())
     session = ClassSession(
-        course_name=course_name.strip(),
+        course_name=course.name,
+        course_id=course.id,
         session_code=code,
         teacher_id=teacher_id,
         is_active=True,
@@ -343,6 +582,16 @@ def teacher_start(
     )
     db.add(session)
     db.commit()
+    db.refresh(session)
+
+    active_sessions.put(session)
+    active_sessions.prune(now)
+
+    # Projeksiyon sayfası ilk açıldığında QR hazır olsun
+    if QR_ROTATE_SECONDS > 0:
+        qr_cache.get(code, f"{BASE_URL}/s/{code}?t={make_token(session.id, current_window())}", "png")
+    else:
+        qr_cache.get(code, f"{BASE_URL}/s/{code}", "png")
 
     return RedirectResponse("/teacher", status_code=302)
 
@@ -354,14 +603,51 @@ def teacher_stop(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse("/login", status_code=302)
 
     teacher_id = int(payload["sub"])
-    db.query(ClassSession).filter(
-        ClassSession.teacher_id == teacher_id,
-        ClassSession.is_active == True
-    ).update({"is_active": False})
-    db.commit()
+    close_active_sessions(db, teacher_id)
     return RedirectResponse("/teacher", status_code=302)
 
 
+def encode_history_cursor(s: ClassSession) -> str:
+    return f"{s.started_at.strftime('%Y%m%d%H%M%S%f')}-{s.id}"
+
+
+def decode_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    """
+    "<%Y%m%d%H%M%S%f>-<id>" -> (zaman, id); geçmiş sayfası ve yoklama delta'sı ortak.
+    """
+    if not cursor:
+        return None
+    try:
+        ts, sid = cursor.split("-", 1)
+        return datetime.strptime(ts, "%Y%m%d%H%M%S%f"), int(sid)
+    except ValueError:
+        return None
+
+
+def session_counts(db: Session, sessions: list, late_minutes: int = LATE_MINUTES_DEFAULT) -> dict:
+    """
+    session_id -> (katılan, geç), sayfadaki tüm oturumlar için tek GROUP BY sorgusu.
+    Geç sınırı oturum başına Python'da hesaplanıp CASE ile verilir (compute_status ile aynı kural).
+    """
+    if not sessions:
+        return {}
+    late_after = case(
+        {s.id: s.started_at + timedelta(minutes=late_minutes) for s in sessions},
+        value=Attendance.session_id,
+    )
+    rows = (
+        db.query(
+            Attendance.session_id,
+            func.count(Attendance.id),
+            func.coalesce(func.sum(case((Attendance.timestamp > late_after, 1), else_=0)), 0),
+        )
+        .filter(Attendance.session_id.in_([s.id for s in sessions]))
+        .group_by(Attendance.session_id)
+        .all()
+    )
+    return {sid: (int(present), int(late)) for sid, present, late in rows}
+
+
 @app.get("/teacher/history", response_class=HTMLResponse)
 def teacher_history(request: Request, db: Session = Depends(get_db)):
     payload = require_teacher(request)
@@ -369,21 +655,40 @@ def teacher_history(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse("/login", status_code=302)
 
     teacher_id = int(payload["sub"])
+
+    # ✅ Keyset sayfalama: (started_at, id) < cursor, ix_class_sessions_teacher_started indeksiyle
+    q = db.query(ClassSession).filter(ClassSession.teacher_id == teacher_id)
+    cursor = decode_cursor(request.query_params.get("before"))
+    if cursor:
+        c_ts, c_id = cursor
+        q = q.filter(or_(
+            ClassSession.started_at < c_ts,
+            and_(ClassSession.started_at == c_ts, ClassSession.id < c_id),
+        ))
     sessions = (
-        db.query(ClassSession)
-        .filter(ClassSession.teacher_id == teacher_id)
-        .order_by(desc(ClassSession.started_at))
+        q.order_by(desc(ClassSession.started_at), desc(ClassSession.id))
+        .limit(HISTORY_PAGE_SIZE + 1)
         .all()
     )
 
+    next_cursor = None
+    if len(sessions) > HISTORY_PAGE_SIZE:
+        sessions = sessions[:HISTORY_PAGE_SIZE]
+        next_cursor = encode_history_cursor(sessions[-1])
+
+    counts = session_counts(db, sessions, LATE_MINUTES_DEFAULT)
     for s in sessions:
         s.started_at_tr = fmt_tr(s.started_at)
         s.expires_at_tr = fmt_tr(s.expires_at)
+        s.present_count, s.late_count = counts.get(s.id, (0, 0))
 
     return templates.TemplateResponse(
         "history.html",
-        {"request": request, "sessions": sessions}
+        {"request": request, "sessions": sessions, "next_cursor": next_cursor, "is_first_page": cursor is None,
+         "purge": history_purger.status(teacher_id)}
     )
+
+
 # ---- Teacher delete single session ----
 @app.post("/teacher/session/{session_id}/delete")
 def delete_single_session(session_id: int, request: Request, db: Session = Depends(get_db)):
@@ -393,71 +698,96 @@ def delete_single_session(session_id: int, request: Request, db: Session = Depen
 
     teacher_id = int(payload["sub"])
 
-    session = db.query(ClassSession).filter(
-        ClassSession.id == session_id,
-        ClassSession.teacher_id == teacher_id
-    ).first()
-
-    if not session:
+    # ✅ yoklamalar + device kayıtları + oturum, sahiplik kontrolü DELETE içinde
+    deleted, active = purge_sessions(db, teacher_id, [session_id])
+    if not deleted:
         return HTMLResponse("Oturum bulunamadı.", status_code=404)
+    drop_sessions(active, "deleted")
 
-    # ✅ önce yoklamaları sil
-    db.query(Attendance).filter(Attendance.session_id == session.id).delete()
-
-    # ✅ device kayıtlarını da sil (varsa)
-    db.query(DeviceCheckin).filter(DeviceCheckin.session_id == session.id).delete()
+    return RedirectResponse("/teacher/history", status_code=302)
 
-    # ✅ sonra oturumu sil
-    db.delete(session)
-    db.commit()
 
-    return RedirectResponse("/teacher/history", status_code=302)
+# ---- Teacher delete ALL history ----
 @app.post("/teacher/history/delete-all")
-def delete_all_history(request: Request, db: Session = Depends(get_db)):
+async def delete_all_history(request: Request):
     payload = require_teacher(request)
     if not payload:
         return RedirectResponse("/login", status_code=302)
 
     teacher_id = int(payload["sub"])
+    if history_purger.running(teacher_id):
+        return RedirectResponse("/teacher/history", status_code=302)
+
+    # ✅ set tabanlı silme: oturum sayısından bağımsız sabit sayıda ifade
+    # sayım anındaki en büyük id sınırdır: silme sürerken başlatılan oturum silinmez
+    total, last_id = await run_db(count_sessions, teacher_id)
+    if total > HISTORY_DELETE_SYNC_MAX:
+        # çok büyük geçmiş: arka planda parça parça, ilerleme /teacher/history'de
+        history_purger.start(teacher_id, total, last_id)
+    elif total:
+        _, active = await run_db(purge_sessions, teacher_id, None, last_id)
+        drop_sessions(active, "deleted")
 
-    sessions = db.query(ClassSession).filter(ClassSession.teacher_id == teacher_id).all()
+    return RedirectResponse("/teacher/history", status_code=302)
 
-    for s in sessions:
-        db.query(Attendance).filter(Attendance.session_id == s.id).delete()
-        db.query(DeviceCheckin).filter(DeviceCheckin.session_id == s.id).delete()
-        db.delete(s)
 
-    db.commit()
-    return RedirectResponse("/teacher/history", status_code=302)
+@app.get("/teacher/history/delete-all/status")
+def delete_all_history_status(request: Request):
+    payload = require_teacher(request)
+    if not payload:
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
 
+    job = history_purger.status(int(payload["sub"]))
+    return JSONResponse(job.as_dict() if job else {"total": 0, "deleted": 0, "done": True, "error": None})
 
 
-# ---- Teacher delete ALL history ----
-@app.post("/teacher/history/delete-all")
-def delete_all_history(
+# ---- Teacher bulk student import ----
+def import_course_id(db: Session, teacher_id: int, course_name: str) -> int:
+    course = get_or_create_course(db, teacher_id, course_name)
+    db.commit()
+    return course.id
+
+
+@app.post("/teacher/students/import")
+async def import_students_upload(
     request: Request,
-    db: Session = Depends(get_db)
+    file: UploadFile = File(...),
+    course_name: str = Form(""),
 ):
     payload = require_teacher(request)
     if not payload:
         return RedirectResponse("/login", status_code=302)
 
     teacher_id = int(payload["sub"])
+    if student_importer.running(teacher_id):
+        return RedirectResponse("/teacher", status_code=302)
 
-    sessions = db.query(ClassSession).filter(
-        ClassSession.teacher_id == teacher_id
-    ).all()
+    suffix = os.path.splitext((file.filename or "").lower())[1]
+    if suffix not in IMPORT_EXTENSIONS:
+        return HTMLResponse("Desteklenen dosya türleri: .csv, .xlsx", status_code=400)
 
-    for s in sessions:
-        db.query(Attendance).filter(
-            Attendance.session_id == s.id
-        ).delete()
-        db.delete(s)
+    path = await run_in_threadpool(save_upload, file.file, suffix)
+    if path is None:
+        return HTMLResponse("Dosya çok büyük.", status_code=413)
 
-    db.commit()
+    course_id = None
+    course_name = course_name.strip()
+    if course_name:
+        course_id = await run_db(import_course_id, teacher_id, course_name)
 
-    return RedirectResponse("/teacher/history", status_code=302)
+    # ✅ hash + parça parça INSERT arka planda; ilerleme panelde
+    student_importer.start(teacher_id, path, course_id)
+    return RedirectResponse("/teacher", status_code=302)
+
+
+@app.get("/teacher/students/import/status")
+def import_students_status(request: Request):
+    payload = require_teacher(request)
+    if not payload:
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
 
+    job = student_importer.status(int(payload["sub"]))
+    return JSONResponse(job.as_dict() if job else {"rows": 0, "done": True, "error": None})
 
 
 # ---- Teacher session detail ----
@@ -472,9 +802,10 @@ def teacher_session_detail(session_id: int, request: Request, db: Session = Depe
     if not session or session.teacher_id != teacher_id:
         return HTMLResponse("Yetkisiz / oturum bulunamadı.", status_code=403)
 
+    # ✅ liste = dersin kayıtlı öğrencileri (+ katılanlar), tüm kullanıcılar değil
     students = (
         db.query(User)
-        .filter(User.role == "student")
+        .filter(roster_clause(db, [course_of(db, session)], [session.id]))
         .order_by(User.username.asc())
         .all()
     )
@@ -521,26 +852,108 @@ def teacher_session_detail(session_id: int, request: Request, db: Session = Depe
     )
 
 
-# ---- QR PNG ----
-@app.get("/qr/{session_code}.png")
-def qr_png(session_code: str):
+# ---- QR PNG / SVG ----
+def qr_response(request: Request, db: Session, session_code: str, fmt: str) -> Response:
     url = f"{BASE_URL}/s/{session_code}"
-    img = qrcode.make(url)
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return Response(content=buf.getvalue(), media_type="image/png")
+    cache_control = "public, max-age=300"
+
+    if QR_ROTATE_SECONDS > 0:
+        # Dönen token modu: QR, oturum + zaman penceresi için imzalı token taşır
+        session = active_sessions.lookup(db, session_code)
+        # ✅ süresi dolmuş ama zamanlayıcının henüz kapatmadığı oturuma da QR/token verilmez
+        if not session or not session.is_active or utcnow() > session.expires_at:
+            return Response(status_code=404)
+        token = make_token(session.id, current_window())
+        url = f"{url}?t={token}"
+        cache_control = f"private, max-age={window_remaining()}"
+
+    body, etag = qr_cache.get(session_code, url, fmt)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@app.get("/qr/{session_code}.png")
+def qr_png(session_code: str, request: Request, db: Session = Depends(get_db)):
+    return qr_response(request, db, session_code, "png")
+
+
+@app.get("/qr/{session_code}.svg")
+def qr_svg(session_code: str, request: Request, db: Session = Depends(get_db)):
+    return qr_response(request, db, session_code, "svg")
+
+
+def attend_path(session_code: str, qr_token: str | None) -> str:
+    path = f"/s/{session_code}"
+    return f"{path}?t={qr_token}" if qr_token else path
+
+
+def record_checkin(db: Session, session_id: int, student_id: int, device_id: str) -> tuple[str, dict | None]:
+    """
+    Senkron yoklama yazımı; async route'tan run_db ile çağrılır.
+    "device_used" | "duplicate" | "ok" (+ WS için öğrenci satırı)
+
+    Tek transaction: cihaz kilidi ve yoklama INSERT ... ON CONFLICT DO NOTHING RETURNING ile.
+    "Önce var mı bak, sonra ekle" yarışı (çift dokunuşta IntegrityError / 500) yok; çakışan
+    istek DO NOTHING'e düşer ve nedeni tek SELECT ile ayrılır.
+    """
+    insert = dialect_insert(db.get_bind())
+
+    # ✅ Cihaz kilidi (tek telefon = tek öğrenci): uq_session_device / uq_session_student_once
+    locked = db.execute(
+        insert(DeviceCheckin)
+        .values(session_id=session_id, device_id=device_id, student_id=student_id)
+        .on_conflict_do_nothing()
+        .returning(DeviceCheckin.id)
+    ).first()
+    if locked is None:
+        owner = db.scalar(
+            select(DeviceCheckin.student_id)
+            .where(DeviceCheckin.session_id == session_id, DeviceCheckin.device_id == device_id)
+        )
+        db.rollback()
+        if owner is not None and owner != student_id:
+            return "device_used", None
+        return "duplicate", None
+
+    # ✅ Yoklama kaydı (kilitsiz eski kayıt varsa tekrar sayılır)
+    attendance = db.execute(
+        insert(Attendance)
+        .values(session_id=session_id, student_id=student_id, timestamp=utcnow())
+        .on_conflict_do_nothing()
+        .returning(Attendance.id, Attendance.timestamp)
+    ).first()
+    if attendance is None:
+        db.rollback()
+        return "duplicate", None
+
+    student = db.execute(select(User.username, User.full_name).where(User.id == student_id)).first()
+    db.commit()
+    return "ok", {
+        "id": attendance.id,
+        "username": student.username if student else "",
+        "full_name": student.full_name if student else "",
+        "timestamp": attendance.timestamp,
+    }
 
 
 # ---- Student attend via QR ----
 @app.get("/s/{session_code}", response_class=HTMLResponse)
 def student_attend_page(session_code: str, request: Request, db: Session = Depends(get_db)):
+    qr_token = request.query_params.get("t")
     payload = require_student(request)
     if not payload:
         # ✅ login sonrası tekrar QR sayfasına dön
-        return RedirectResponse(url=f"/login?next=/s/{session_code}", status_code=302)
+        return RedirectResponse(url="/login?next=" + quote(attend_path(session_code, qr_token)), status_code=302)
 
-    session = db.query(ClassSession).filter(ClassSession.session_code == session_code).first()
-    if not session:
+    # ✅ Dönen token: imza + pencere kontrolü DB'ye gitmeden
+    token_session_id = verify_token(qr_token) if QR_ROTATE_SECONDS > 0 else None
+    if QR_ROTATE_SECONDS > 0 and token_session_id is None:
+        return HTMLResponse("QR kodunun süresi dolmuş. Tahtadaki güncel QR'ı tekrar okut.", status_code=403)
+
+    session = active_sessions.lookup(db, session_code)
+    if not session or (token_session_id is not None and token_session_id != session.id):
         return HTMLResponse("Geçersiz QR / oturum kodu.", status_code=404)
 
     now = utcnow()
@@ -549,80 +962,140 @@ def student_attend_page(session_code: str, request: Request, db: Session = Depen
 
     resp = templates.TemplateResponse(
         "student_attend.html",
-        {"request": request, "session": session, "student_name": payload.get("name")}
+        {"request": request, "session": session, "student_name": payload.get("name"), "qr_token": qr_token or ""}
     )
     # ✅ device_id cookie yoksa burada set et
     get_or_set_device_id(request, resp)
     return resp
 
 
+DEVICE_USED_MESSAGE = "❌ Bu telefon ile bu derste zaten yoklama alındı. Her öğrenci kendi telefonundan yoklama vermeli."
+
+
 @app.post("/s/{session_code}/checkin")
-async def student_checkin(session_code: str, request: Request, db: Session = Depends(get_db)):
+async def student_checkin(session_code: str, request: Request):
+    qr_token = request.query_params.get("t")
     payload = require_student(request)
     if not payload:
-        return RedirectResponse(url=f"/login?next=/s/{session_code}", status_code=302)
+        return RedirectResponse(url="/login?next=" + quote(attend_path(session_code, qr_token)), status_code=302)
 
     student_id = int(payload["sub"])
-    session = db.query(ClassSession).filter(ClassSession.session_code == session_code).first()
-    if not session:
-        return HTMLResponse("Geçersiz QR.", status_code=404)
+
+    # ✅ Idempotency-Key: ağ yüzünden tekrarlanan istek ilk cevabı alır (QR penceresi dönmüş olsa da).
+    # Saklı cevap hız sınırından önce döner: tekrar deneme 429'a düşmez, sayaca da yazılmaz.
+    key = request.headers.get(IDEMPOTENCY_HEADER, "")
+    idempotent = 0 < len(key) <= IDEMPOTENCY_KEY_MAX
+    if idempotent:
+        reply = await checkin_replies.cached((student_id, session_code, key))
+        if reply is not None:
+            return HTMLResponse(reply[1], status_code=reply[0])
+
+    # ✅ Aynı cihaz / öğrenci seri POST atıyorsa DB'ye gitmeden 429
+    retry_after = checkin_admission.rate_limit(request.cookies.get(DEVICE_COOKIE), student_id)
+    if retry_after is not None:
+        return HTMLResponse(f"Çok sık denendi, {retry_after} sn sonra tekrar dene.", status_code=429,
+                            headers={"Retry-After": str(retry_after)})
+
+    if idempotent:
+        status_code, body = await checkin_replies.run(
+            (student_id, session_code, key),
+            lambda: admitted_checkin_reply(request, session_code, student_id, qr_token),
+            keep=lambda reply: reply[0] < 500 and reply[0] != 429,
+        )
+    else:
+        status_code, body = await admitted_checkin_reply(request, session_code, student_id, qr_token)
+    headers = {"Retry-After": str(CHECKIN_RETRY_AFTER_SECONDS)} if status_code == 429 else None
+    return HTMLResponse(body, status_code=status_code, headers=headers)
+
+
+async def admitted_checkin_reply(request: Request, session_code: str, student_id: int,
+                                 qr_token: str | None) -> tuple[int, str]:
+    """
+    checkin_reply, global eşzamanlılık sınırı içinde. Sıra doluysa / bekleme aşılırsa 429:
+    aşırı yükte DB havuzu çökmeden istemci kısa süre sonra tekrar dener.
+    """
+    reply = await checkin_admission.run(lambda: checkin_reply(request, session_code, student_id, qr_token))
+    if reply is None:
+        return 429, "Sistem yoğun, birkaç saniye sonra tekrar dene."
+    if not isinstance(reply, tuple):
+        # write-behind: commit slot dışında beklenir (DB bağlantısı tutmaz; slotta beklense
+        # batch en fazla CHECKIN_CONCURRENCY yoklama olurdu)
+        reply = await reply
+    return reply
+
+
+async def checkin_reply(request: Request, session_code: str,
+                        student_id: int, qr_token: str | None) -> tuple[int, str] | Awaitable[tuple[int, str]]:
+    """
+    Yoklama isteğinin (status, gövde) cevabı; idempotency önbelleği bunu saklar.
+    Write-behind'da kuyruğa alınan yoklama için cevabı commit'ten sonra verecek awaitable döner.
+    """
+    # ✅ Dönen token: geçersiz / eski / paylaşılmış QR DB'ye hiç ulaşmaz
+    token_session_id = verify_token(qr_token) if QR_ROTATE_SECONDS > 0 else None
+    if QR_ROTATE_SECONDS > 0 and token_session_id is None:
+        return 403, "QR kodunun süresi dolmuş. Tahtadaki güncel QR'ı tekrar okut."
+
+    session = active_sessions.get(session_code)
+    if session is None:
+        session = await run_db(active_sessions.lookup, session_code)
+    if not session or (token_session_id is not None and token_session_id != session.id):
+        return 404, "Geçersiz QR."
 
     now = utcnow()
     if (not session.is_active) or (now > session.expires_at):
-        return HTMLResponse("Oturum kapalı veya süresi dolmuş.", status_code=400)
+        return 400, "Oturum kapalı veya süresi dolmuş."
 
     # ✅ device_id zorunlu
     device_id = request.cookies.get(DEVICE_COOKIE)
     if not device_id:
-        return HTMLResponse("Cihaz doğrulanamadı. Sayfayı yenileyip tekrar dene.", status_code=400)
+        return 400, "Cihaz doğrulanamadı. Sayfayı yenileyip tekrar dene."
+
+    # ✅ Write-behind: kuyruğa at, cevap batch commit edilince (DB yazımı + WS yayını flusher'da).
+    # Flusher yazamıyorsa ("failing") senkron yola düşülür: cevap gerçek yazımın sonucudur.
+    if checkin_queue is not None:
+        result = checkin_queue.submit(session.id, student_id, device_id, session.started_at)
+        if isinstance(result, asyncio.Future):
+            return queued_checkin_reply(session.course_name, result)
+        if result == "device_used":
+            return 403, DEVICE_USED_MESSAGE
+        if result == "duplicate":
+            return 200, "Zaten yoklamaya katıldın."
+        if result == "full":
+            return 503, "Sistem yoğun, birkaç saniye sonra tekrar dene."
+
+    result, row = await run_db(record_checkin, session.id, student_id, device_id)
+    if result == "device_used":
+        return 403, DEVICE_USED_MESSAGE
+    if result == "duplicate":
+        return 200, "Zaten yoklamaya katıldın."
+
+    await ws_manager.broadcast(session.id, attendance_event(
+        session.started_at, row["id"], row["timestamp"], row["username"], row["full_name"]
+    ))
 
-    # ✅ Aynı cihaz bu oturumda zaten kullanıldı mı?
-    already_used = db.query(DeviceCheckin).filter(
-        DeviceCheckin.session_id == session.id,
-        DeviceCheckin.device_id == device_id,
-    ).first()
-
-    if already_used and already_used.student_id != student_id:
-        return HTMLResponse(
-            "❌ Bu telefon ile bu derste zaten yoklama alındı. Her öğrenci kendi telefonundan yoklama vermeli.",
-            status_code=403
-        )
-
-    # ✅ Öğrenci zaten yoklamaya katıldı mı?
-    exists = db.query(Attendance).filter(
-        Attendance.session_id == session.id,
-        Attendance.student_id == student_id
-    ).first()
-    if exists:
-        return HTMLResponse("Zaten yoklamaya katıldın.", status_code=200)
-
-    # ✅ Yoklama kaydı
-    attendance = Attendance(session_id=session.id, student_id=student_id)
-    db.add(attendance)
-    db.commit()
-    db.refresh(attendance)
+    # ✅ öğrenciye ders adı da net gelsin
+    return 200, f"✅ {session.course_name} yoklaması alındı."
 
-    # ✅ Cihaz kilidi (tek telefon = tek öğrenci)
-    lock = DeviceCheckin(session_id=session.id, device_id=device_id, student_id=student_id)
-    db.add(lock)
-    db.commit()
 
-    student = db.query(User).filter(User.id == student_id).first()
-    status = compute_status(session, attendance, LATE_MINUTES_DEFAULT)
+async def queued_checkin_reply(course_name: str, pending: asyncio.Future) -> tuple[int, str]:
+    """
+    Kuyruktaki yoklamanın cevabı: batch'teki ON CONFLICT sonucu. Yazılamadıysa / geciktiyse 503,
+    öğrenci tekrar dener (bekleyen yoklama kuyrukta kalır, tekrar aynı sonucu bekler).
+    """
+    result = await checkin_queue.outcome(pending)
+    if result == "ok":
+        return 200, f"✅ {course_name} yoklaması alındı."
+    if result == "duplicate":
+        return 200, "Zaten yoklamaya katıldın."
+    if result == "device_used":
+        return 403, DEVICE_USED_MESSAGE
+    return 503, "Yoklama henüz kaydedilemedi, birkaç saniye sonra tekrar dene."
 
-    await ws_manager.broadcast(session.id, {
-        "username": student.username if student else "",
-        "full_name": student.full_name if student else "",
-        "timestamp": attendance.timestamp.isoformat() + "Z",
-        "time_tr": fmt_tr(attendance.timestamp),
-        "status": status,
-    })
 
-    # ✅ öğrenciye ders adı da net gelsin
-    return HTMLResponse(f"✅ {session.course_name} yoklaması alındı.", status_code=200)
+# ---- Export (Resmi Rapor) ----
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
 
 
-# ---- Export (Resmi Rapor) ----
 @app.get("/teacher/session/{session_id}/export.csv")
 def export_session_csv(session_id: int, request: Request, db: Session = Depends(get_db)):
     payload = require_teacher(request)
@@ -639,58 +1112,102 @@ def export_session_csv(session_id: int, request: Request, db: Session = Depends(
         return HTMLResponse("Yetkisiz / oturum bulunamadı.", status_code=403)
 
     late_minutes = LATE_MINUTES_DEFAULT
-
-    attendances = (
-        db.query(Attendance)
-        .filter(Attendance.session_id == session.id)
-        .order_by(Attendance.timestamp.asc())
-        .all()
-    )
-    present_by_student_id = {a.student_id: a for a in attendances}
-
-    students = (
-        db.query(User)
-        .filter(User.role == "student")
-        .order_by(User.username.asc())
-        .all()
+    teacher_name = teacher.full_name if teacher else payload.get("name")
+    started_at, course_id = session.started_at, course_of(db, session)
+    header = (
+        ("PAMUKKALE ÜNİVERSİTESİ", ""),
+        ("QR YOKLAMA RAPORU", ""),
+        ("", ""),
+        ("Hoca", teacher_name),
+        ("Ders", session.course_name),
+        ("SessionID", session.id),
+        ("Başlangıç", fmt_tr(session.started_at)),
+        ("Bitiş", fmt_tr(session.expires_at)),
+        ("Geç Kuralı", f"{late_minutes} dk sonrası GEÇ"),
     )
 
-    def generate():
+    def lines():
         sep = ";"
         yield "\ufeff"
-        yield "PAMUKKALE ÜNİVERSİTESİ\r\n"
-        yield "QR YOKLAMA RAPORU\r\n\r\n"
-
-        yield f"Hoca{sep}{(teacher.full_name if teacher else payload.get('name'))}\r\n"
-        yield f"Ders{sep}{session.course_name}\r\n"
-        yield f"SessionID{sep}{session.id}\r\n"
-        yield f"Başlangıç{sep}{fmt_tr(session.started_at)}\r\n"
-        yield f"Bitiş{sep}{fmt_tr(session.expires_at)}\r\n"
-        yield f"Geç Kuralı{sep}{late_minutes} dk sonrası GEÇ\r\n\r\n"
+        for key, value in header:
+            yield f"{key}{sep}{value}\r\n" if value != "" else f"{key}\r\n"
+        yield "\r\n"
 
         yield "ÖĞRENCİ LİSTESİ\r\n"
         yield f"ÖğrenciNo{sep}AdSoyad{sep}Saat(TR){sep}Durum{sep}İmza\r\n"
 
-        for s in students:
-            att = present_by_student_id.get(s.id)
-            saat = fmt_tr(att.timestamp) if att else ""
-            durum = compute_status(session, att, late_minutes)
-            yield f"{s.username}{sep}{s.full_name}{sep}{saat}{sep}{durum}{sep}\r\n"
+        # ✅ öğrenciler sayfa sayfa; her sayfa kendi kısa DB bağlantısıyla (yavaş istemci havuzu tutmaz)
+        for page in roster_pages(session_id, course_id):
+            for username, full_name, ts in page:
+                saat = fmt_tr(ts) if ts else ""
+                durum = late_status(started_at, ts, late_minutes) if ts else "YOK"
+                yield f"{username}{sep}{full_name}{sep}{saat}{sep}{durum}{sep}\r\n"
 
     filename = f"yoklama_{session.course_name}_{session.id}_rapor.csv".replace(" ", "_")
     return StreamingResponse(
-        generate(),
+        text_chunks(lines()),
         media_type="text/csv; charset=utf-8",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers=attachment(filename),
     )
 
 
+def roster_rows(db: Session, session_id: int, course_id: int | None):
+    """
+    (username, full_name, timestamp | None) — öğrenciler username sırasıyla, yield_per ile
+    parça parça okunur; yoklama zamanları tek sorguyla dict'e alınır (oturum başına küçük).
+    """
+    present = dict(
+        db.query(Attendance.student_id, Attendance.timestamp)
+        .filter(Attendance.session_id == session_id)
+        .all()
+    )
+    students = (
+        db.query(User.id, User.username, User.full_name)
+        .filter(roster_clause(db, [course_id], [session_id]))
+        .order_by(User.username.asc())
+        .execution_options(yield_per=1000)
+    )
+    for sid, username, full_name in students:
+        yield username, full_name, present.get(sid)
+
+
+def roster_pages(session_id: int, course_id: int | None, page_size: int = EXPORT_BATCH_ROWS):
+    """
+    roster_rows ile aynı satırlar, page_size'lık listeler halinde. Her sayfa username > son
+    keyset sorgusuyla ayrı bir kısa session'da okunur; bağlantı sayfalar arasında havuza döner.
+    """
+    with SessionLocal() as sdb:
+        present = dict(
+            sdb.query(Attendance.student_id, Attendance.timestamp)
+            .filter(Attendance.session_id == session_id)
+            .all()
+        )
+        roster = roster_clause(sdb, [course_id], [session_id])
+
+    last = ""
+    while True:
+        with SessionLocal() as sdb:
+            page = (
+                sdb.query(User.id, User.username, User.full_name)
+                .filter(roster, User.username > last)
+                .order_by(User.username.asc())
+                .limit(page_size)
+                .all()
+            )
+        if not page:
+            return
+        yield [(username, full_name, present.get(uid)) for uid, username, full_name in page]
+        last = page[-1][1]
+
+
 @app.get("/teacher/session/{session_id}/export.xlsx")
 def export_session_excel(session_id: int, request: Request, db: Session = Depends(get_db)):
     payload = require_teacher(request)
     if not payload:
         return RedirectResponse("/login", status_code=302)
 
+    from starlette.responses import StreamingResponse
+
     teacher_id = int(payload["sub"])
     teacher = db.query(User).filter(User.id == teacher_id).first()
 
@@ -699,95 +1216,303 @@ def export_session_excel(session_id: int, request: Request, db: Session = Depend
         return HTMLResponse("Yetkisiz / oturum bulunamadı.", status_code=403)
 
     late_minutes = LATE_MINUTES_DEFAULT
+    teacher_name = teacher.full_name if teacher else payload.get("name")
+    started_at, expires_at, course_name = session.started_at, session.expires_at, session.course_name
+    course_id = course_of(db, session)
+
+    def build() -> str:
+        # ✅ write-only workbook: satırlar geçici dosyaya akar, bellek öğrenci sayısından bağımsız
+        report = XlsxReport("YoklamaRaporu", [16, 32, 22, 12, 20])
+        report.row("PAMUKKALE ÜNİVERSİTESİ", bold=True)
+        report.row("QR YOKLAMA RAPORU", bold=True)
+        report.row()
+        report.row("Hoca", teacher_name)
+        report.row("Ders", course_name)
+        report.row("SessionID", session_id)
+        report.row("Başlangıç", utc_to_tr(started_at).replace(tzinfo=None))
+        report.row("Bitiş", utc_to_tr(expires_at).replace(tzinfo=None))
+        report.row("Geç Kuralı", f"{late_minutes} dk sonrası GEÇ")
+        report.row()
+        report.row("ÖğrenciNo", "Ad Soyad", "Saat(TR)", "Durum", "İmza", bold=True)
+
+        # DB bağlantısı yalnız tablo üretilirken tutulur, gönderim sırasında değil
+        with SessionLocal() as sdb:
+            for username, full_name, ts in roster_rows(sdb, session_id, course_id):
+                report.row(
+                    username,
+                    full_name,
+                    utc_to_tr(ts).replace(tzinfo=None) if ts else None,
+                    late_status(started_at, ts, late_minutes) if ts else "YOK",
+                    "",
+                )
+        return report.save_temp()
 
-    attendances = (
-        db.query(Attendance)
-        .filter(Attendance.session_id == session.id)
-        .order_by(Attendance.timestamp.asc())
-        .all()
+    def generate():
+        yield from stream_file(build())
+
+    filename = f"yoklama_{course_name}_{session_id}_rapor.xlsx".replace(" ", "_")
+    return StreamingResponse(
+        generate(),
+        media_type=XLSX_MEDIA_TYPE,
+        headers=attachment(filename),
     )
-    present_by_student_id = {a.student_id: a for a in attendances}
 
-    students = (
-        db.query(User)
-        .filter(User.role == "student")
-        .order_by(User.username.asc())
-        .all()
+
+# ---- Toplu export (dönem sonu: öğrenci × oturum matrisi) ----
+BULK_EXPORT_MAX_SESSIONS = int(os.getenv("BULK_EXPORT_MAX_SESSIONS", "200"))
+
+
+def tr_day_to_utc(value: str | None) -> datetime | None:
+    """
+    "YYYY-MM-DD" (TR günü) -> o günün başlangıcı, naive UTC. Geçersizse None.
+    """
+    if not value:
+        return None
+    try:
+        d = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=TR_TZ)
+    except ValueError:
+        return None
+    return d.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def attendance_matrix(db: Session, session_ids: list[int], course_ids: list[int | None]):
+    """
+    (user_id, username, full_name, {session_id: timestamp}) — derslerin öğrencileri, tek LEFT JOIN sorgusu.
+    Satırlar username sırasıyla yield_per ile okunur ve öğrenci başına gruplanır.
+    """
+    rows = (
+        db.query(User.id, User.username, User.full_name, Attendance.session_id, Attendance.timestamp)
+        .outerjoin(Attendance, and_(Attendance.student_id == User.id, Attendance.session_id.in_(session_ids)))
+        .filter(roster_clause(db, course_ids, session_ids))
+        .order_by(User.username.asc(), User.id.asc())
+        .execution_options(yield_per=1000)
     )
+    current = None
+    for uid, username, full_name, sid, ts in rows:
+        if current is None or current[0] != uid:
+            if current is not None:
+                yield current
+            current = (uid, username, full_name, {})
+        if sid is not None:
+            current[3][sid] = ts
+    if current is not None:
+        yield current
+
+
+@app.get("/teacher/export/bulk")
+def export_bulk(request: Request, db: Session = Depends(get_db)):
+    payload = require_teacher(request)
+    if not payload:
+        return RedirectResponse("/login", status_code=302)
+
+    from starlette.responses import StreamingResponse
+
+    teacher_id = int(payload["sub"])
+    params = request.query_params
+    fmt = params.get("format", "csv")
+    if fmt not in ("csv", "xlsx", "zip"):
+        return HTMLResponse("Geçersiz format (csv / xlsx / zip).", status_code=400)
+
+    q = db.query(ClassSession).filter(ClassSession.teacher_id == teacher_id)
+    course = (params.get("course") or "").strip()
+    if course:
+        q = q.filter(ClassSession.course_name == course)
+    start, end = tr_day_to_utc(params.get("from")), tr_day_to_utc(params.get("to"))
+    if start:
+        q = q.filter(ClassSession.started_at >= start)
+    if end:
+        q = q.filter(ClassSession.started_at < end + timedelta(days=1))
+    sessions = q.order_by(ClassSession.started_at.asc(), ClassSession.id.asc()).limit(BULK_EXPORT_MAX_SESSIONS + 1).all()
+
+    if not sessions:
+        return HTMLResponse("Seçilen aralıkta oturum yok.", status_code=404)
+    if len(sessions) > BULK_EXPORT_MAX_SESSIONS:
+        return HTMLResponse(f"En fazla {BULK_EXPORT_MAX_SESSIONS} oturum dışa aktarılabilir; aralığı daralt.",
+                            status_code=400)
+
+    late_minutes = LATE_MINUTES_DEFAULT
+    cols = [(s.id, s.course_name, s.started_at) for s in sessions]
+    ids = [c[0] for c in cols]
+    session_courses = session_course_ids(db, sessions)
+    course_ids = list(set(session_courses.values()))
+    # kaydı olan derslerin oturumlarında listede olmayan öğrenci "YOK" değil boş hücre alır
+    enrolled = course_rosters(db, course_ids)
+    column_rosters = [enrolled.get(session_courses[sid]) for sid in ids]
+    titles = [f"{name} {fmt_tr(started)[:16]}" for _, name, started in cols]
+
+    def status(uid, roster, sid_started, ts):
+        if ts:
+            return late_status(sid_started, ts, late_minutes)
+        return "YOK" if roster is None or uid in roster else ""
+
+    def matrix():
+        # DB bağlantısı üretim boyunca ayrı session'da; istek session'ı burada kapanmış olabilir
+        with SessionLocal() as sdb:
+            for uid, username, full_name, seen in attendance_matrix(sdb, ids, course_ids):
+                statuses = [
+                    status(uid, roster, started, seen.get(sid))
+                    for roster, (sid, _, started) in zip(column_rosters, cols)
+                ]
+                yield username, full_name, statuses, len(seen)
+
+    label = (course or "tum_dersler").replace(" ", "_")
+    filename = f"yoklama_{label}_{params.get('from') or 'bas'}_{params.get('to') or 'son'}"
+
+    if fmt == "csv":
+        sep = ";"
+
+        def lines():
+            yield "\ufeff"
+            yield sep.join(["ÖğrenciNo", "AdSoyad", *titles, "Katılım"]) + "\r\n"
+            for username, full_name, statuses, present in matrix():
+                yield sep.join([username, full_name, *statuses, f"{present}/{len(cols)}"]) + "\r\n"
 
-    def esc(x: str):
-        return (
-            (x or "")
-            .replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-            .replace("'", "&apos;")
+        return StreamingResponse(
+            text_chunks(lines()),
+            media_type="text/csv; charset=utf-8",
+            headers=attachment(filename + ".csv"),
         )
 
-    rows = []
-
-    def row(*cells):
-        out = "<Row>"
-        for c in cells:
-            out += f'<Cell><Data ss:Type="String">{esc(str(c))}</Data></Cell>'
-        out += "</Row>"
-        rows.append(out)
-
-    row("PAMUKKALE ÜNİVERSİTESİ")
-    row("QR YOKLAMA RAPORU")
-    row("")
-    row("Hoca", (teacher.full_name if teacher else payload.get("name")))
-    row("Ders", session.course_name)
-    row("SessionID", str(session.id))
-    row("Başlangıç", fmt_tr(session.started_at))
-    row("Bitiş", fmt_tr(session.expires_at))
-    row("Geç Kuralı", f"{late_minutes} dk sonrası GEÇ")
-    row("")
-    row("ÖğrenciNo", "Ad Soyad", "Saat(TR)", "Durum", "İmza")
+    if fmt == "xlsx":
+        def build() -> str:
+            report = XlsxReport("YoklamaMatrisi", [16, 32] + [14] * len(cols) + [10])
+            report.row("ÖğrenciNo", "Ad Soyad", *titles, "Katılım", bold=True)
+            for username, full_name, statuses, present in matrix():
+                report.row(username, full_name, *statuses, present)
+            return report.save_temp()
+
+        def generate():
+            yield from stream_file(build())
+
+        return StreamingResponse(
+            generate(),
+            media_type=XLSX_MEDIA_TYPE,
+            headers=attachment(filename + ".xlsx"),
+        )
 
-    for s in students:
-        att = present_by_student_id.get(s.id)
-        saat = fmt_tr(att.timestamp) if att else ""
-        durum = compute_status(session, att, late_minutes)
-        row(s.username, s.full_name, saat, durum, "")
-
-    xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<?mso-application progid="Excel.Sheet"?>
-<Workbook xmlns="urn:schemas-microsoft-com:office:spreadsheet"
- xmlns:o="urn:schemas-microsoft-com:office:office"
- xmlns:x="urn:schemas-microsoft-com:office:excel"
- xmlns:ss="urn:schemas-microsoft-com:office:spreadsheet"
- xmlns:html="http://www.w3.org/TR/REC-html40">
- <Worksheet ss:Name="YoklamaRaporu">
-  <Table>
-   {''.join(rows)}
-  </Table>
- </Worksheet>
-</Workbook>
-"""
-    filename = f"yoklama_{session.course_name}_{session.id}_rapor.xls".replace(" ", "_")
-    return Response(
-        content=xml,
-        media_type="application/vnd.ms-excel; charset=utf-8",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    # zip: oturum başına bir CSV; tek geçişte her oturumun dosyasına satır eklenir
+    teacher = db.query(User).filter(User.id == teacher_id).first()
+    teacher_name = teacher.full_name if teacher else payload.get("name")
+
+    def build_zip() -> str:
+        import tempfile
+
+        sep = ";"
+        files = []
+        handles = []
+        try:
+            for sid, name, started in cols:
+                f = tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="", suffix=".csv", delete=False)
+                f.write("\ufeff")
+                f.write(f"Hoca{sep}{teacher_name}\r\nDers{sep}{name}\r\nSessionID{sep}{sid}\r\n")
+                f.write(f"Başlangıç{sep}{fmt_tr(started)}\r\nGeç Kuralı{sep}{late_minutes} dk sonrası GEÇ\r\n\r\n")
+                f.write(f"ÖğrenciNo{sep}AdSoyad{sep}Durum{sep}İmza\r\n")
+                handles.append(f)
+                files.append((f"{sid}_{name}_{fmt_tr(started)[:10]}.csv".replace(" ", "_"), f.name))
+
+            for username, full_name, statuses, _ in matrix():
+                for f, st in zip(handles, statuses):
+                    f.write(f"{username}{sep}{full_name}{sep}{st}{sep}\r\n")
+        except BaseException:
+            for f in handles:
+                f.close()
+                os.unlink(f.name)
+            raise
+        for f in handles:
+            f.close()
+        return zip_temp(files)
+
+    def generate_zip():
+        yield from stream_file(build_zip())
+
+    return StreamingResponse(
+        generate_zip(),
+        media_type="application/zip",
+        headers=attachment(filename + ".zip"),
     )
 
 
+# ---- Yoklama delta'sı (panel yenileme / yeniden bağlanma) ----
+ATTENDANCE_DELTA_PAGE = int(os.getenv("ATTENDANCE_DELTA_PAGE", "500"))
+# ✅ timestamp Python'da (kuyruğa alınırken) verilir, satır sonra commit edilir: istemcinin tuttuğu
+# cursor'ın altına düşen geç commit'ler kaçmasın diye devam isteği bu kadar saniye geriden başlar.
+# Yazma kuyruğunun en uzun gecikmesinden (batch + yeniden denemeler) büyük olmalı.
+ATTENDANCE_DELTA_LOOKBACK_SECONDS = float(os.getenv("ATTENDANCE_DELTA_LOOKBACK_SECONDS", "30"))
+
+
+def attendance_delta(db: Session, session_id: int, started_at: datetime, after: tuple[datetime, int] | None,
+                     limit: int | None = None, lookback: float = 0) -> list[dict]:
+    """
+    (timestamp, id) > after olan yoklamalar, cursor sırasıyla; ix_attendances_session_ts ile
+    maliyet kaçırılan olay sayısı kadar. lookback > 0 ise after'dan bu kadar saniye öncesi de
+    döner (istemci öğrenci numarasıyla tekilleştirir).
+    """
+    q = (
+        db.query(Attendance.id, Attendance.timestamp, User.username, User.full_name)
+        .outerjoin(User, User.id == Attendance.student_id)
+        .filter(Attendance.session_id == session_id)
+    )
+    if after and lookback > 0:
+        q = q.filter(Attendance.timestamp > after[0] - timedelta(seconds=lookback))
+    elif after:
+        a_ts, a_id = after
+        q = q.filter(or_(
+            Attendance.timestamp > a_ts,
+            and_(Attendance.timestamp == a_ts, Attendance.id > a_id),
+        ))
+    q = q.order_by(Attendance.timestamp, Attendance.id)
+    if limit is not None:
+        q = q.limit(limit)
+    return [attendance_event(started_at, r.id, r.timestamp, r.username, r.full_name) for r in q]
+
+
+@app.get("/teacher/session/{session_id}/attendances")
+def teacher_attendance_delta(session_id: int, request: Request, db: Session = Depends(get_db)):
+    payload = require_teacher(request)
+    if not payload:
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    started_at = (
+        db.query(ClassSession.started_at)
+        .filter(ClassSession.id == session_id, ClassSession.teacher_id == int(payload["sub"]))
+        .scalar()
+    )
+    if started_at is None:
+        return JSONResponse({"error": "not found"}, status_code=404)
+
+    after = request.query_params.get("after")
+    cursor = decode_cursor(after)
+    if after and cursor is None:
+        return JSONResponse({"error": "invalid cursor"}, status_code=400)
+
+    # ilk istek (kaydedilmiş cursor) geriden başlar; sonraki sayfalar exact=1 ile saf keyset
+    lookback = 0 if request.query_params.get("exact") == "1" else ATTENDANCE_DELTA_LOOKBACK_SECONDS
+    events = attendance_delta(db, session_id, started_at, cursor, ATTENDANCE_DELTA_PAGE + 1, lookback)
+    more = len(events) > ATTENDANCE_DELTA_PAGE
+    events = events[:ATTENDANCE_DELTA_PAGE]
+    return JSONResponse({
+        "events": events,
+        "cursor": events[-1]["cursor"] if events else after,
+        "more": more,
+    })
+
+
 # ---- WebSocket (teacher realtime) ----
-@app.websocket("/ws/session/{session_id}")
-async def ws_session(session_id: int, websocket: WebSocket, db: Session = Depends(get_db)):
-    token = websocket.cookies.get(COOKIE_NAME)
-    if not token:
-        await websocket.close(code=4401)
-        return
+def session_owner(db: Session, session_id: int) -> int | None:
+    return db.query(ClassSession.teacher_id).filter(ClassSession.id == session_id).scalar()
 
-    from jose import jwt, JWTError
-    from .auth import SECRET_KEY, ALGORITHM
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError:
+def missed_attendances(db: Session, session_id: int, after: tuple[datetime, int]) -> list[dict]:
+    started_at = db.query(ClassSession.started_at).filter(ClassSession.id == session_id).scalar()
+    if started_at is None:
+        return []
+    return attendance_delta(db, session_id, started_at, after, lookback=ATTENDANCE_DELTA_LOOKBACK_SECONDS)
+
+
+@app.websocket("/ws/session/{session_id}")
+async def ws_session(session_id: int, websocket: WebSocket):
+    payload = get_user_from_cookie(websocket)
+    if not payload:
         await websocket.close(code=4401)
         return
 
@@ -796,14 +1521,41 @@ async def ws_session(session_id: int, websocket: WebSocket, db: Session = Depend
         return
 
     teacher_id = int(payload["sub"])
-    session = db.query(ClassSession).filter(ClassSession.id == session_id).first()
-    if not session or session.teacher_id != teacher_id:
+    owner_id = await run_db(session_owner, session_id)
+    if owner_id != teacher_id:
         await websocket.close(code=4403)
         return
 
     await ws_manager.connect(session_id, websocket)
+
+    # ✅ Yeniden bağlanma: ?after=<son görülen cursor> -> yalnız kaçırılanlar (önce bellekteki halka,
+    # kapsamıyorsa DB). Bağlantı önce kaydedildiği için arada gelen olay kaybolmaz; çift gelirse
+    # istemci öğrenci numarasıyla tekilleştirir.
+    after = websocket.query_params.get("after")
+    cursor = decode_cursor(after)
+    if cursor is not None:
+        missed = ws_manager.replay(session_id, after)
+        if missed is None:
+            missed = await run_db(missed_attendances, session_id, cursor)
+        if missed:
+            await ws_manager.send_replay(session_id, websocket, missed)
+
     try:
         while True:
             await websocket.receive_text()
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
         ws_manager.disconnect(session_id, websocket)
+
+
+# ✅ Prometheus scrape ucu (worker başına değerler)
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    if not metrics.enabled:
+        return Response(status_code=404)
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,211 @@
+import os
+import time
+from bisect import bisect_left
+from threading import get_ident
+
+from sqlalchemy import event
+
+# /metrics (Prometheus metin formatı). METRICS_TOKEN verilirse "Authorization: Bearer <token>" istenir.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Kova sınırları (saniye)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+OPERATION_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Histogram:
+    """
+    Etiket değerleri (tuple) -> [kova sayaçları..., +Inf, toplam]. Sıcak yolda kilit yok: her thread
+    kendi parçasına (shard) yazar (event loop bir, threadpool worker'ları birer); render parçaları
+    toplar. Kovalar kayıtta birikimli değil, birikimli hali yalnız render'da hesaplanır.
+    """
+
+    __slots__ = ("registry", "name", "help", "labelnames", "buckets", "shards")
+
+    def __init__(self, registry, name: str, help: str, labelnames: tuple, buckets: tuple):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.shards = {}  # thread ident -> {labels: [...]}
+
+    def observe(self, labels: tuple, value: float):
+        if not self.registry.enabled:
+            return
+        shard = self.shards.get(get_ident())
+        if shard is None:
+            shard = self.shards.setdefault(get_ident(), {})
+        s = shard.get(labels)
+        if s is None:
+            s = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        s[bisect_left(self.buckets, value)] += 1
+        s[-1] += value
+
+    def collect(self) -> dict:
+        merged = {}
+        for shard in list(self.shards.values()):
+            for labels, s in list(shard.items()):
+                m = merged.get(labels)
+                if m is None:
+                    merged[labels] = list(s)
+                else:
+                    for i, v in enumerate(s):
+                        m[i] += v
+        return merged
+
+    def render(self, out: list):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        for labels, s in sorted(self.collect().items()):
+            total = 0
+            for bound, n in zip(self.buckets + ("+Inf",), s):
+                total += n
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {total}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(s[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {total}")
+
+
+class Collected:
+    """
+    Değeri scrape anında fn() ile okunan gauge/counter (sıcak yolda hiç maliyeti yok).
+    fn bir sayı ya da {etiket tuple: sayı} döndürür.
+    """
+
+    __slots__ = ("name", "help", "kind", "labelnames", "fn")
+
+    def __init__(self, name: str, help: str, kind: str, fn, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.fn = fn
+
+    def render(self, out: list):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, v in sorted(items):
+            out.append(f"{self.name}{_labels(self.labelnames, labels)} {_num(v)}")
+
+
+class Metrics:
+    """
+    Süreç içi metrik kaydı. --workers N ile her worker kendi değerlerini verir (Prometheus
+    her worker'ı ayrı hedef olarak toplamalı ya da değerler worker başına okunmalı).
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.items = {}
+
+    def histogram(self, name: str, help: str, labelnames: tuple, buckets: tuple) -> Histogram:
+        return self.items.setdefault(name, Histogram(self, name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, fn, labelnames: tuple = ()):
+        self.items[name] = Collected(name, help, "gauge", fn, labelnames)
+
+    def counter(self, name: str, help: str, fn, labelnames: tuple = ()):
+        self.items[name] = Collected(name, help, "counter", fn, labelnames)
+
+    def render(self) -> str:
+        out = []
+        for item in self.items.values():
+            item.render(out)
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
+
+request_seconds = metrics.histogram(
+    "yoklama_http_request_duration_seconds", "HTTP istek süresi (route şablonu bazında, gövde dahil)",
+    ("method", "route", "status"), REQUEST_BUCKETS,
+)
+db_statement_seconds = metrics.histogram(
+    "yoklama_db_statement_duration_seconds", "SQL ifadesi süresi (sayısı _count)",
+    ("statement",), DB_BUCKETS,
+)
+operation_seconds = metrics.histogram(
+    "yoklama_operation_duration_seconds", "Sıcak yol işlemleri: argon2, qr render, ws fan-out, yoklama batch yazımı",
+    ("operation",), OPERATION_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """
+    Saf ASGI middleware: süre, yanıt gövdesi bitene kadar ölçülür (akışlı export'lar dahil).
+    Etiket route şablonudur (/s/{session_code}/checkin); eşleşmeyen istekler "other".
+    """
+
+    def __init__(self, app, histogram: Histogram = request_seconds):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.histogram.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(
+                (scope["method"], route.path if route is not None else "other", status[0]),
+                time.perf_counter() - t0,
+            )
+
+
+STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def instrument_engine(engine, histogram: Histogram = db_statement_seconds):
+    """
+    Engine event'leriyle her SQL ifadesinin süresi (ifade türüne göre). Async engine için
+    engine.sync_engine verilir.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if histogram.registry.enabled:
+            context._metrics_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        t0 = getattr(context, "_metrics_t0", None)
+        if t0 is None:
+            return
+        kind = statement.lstrip()[:6].upper()
+        histogram.observe((kind if kind in STATEMENT_KINDS else "OTHER",), time.perf_counter() - t0)
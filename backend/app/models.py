@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from .database import Base
@@ -11,9 +11,10 @@ from sqlalchemy.sql import func
 class DeviceCheckin(Base):
     __tablename__ = "device_checkins"
 
-    id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("class_sessions.id"), nullable=False, index=True)
-    device_id = Column(String(64), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    # session_id / device_id aramaları uq_session_device (session_id, device_id) ile karşılanır
+    session_id = Column(Integer, ForeignKey("class_sessions.id"), nullable=False)
+    device_id = Column(String(64), nullable=False)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=False), server_default=func.now(), nullable=False)
 
@@ -25,8 +26,12 @@ class DeviceCheckin(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Raporlar: role = 'student' + username sırası / keyset
+        Index("ix_users_role_username", "role", "username"),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     username: Mapped[str] = mapped_column(String(50), unique=True, index=True)  # teacher: yavuz, student: 2025001...
     full_name: Mapped[str] = mapped_column(String(150))
     password_hash: Mapped[str] = mapped_column(String(255))
@@ -39,30 +44,75 @@ class User(Base):
 
 class ClassSession(Base):
     __tablename__ = "class_sessions"
+    __table_args__ = (
+        # Geçmiş sayfası: teacher_id filtresi + (started_at, id) keyset sıralaması
+        Index("ix_class_sessions_teacher_started", "teacher_id", "started_at", "id"),
+        # Yalnız aktif oturumlar (kısmi indeks): panelde hocanın aktif oturumu, süre dolumu taraması
+        Index("ix_class_sessions_teacher_active", "teacher_id", "started_at",
+              sqlite_where=text("is_active = 1"), postgresql_where=text("is_active")),
+        Index("ix_class_sessions_active_expires", "expires_at",
+              sqlite_where=text("is_active = 1"), postgresql_where=text("is_active")),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     course_name: Mapped[str] = mapped_column(String(200), index=True)
     session_code: Mapped[str] = mapped_column(String(32), unique=True, index=True)
 
     teacher_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    # Enrollment öncesi oturumlarda boş; boşsa hocanın aynı adlı dersi, o da yoksa tüm öğrenciler (roster.py)
+    course_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("courses.id"), nullable=True, index=True)
 
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
     teacher = relationship("User", back_populates="sessions")
+    course = relationship("Course", back_populates="sessions")
     attendances = relationship("Attendance", back_populates="session")
 
 
+class Course(Base):
+    __tablename__ = "courses"
+    __table_args__ = (
+        UniqueConstraint("teacher_id", "name", name="uq_course_teacher_name"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    teacher_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
+    name: Mapped[str] = mapped_column(String(200))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    sessions = relationship("ClassSession", back_populates="course")
+    enrollments = relationship("Enrollment", back_populates="course")
+
+
+class Enrollment(Base):
+    __tablename__ = "enrollments"
+    __table_args__ = (
+        # (course_id, student_id) indeksi: ders listesi + "kayıtlı mı" kontrolü
+        UniqueConstraint("course_id", "student_id", name="uq_course_student"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    course_id: Mapped[int] = mapped_column(Integer, ForeignKey("courses.id"))
+    student_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    course = relationship("Course", back_populates="enrollments")
+
+
 class Attendance(Base):
     __tablename__ = "attendances"
     __table_args__ = (
         UniqueConstraint("session_id", "student_id", name="uq_session_student"),
+        # Panel listesi / canlı akış: oturumun yoklamaları zaman sırasıyla
+        Index("ix_attendances_session_ts", "session_id", "timestamp"),
     )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     session_id: Mapped[int] = mapped_column(Integer, ForeignKey("class_sessions.id"))
-    student_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    # öğrenci tarafı: roster birleşimi, kullanıcı silme
+    student_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     session = relationship("ClassSession", back_populates="attendances")
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+
+from .metrics import operation_seconds
+
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "256"))
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+def render_qr(data: str, fmt: str) -> bytes:
+    buf = BytesIO()
+    if fmt == "svg":
+        img = qrcode.make(data, image_factory=qrcode.image.svg.SvgPathImage)
+        img.save(buf)
+    else:
+        img = qrcode.make(data)
+        img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class QRCache:
+    """
+    (session_code, format) -> (bytes, etag). LRU; oturum kapanınca invalidate edilir.
+    qr_png sync route olduğu için threadpool'dan çağrılır, erişim kilitli.
+    """
+
+    def __init__(self, maxsize: int = QR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_code: str, data: str, fmt: str = "png") -> tuple[bytes, str]:
+        key = (session_code, fmt)
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None and item[2] == data:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return item[0], item[1]
+
+        # render kilit dışında; aynı anda iki istek gelirse ikisi de üretir, sonuç aynı
+        t0 = time.perf_counter()
+        body = render_qr(data, fmt)
+        operation_seconds.observe(("qr_render_" + fmt,), time.perf_counter() - t0)
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        with self.lock:
+            self.misses += 1
+            self.items[key] = (body, etag, data)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+        return body, etag
+
+    def invalidate(self, session_code: str):
+        with self.lock:
+            for fmt in MEDIA_TYPES:
+                self.items.pop((session_code, fmt), None)
@@ -0,0 +1,56 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from .auth import SECRET_KEY
+
+# 0 = kapalı (QR sabit session_code taşır). >0 ise QR her N saniyede yeni token taşır.
+QR_ROTATE_SECONDS = int(os.getenv("QR_ROTATE_SECONDS", "0"))
+# Okutma + login süresi için kaç önceki pencere de kabul edilsin
+QR_TOKEN_GRACE_WINDOWS = int(os.getenv("QR_TOKEN_GRACE_WINDOWS", "2"))
+
+_KEY = hashlib.sha256(("qr-token:" + SECRET_KEY).encode()).digest()
+
+
+def current_window(now: float | None = None, rotate_seconds: int = QR_ROTATE_SECONDS) -> int:
+    return int((now if now is not None else time.time()) // rotate_seconds)
+
+
+def window_remaining(now: float | None = None, rotate_seconds: int = QR_ROTATE_SECONDS) -> int:
+    now = now if now is not None else time.time()
+    return max(1, int(rotate_seconds - (now % rotate_seconds)))
+
+
+def _sig(session_id: int, window: int) -> str:
+    mac = hmac.new(_KEY, f"{session_id}.{window}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(mac[:12]).decode().rstrip("=")
+
+
+def make_token(session_id: int, window: int) -> str:
+    return f"{session_id}.{window}.{_sig(session_id, window)}"
+
+
+def verify_token(token: str | None, now: float | None = None,
+                 rotate_seconds: int = QR_ROTATE_SECONDS,
+                 grace_windows: int = QR_TOKEN_GRACE_WINDOWS) -> int | None:
+    """
+    İmza ve zaman penceresi geçerliyse session_id döner, değilse None. DB'ye dokunmaz.
+    """
+    if not token:
+        return None
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        session_id, window = int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
+    now_window = current_window(now, rotate_seconds)
+    if window > now_window or window < now_window - grace_windows:
+        return None
+    if not hmac.compare_digest(parts[2], _sig(session_id, window)):
+        return None
+    return session_id
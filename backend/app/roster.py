@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+
+from .models import User, Course, Enrollment, Attendance
+
+
+def get_or_create_course(db: Session, teacher_id: int, name: str) -> Course:
+    course = db.query(Course).filter(Course.teacher_id == teacher_id, Course.name == name).first()
+    if course is None:
+        course = Course(teacher_id=teacher_id, name=name, created_at=datetime.utcnow())
+        db.add(course)
+        db.flush()
+    return course
+
+
+def session_course_ids(db: Session, sessions) -> dict[int, int | None]:
+    """
+    oturum id -> ders id. Derse bağlanmamış (enrollment öncesi) oturum, hocanın aynı adlı dersine
+    bağlanır (uq_course_teacher_name, tek sorgu); öyle bir ders yoksa None.
+    """
+    out = {s.id: s.course_id for s in sessions}
+    unlinked = [s for s in sessions if s.course_id is None]
+    if unlinked:
+        by_name = {
+            (teacher_id, name): course_id
+            for course_id, teacher_id, name in db.execute(
+                select(Course.id, Course.teacher_id, Course.name).where(
+                    Course.teacher_id.in_({s.teacher_id for s in unlinked}),
+                    Course.name.in_({s.course_name for s in unlinked}),
+                )
+            )
+        }
+        for s in unlinked:
+            out[s.id] = by_name.get((s.teacher_id, s.course_name))
+    return out
+
+
+def course_of(db: Session, session) -> int | None:
+    return session_course_ids(db, [session])[session.id]
+
+
+def course_rosters(db: Session, course_ids: list[int | None]) -> dict[int, set[int]]:
+    """
+    ders id -> kayıtlı öğrenci id'leri. Kaydı olmayan ders sözlükte yoktur (listesi tüm öğrenciler).
+    """
+    rosters = {}
+    ids = {c for c in course_ids if c is not None}
+    if ids:
+        for course_id, student_id in db.execute(
+            select(Enrollment.course_id, Enrollment.student_id).where(Enrollment.course_id.in_(ids))
+        ):
+            rosters.setdefault(course_id, set()).add(student_id)
+    return rosters
+
+
+def roster_clause(db: Session, course_ids: list[int | None], session_ids: list[int]):
+    """
+    Rapor / sayım sorguları için User filtresi: derslerin listelerinin birleşimi. Karar ders
+    başınadır: kaydı (enrollment) olan dersin listesi kayıtlı öğrencileri, kaydı olmayan ya da
+    bulunamayan dersinki tüm öğrencilerdir (enrollment öncesi davranış). Bu oturumlara katılanlar
+    her zaman listededir (kayıtsız katılan da görünsün).
+
+    Birden çok dersli seçimde hücre bazında ayrım için course_rosters.
+    """
+    ids = {c for c in course_ids if c is not None}
+    enrolled_courses = set(db.scalars(
+        select(Enrollment.course_id).where(Enrollment.course_id.in_(ids)).distinct()
+    )) if ids else set()
+    if None in course_ids or enrolled_courses != ids:
+        return User.role == "student"
+
+    return User.id.in_(union(
+        select(Enrollment.student_id).where(Enrollment.course_id.in_(ids)),
+        select(Attendance.student_id).where(Attendance.session_id.in_(session_ids)),
+    ))
+
+
+def enroll(db: Session, course: Course, student_ids: list[int]) -> int:
+    """
+    Öğrencileri derse ekler (zaten kayıtlı olanları atlar); eklenen sayısını döner.
+    """
+    existing = set(db.scalars(
+        select(Enrollment.student_id)
+        .where(Enrollment.course_id == course.id, Enrollment.student_id.in_(student_ids))
+    ))
+    new = [sid for sid in dict.fromkeys(student_ids) if sid not in existing]
+    db.add_all([Enrollment(course_id=course.id, student_id=sid) for sid in new])
+    return len(new)
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from .models import User
-from .auth import hash_password
+from .auth import hash_password, password_pool
 
 TEACHER_USERNAME = "yavuz"
 TEACHER_PASSWORD = "YavuzSumer@123"
@@ -8,14 +8,7 @@ TEACHER_NAME = "Dr. Yavuz Sümer"
 
 def seed_users(db: Session):
     # Teacher
-    t = db.query(User).filter(User.username == TEACHER_USERNAME).first()
-    if not t:
-        db.add(User(
-            username=TEACHER_USERNAME,
-            full_name=TEACHER_NAME,
-            password_hash=hash_password(TEACHER_PASSWORD),
-            role="teacher"
-        ))
+    wanted = [(TEACHER_USERNAME, TEACHER_NAME, TEACHER_PASSWORD, "teacher")]
 
     # 30 Students: 2025001..2025030
     # Password: Sifre2025!001..Sifre2025!030
@@ -23,14 +16,21 @@ def seed_users(db: Session):
         username = f"2025{str(i).zfill(3)}"
         full_name = f"Ogrenci {str(i).zfill(2)}"
         password = f"Sifre2025!{str(i).zfill(3)}"
+        wanted.append((username, full_name, password, "student"))
 
-        s = db.query(User).filter(User.username == username).first()
-        if not s:
-            db.add(User(
-                username=username,
-                full_name=full_name,
-                password_hash=hash_password(password),
-                role="student"
-            ))
+    # ✅ Var olanlar tek IN sorgusuyla
+    existing = {
+        u for (u,) in db.query(User.username).filter(User.username.in_([w[0] for w in wanted]))
+    }
+    missing = [w for w in wanted if w[0] not in existing]
+    if not missing:
+        return
 
+    # ✅ Eksiklerin hash'leri Argon2 havuzunda paralel
+    hashes = password_pool.executor.map(hash_password, [w[2] for w in missing])
+
+    db.add_all([
+        User(username=username, full_name=full_name, password_hash=h, role=role)
+        for (username, full_name, _, role), h in zip(missing, hashes)
+    ])
     db.commit()
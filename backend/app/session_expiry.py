@@ -0,0 +1,182 @@
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .database import run_db
+from .models import ClassSession
+
+# Süresi dolan oturumlar tek UPDATE ... WHERE id IN (...) ile en fazla bu kadarlık gruplar halinde kapatılır.
+SESSION_EXPIRY_BATCH_SIZE = int(os.getenv("SESSION_EXPIRY_BATCH_SIZE", "500"))
+# UPDATE hata verirse (DB geçici olarak yok) bu kadar saniye sonra tekrar denenir.
+SESSION_EXPIRY_RETRY_SECONDS = float(os.getenv("SESSION_EXPIRY_RETRY_SECONDS", "5"))
+# Saat atlarsa (NTP) uzun uykuda kalınmasın diye en uzun bekleme
+SESSION_EXPIRY_MAX_SLEEP = 60.0
+
+
+def active_deadlines(db: Session) -> list:
+    """
+    Aktif oturumların (id, session_code, expires_at) listesi; ix_class_sessions_active_expires kullanılır.
+    """
+    return db.execute(
+        select(ClassSession.id, ClassSession.session_code, ClassSession.expires_at)
+        .where(ClassSession.is_active == True)
+        .order_by(ClassSession.expires_at)
+    ).all()
+
+
+def close_expired(db: Session, session_ids: list[int], now: datetime) -> list:
+    """
+    Verilen oturumlardan hâlâ aktif ve süresi dolmuş olanları tek UPDATE ile kapatır.
+    Bu çağrının kapattıkları (id, session_code) döner: hocanın durdurduğu ya da başka
+    worker'ın kapattığı satırlar dönmez, "oturum kapandı" olayı bir kez yayınlanır.
+    """
+    closed = db.execute(
+        update(ClassSession)
+        .where(
+            ClassSession.id.in_(session_ids),
+            ClassSession.is_active == True,
+            ClassSession.expires_at <= now,
+        )
+        .values(is_active=False)
+        .returning(ClassSession.id, ClassSession.session_code)
+    ).all()
+    db.commit()
+    return closed
+
+
+class SessionExpiryScheduler:
+    """
+    Aktif oturumların bitişleri bellekte min-heap'te (expires_at, id, code) tutulur; task en yakın
+    bitişe kadar uyur, zamanı gelenleri toplu UPDATE ile kapatır. Açılışta heap DB'den doldurulur,
+    sonra registry'ye giren her oturum schedule() ile eklenir.
+
+    Her worker kendi heap'ini tutar: kapanışı yalnız UPDATE'i kazanan worker yayınlar,
+    önbellek temizliği (on_due) ise her worker'da yapılır.
+    """
+
+    def __init__(self, on_due, on_closed, batch_size: int = SESSION_EXPIRY_BATCH_SIZE,
+                 retry_seconds: float = SESSION_EXPIRY_RETRY_SECONDS):
+        self.on_due = on_due  # fn(session_code) — bitişi gelen oturum, bu worker'ın önbellekleri
+        self.on_closed = on_closed  # async fn(session_id, session_code, reason) — "oturum kapandı" duyurusu
+        self.batch_size = max(1, batch_size)
+        self.retry_seconds = retry_seconds
+        self.heap = []
+        self.deadlines = {}  # session_id -> heap'teki geçerli expires_at (eski kayıtlar atlanır)
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.wake: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+        self.notify_tasks = set()
+
+        self.closed = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def start(self):
+        if self.task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        for session_id, code, expires_at in await run_db(active_deadlines):
+            self._push(session_id, code, expires_at)
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        self.loop = None
+
+    def _call(self, fn, *args):
+        """
+        fn'i event loop'ta çalıştırır; sync route'lar (threadpool) da çağırabilir.
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            fn(*args)
+        else:
+            loop.call_soon_threadsafe(fn, *args)
+
+    def schedule(self, session_id: int, session_code: str, expires_at: datetime):
+        self._call(self._push, session_id, session_code, expires_at)
+
+    def announce(self, sessions: list, reason: str):
+        """
+        Hoca durdurunca / silince kapanan oturumlar için de aynı duyuru; sessions: (id, session_code).
+        """
+        for s in sessions:
+            self._call(self._notify, s[0], s[1], reason)
+
+    def _notify(self, session_id: int, session_code: str, reason: str):
+        task = asyncio.create_task(self.on_closed(session_id, session_code, reason))
+        self.notify_tasks.add(task)
+        task.add_done_callback(self.notify_tasks.discard)
+
+    def _push(self, session_id: int, session_code: str, expires_at: datetime):
+        if self.deadlines.get(session_id) == expires_at:
+            return
+        self.deadlines[session_id] = expires_at
+        heapq.heappush(self.heap, (expires_at, session_id, session_code))
+        if self.heap[0][1] == session_id:
+            self.wake.set()
+
+    def _pop_due(self, now: datetime) -> list:
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            expires_at, session_id, code = heapq.heappop(self.heap)
+            if self.deadlines.get(session_id) != expires_at:
+                continue  # bitişi değişmiş, eski kayıt
+            del self.deadlines[session_id]
+            due.append((expires_at, session_id, code))
+        return due
+
+    async def _run(self):
+        while True:
+            if self.heap:
+                delay = (self.heap[0][0] - datetime.utcnow()).total_seconds()
+            else:
+                delay = SESSION_EXPIRY_MAX_SLEEP
+            if delay > 0:
+                # daha yakın bir bitiş eklenirse wake ile erken uyanır
+                try:
+                    await asyncio.wait_for(self.wake.wait(), min(delay, SESSION_EXPIRY_MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                self.wake.clear()
+                continue
+
+            now = datetime.utcnow()
+            due = self._pop_due(now)
+            if not due:
+                continue
+            try:
+                closed = await run_db(close_expired, [d[1] for d in due], now)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                retry_at = now + timedelta(seconds=self.retry_seconds)
+                for _, session_id, code in due:
+                    self._push(session_id, code, retry_at)
+                continue
+
+            self.batches += 1
+            self.closed += len(closed)
+            for _, _, code in due:
+                self.on_due(code)
+            for session_id, code in closed:
+                self._notify(session_id, code, "expired")
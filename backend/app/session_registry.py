@@ -0,0 +1,106 @@
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from .models import ClassSession
+
+# Başka worker'da kapatılan / silinen oturum kontrol mesajıyla hemen düşer (main.drop_gone_session); mesaj
+# kaybolursa diye kayıt yine de en fazla bu kadar saniye DB'ye sorulmadan kullanılır.
+ACTIVE_SESSION_RECHECK_SECONDS = int(os.getenv("ACTIVE_SESSION_RECHECK_SECONDS", "30"))
+
+
+class ActiveSession:
+    """
+    ClassSession'ın DB'den bağımsız, salt-okunur kopyası (template'ler aynı alanları kullanır).
+    """
+    __slots__ = ("id", "session_code", "course_name", "course_id", "teacher_id", "is_active", "started_at",
+                 "expires_at", "cached_until")
+
+    def __init__(self, s: ClassSession, recheck_seconds: int):
+        self.id = s.id
+        self.session_code = s.session_code
+        self.course_name = s.course_name
+        self.course_id = s.course_id
+        self.teacher_id = s.teacher_id
+        self.is_active = s.is_active
+        self.started_at = s.started_at
+        self.expires_at = s.expires_at
+        self.cached_until = time.monotonic() + recheck_seconds
+
+
+class ActiveSessionRegistry:
+    """
+    session_code -> ActiveSession. teacher_start doldurur, teacher_stop / süre dolumu temizler.
+    Bulunamazsa DB'ye düşer (restart sonrası da çalışsın diye).
+    """
+
+    def __init__(self, recheck_seconds: int = ACTIVE_SESSION_RECHECK_SECONDS):
+        self.recheck_seconds = recheck_seconds
+        self.by_code = {}
+        self.listeners = []  # fn(ActiveSession) — evict olunca çağrılır
+        self.put_listeners = []  # fn(ActiveSession) — kaydedilince çağrılır
+
+        self.hits = 0
+        self.misses = 0
+
+    def on_evict(self, fn):
+        self.listeners.append(fn)
+        return fn
+
+    def on_put(self, fn):
+        self.put_listeners.append(fn)
+        return fn
+
+    def put(self, s: ClassSession) -> ActiveSession:
+        entry = ActiveSession(s, self.recheck_seconds)
+        self.by_code[entry.session_code] = entry
+        for fn in self.put_listeners:
+            fn(entry)
+        return entry
+
+    def remove(self, session_code: str):
+        entry = self.by_code.pop(session_code, None)
+        if entry is not None:
+            for fn in self.listeners:
+                fn(entry)
+
+    def get(self, session_code: str, now: datetime | None = None) -> ActiveSession | None:
+        entry = self.by_code.get(session_code)
+        if entry is None:
+            return None
+        now = now or datetime.utcnow()
+        if now > entry.expires_at:
+            self.remove(session_code)
+            return None
+        if time.monotonic() > entry.cached_until:
+            # süresi dolmadı ama DB'den tekrar doğrulansın (kapanış mesajı kaçmış olabilir); kayda bağlı
+            # önbellekler de düşsün ki kapanmışsa geride kalmasınlar
+            self.remove(session_code)
+            return None
+        self.hits += 1
+        return entry
+
+    def prune(self, now: datetime | None = None):
+        now = now or datetime.utcnow()
+        for code in [c for c, e in self.by_code.items() if now > e.expires_at]:
+            self.remove(code)
+
+    def lookup(self, db: Session, session_code: str):
+        """
+        Aktif oturumu bellekten döner. Yoksa DB'ye bakar; aktifse kaydeder.
+        Kapalı / süresi dolmuş satır olduğu gibi döner (çağıran 400 versin), hiç yoksa None.
+        """
+        now = datetime.utcnow()
+        entry = self.get(session_code, now)
+        if entry is not None:
+            return entry
+
+        self.misses += 1
+        s = db.query(ClassSession).filter(ClassSession.session_code == session_code).first()
+        if s is None:
+            return None
+        if s.is_active and now <= s.expires_at:
+            return self.put(s)
+        return s
@@ -0,0 +1,294 @@
+import asyncio
+import csv
+import os
+import shutil
+import tempfile
+import time
+from collections.abc import Callable, Iterable, Iterator
+from itertools import islice
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .auth import hash_password
+from .database import SessionLocal, dialect_insert
+from .models import User, Course
+from .roster import enroll
+
+# Her parça kendi transaction'ında: mevcut kullanıcı kontrolü tek IN sorgusu, INSERT tek executemany.
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+# CLI: hash'ler bu kadar süreçte. Web yüklemesi login havuzunu tıkamasın diye ayrı, küçük bir havuz kullanır.
+IMPORT_HASH_WORKERS = int(os.getenv("IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+IMPORT_UPLOAD_HASH_WORKERS = int(os.getenv("IMPORT_UPLOAD_HASH_WORKERS", "1"))
+IMPORT_UPLOAD_MAX_BYTES = int(os.getenv("IMPORT_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+
+IMPORT_EXTENSIONS = (".csv", ".xlsx")
+
+# Başlık satırı bu adlardan biriyle eşleşirse kolon sırası serbest; başlık yoksa: numara, ad soyad, şifre
+# (Türkçe karakterler ASCII'ye indirgenip karşılaştırılır: "Öğrenci No" -> "ogrenci_no")
+HEADER_ALIASES = {
+    "username": {"username", "kullanici_adi", "ogrenci_no", "numara", "no"},
+    "full_name": {"full_name", "ad_soyad", "adsoyad", "isim", "ad"},
+    "password": {"password", "sifre", "parola"},
+}
+HEADER_ASCII = str.maketrans("ıİşŞğĞüÜöÖçÇ", "iIsSgGuUoOcC")
+FIELDS = ("username", "full_name", "password")
+
+USERNAME_MAX = User.__table__.c.username.type.length
+FULL_NAME_MAX = User.__table__.c.full_name.type.length
+
+
+def _cell(value) -> str:
+    # Excel numaraları sayı olarak tutar: 2025001.0 -> "2025001"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if value is None else str(value).strip()
+
+
+def _header_key(value) -> str:
+    return _cell(value).translate(HEADER_ASCII).lower().replace(" ", "_")
+
+
+def read_rows(path: str) -> Iterator[tuple]:
+    """
+    CSV (ayraç ; , ya da tab, UTF-8 / BOM'lu) ya da XLSX (openpyxl read_only, satır satır) okur;
+    dosya belleğe alınmaz.
+    """
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from wb.active.iter_rows(values_only=True)
+        finally:
+            wb.close()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from (tuple(r) for r in csv.reader(f, dialect))
+
+
+def save_upload(src, suffix: str, max_bytes: int = IMPORT_UPLOAD_MAX_BYTES) -> str | None:
+    """
+    Yüklenen dosyayı parça parça geçici dosyaya kopyalar (openpyxl ve arka plan işi yoldan okur;
+    istek bitince UploadFile kapanır). max_bytes'tan büyükse None döner.
+    """
+    src.seek(0, os.SEEK_END)
+    if src.tell() > max_bytes:
+        return None
+    src.seek(0)
+    fd, path = tempfile.mkstemp(prefix="yoklama-import-", suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(src, out, 64 * 1024)
+    return path
+
+
+def roster_records(rows: Iterable[tuple]) -> Iterator[tuple[str, str, str] | None]:
+    """
+    Ham satırları (numara, ad soyad, şifre) üçlüsüne çevirir; eksik / fazla uzun satır için None.
+    Boş satırlar atlanır.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+
+    keys = [_header_key(v) for v in first]
+    columns = {}
+    for field in FIELDS:
+        for i, k in enumerate(keys):
+            if k in HEADER_ALIASES[field]:
+                columns[field] = i
+                break
+
+    if len(columns) == len(FIELDS):
+        order = [columns[f] for f in FIELDS]
+    else:
+        order = [0, 1, 2]
+        rows = _chain_first(first, rows)
+
+    for row in rows:
+        values = [_cell(row[i]) if i < len(row) else "" for i in order]
+        if not any(values):
+            continue
+        username, full_name, password = values
+        if not username or not full_name or not password \
+                or len(username) > USERNAME_MAX or len(full_name) > FULL_NAME_MAX:
+            yield None
+            continue
+        yield username, full_name, password
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+class ImportReport:
+    __slots__ = ("rows", "inserted", "existing", "duplicates", "invalid", "enrolled",
+                 "started", "elapsed", "done", "error", "cancelled", "task")
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.existing = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.enrolled = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.done = False
+        self.error = None
+        self.cancelled = False
+        self.task: asyncio.Task | None = None
+
+    @property
+    def rate(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows, "inserted": self.inserted, "existing": self.existing,
+            "duplicates": self.duplicates, "invalid": self.invalid, "enrolled": self.enrolled,
+            "elapsed_s": round(self.elapsed, 2), "rows_per_s": round(self.rate, 1),
+            "done": self.done, "error": self.error,
+        }
+
+
+def import_chunk(db: Session, chunk: list[tuple[str, str, str]], hash_map: Callable,
+                 course_id: int | None = None) -> tuple[int, int, int]:
+    """
+    Bir parçayı yazar ve commit eder: (eklenen, zaten var olan, derse eklenen).
+    Var olan kullanıcılar hash'lenmeden atlanır; yarıda kalan import aynı dosyayla yeniden
+    çalıştırılınca bitmiş parçalar yalnız bir SELECT'e mal olur. Aynı anda çalışan başka bir
+    import'la yarışta ON CONFLICT (username) DO NOTHING kaybedeni sessizce düşürür.
+    """
+    usernames = [r[0] for r in chunk]
+    existing = set(db.scalars(select(User.username).where(User.username.in_(usernames))))
+    new = [r for r in chunk if r[0] not in existing]
+
+    inserted = 0
+    if new:
+        hashes = hash_map(hash_password, [r[2] for r in new])
+        insert = dialect_insert(db.get_bind())
+        inserted = len(db.execute(
+            insert(User)
+            .values([
+                {"username": u, "full_name": n, "password_hash": h, "role": "student"}
+                for (u, n, _), h in zip(new, hashes)
+            ])
+            .on_conflict_do_nothing(index_elements=["username"])
+            .returning(User.id)
+        ).all())
+
+    enrolled = 0
+    if course_id is not None:
+        student_ids = list(db.scalars(
+            select(User.id).where(User.username.in_(usernames), User.role == "student")
+        ))
+        enrolled = enroll(db, db.get(Course, course_id), student_ids)
+
+    db.commit()
+    return inserted, len(chunk) - len(new), enrolled
+
+
+def import_students(records: Iterable[tuple[str, str, str] | None], hash_map: Callable,
+                    course_id: int | None = None, chunk_rows: int = IMPORT_CHUNK_ROWS,
+                    report: ImportReport | None = None,
+                    on_chunk: Callable[[ImportReport], None] | None = None) -> ImportReport:
+    """
+    roster_records çıktısını chunk_rows'luk parçalarla yazar. Dosya içindeki tekrarlar
+    (ilk görülen kalır) ve geçersiz satırlar sayılıp atlanır. report.cancelled set edilirse
+    o anki parça bitince durur.
+    """
+    report = report or ImportReport()
+    seen = set()
+    records = iter(records)
+    try:
+        while not report.cancelled:
+            raw = list(islice(records, max(1, chunk_rows)))
+            if not raw:
+                break
+            chunk = []
+            for r in raw:
+                report.rows += 1
+                if r is None:
+                    report.invalid += 1
+                elif r[0] in seen:
+                    report.duplicates += 1
+                else:
+                    seen.add(r[0])
+                    chunk.append(r)
+            if chunk:
+                with SessionLocal() as db:
+                    inserted, existing, enrolled = import_chunk(db, chunk, hash_map, course_id)
+                report.inserted += inserted
+                report.existing += existing
+                report.enrolled += enrolled
+            report.elapsed = time.perf_counter() - report.started
+            if on_chunk is not None:
+                on_chunk(report)
+    finally:
+        report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+class StudentImporter:
+    """
+    Web yüklemesi: dosya geçici diske yazılır, import arka planda; hoca başına tek iş.
+    İlerleme bu worker'ın belleğindedir (HistoryPurger gibi).
+    """
+
+    def __init__(self, hash_workers: int = IMPORT_UPLOAD_HASH_WORKERS):
+        self.hash_workers = max(1, hash_workers)
+        self.executor = None
+        self.jobs = {}  # teacher_id -> ImportReport
+
+    def status(self, teacher_id: int) -> ImportReport | None:
+        return self.jobs.get(teacher_id)
+
+    def running(self, teacher_id: int) -> bool:
+        job = self.jobs.get(teacher_id)
+        return job is not None and not job.done
+
+    def start(self, teacher_id: int, path: str, course_id: int | None = None) -> ImportReport:
+        if self.running(teacher_id):
+            os.remove(path)
+            return self.jobs[teacher_id]
+        if self.executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            # argon2-cffi GIL'i bırakır; sunucu sürecinde fork'tansa thread
+            self.executor = ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix="import-argon2")
+        job = ImportReport()
+        job.task = asyncio.create_task(self._run(job, path, course_id))
+        self.jobs[teacher_id] = job
+        return job
+
+    async def stop(self):
+        # Sıradaki hash'ler iptal edilir; yarım parça commit edilmez, aynı dosya tekrar yüklenince kaldığı yerden
+        for job in self.jobs.values():
+            job.cancelled = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        await asyncio.gather(*(j.task for j in self.jobs.values() if j.task is not None), return_exceptions=True)
+
+    async def _run(self, job: ImportReport, path: str, course_id: int | None):
+        try:
+            await run_in_threadpool(
+                import_students, roster_records(read_rows(path)), self.executor.map, course_id, IMPORT_CHUNK_ROWS, job
+            )
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+        finally:
+            job.done = True
+            try:
+                os.remove(path)
+            except OSError:
+                pass
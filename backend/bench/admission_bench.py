@@ -0,0 +1,193 @@
+"""
+Yoklama kabul kontrolü altında aşırı yük. Küçük DB havuzu (2 + 2, bekleme 3 sn) ile iki senaryo:
+
+- hammer: 40 öğrenci kendi telefonundan 15'er POST'u aynı anda atar (her biri farklı
+  Idempotency-Key, yani idempotency önbelleği korumaz); cevaba bakmadan, tekrar denemeden
+- storm: 600 farklı öğrenci aynı anda tek POST atar (sıra sınırı 100); tarayıcı gibi 429 alınca
+  Retry-After kadar bekleyip aynı anahtarla tekrar dener (en fazla RETRIES kez)
+
+admission modunda fazlası hızlı 429 almalı, hiç 5xx olmamalı, sonunda herkesin yoklaması yazılmalı,
+hammer'da öğrenci başına en fazla BURST istek DB'ye gitmeli ve DB havuzu sınırı aşılmamalı. off modunda (kova ve sınır
+kapalı) her istek DB'ye gider; havuz beklemesi aşılırsa 500 döner.
+
+    cd backend
+    python -m bench.admission_bench            # iki mod
+    python -m bench.admission_bench --mode off
+
+Her mod ayrı süreçte çalışır (ayarlar import sırasında okunur).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+HAMMER_STUDENTS = 40
+HAMMER_POSTS = 15
+STORM_STUDENTS = 600
+RETRIES = 10
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    v = sorted(values)
+    return round(v[min(len(v) - 1, int(len(v) * p / 100))] * 1000, 2)
+
+
+def run_mode(mode: str) -> dict:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-admission-')}/bench.db"
+    os.environ["CHECKIN_WRITE_BEHIND"] = "0"
+    os.environ["QR_ROTATE_SECONDS"] = "0"
+    os.environ["DB_POOL_SIZE"] = "2"
+    os.environ["DB_MAX_OVERFLOW"] = "2"
+    os.environ["DB_POOL_TIMEOUT"] = "3"
+    if mode == "admission":
+        os.environ["CHECKIN_WAIT_QUEUE_MAX"] = "100"
+        os.environ["CHECKIN_WAIT_SECONDS"] = "3"
+    else:
+        os.environ["CHECKIN_DEVICE_RATE"] = "0"
+        os.environ["CHECKIN_STUDENT_RATE"] = "0"
+        os.environ["CHECKIN_CONCURRENCY"] = "1000000"
+
+    from datetime import timedelta
+
+    import httpx
+    from sqlalchemy import event, func, insert, select
+
+    from app import main as app_main
+    from app.admission import CHECKIN_STUDENT_BURST
+    from app.auth import create_access_token, COOKIE_NAME
+    from app.cli import init_db
+    from app.database import engine, SessionLocal
+    from app.models import User, ClassSession, Attendance
+
+    init_db()
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"username": f"a{i:05d}", "full_name": f"Öğrenci {i}", "password_hash": "-", "role": "student"}
+            for i in range(HAMMER_STUDENTS + STORM_STUDENTS)
+        ])
+        ids = list(db.scalars(select(User.id).where(User.username.like("a%")).order_by(User.username)))
+        teacher_id = db.scalar(select(User.id).where(User.role == "teacher"))
+        now = app_main.utcnow()
+        for code in ("hammer", "storm"):
+            db.add(ClassSession(course_name="Kabul", session_code=code, teacher_id=teacher_id, is_active=True,
+                                started_at=now, expires_at=now + timedelta(hours=1)))
+        db.commit()
+
+    def cookie(student_id):
+        token = create_access_token({"sub": str(student_id), "role": "student", "name": "x"})
+        return f"{COOKIE_NAME}={token}; {app_main.DEVICE_COOKIE}=dev-{student_id:08d}"
+
+    statements = [0]
+    checked_out = [0, 0]  # şu an, en yüksek
+
+    def on_statement(*_):
+        statements[0] += 1
+
+    def on_checkout(*_):
+        checked_out[0] += 1
+        checked_out[1] = max(checked_out[1], checked_out[0])
+
+    def on_checkin(*_):
+        checked_out[0] -= 1
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+    async def go():
+        out = {}
+        async with app_main.app.router.lifespan_context(app_main.app):
+            transport = httpx.ASGITransport(app=app_main.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                async def post(code, sid, key, retries):
+                    t0 = time.perf_counter()
+                    first = None
+                    for attempt in range(retries + 1):
+                        t = time.perf_counter()
+                        r = await client.post(f"/s/{code}/checkin",
+                                              headers={"Cookie": cookie(sid), "Idempotency-Key": key})
+                        if first is None:
+                            first = (r.status_code, time.perf_counter() - t, r.headers.get("retry-after"))
+                        if r.status_code != 429 or attempt == retries:
+                            return first, r.status_code, time.perf_counter() - t0, attempt
+                        await asyncio.sleep(float(r.headers.get("retry-after", "1")))
+
+                plans = {
+                    "hammer": [("hammer", sid, f"k{n}", 0) for n in range(HAMMER_POSTS) for sid in ids[:HAMMER_STUDENTS]],
+                    "storm": [("storm", sid, "k", RETRIES) for sid in ids[HAMMER_STUDENTS:]],
+                }
+                for name, plan in plans.items():
+                    statements[0] = 0
+                    checked_out[1] = 0
+                    t0 = time.perf_counter()
+                    replies = await asyncio.gather(*(post(*p) for p in plan))
+                    elapsed = time.perf_counter() - t0
+                    with SessionLocal() as db:
+                        session_id = db.scalar(select(ClassSession.id).where(ClassSession.session_code == name))
+                        written = db.scalar(select(func.count(Attendance.id))
+                                            .where(Attendance.session_id == session_id))
+                    first = Counter(f[0] for f, _, _, _ in replies)
+                    final = Counter(code for _, code, _, _ in replies)
+                    out[name] = {
+                        "requests": len(plan),
+                        "seconds": round(elapsed, 2),
+                        "first_statuses": dict(sorted(first.items())),
+                        "final_statuses": dict(sorted(final.items())),
+                        "retries": sum(attempts for _, _, _, attempts in replies),
+                        "server_errors": sum(n for code, n in final.items() if code >= 500),
+                        "attendances": written,
+                        "statements": statements[0],
+                        "pool_peak": checked_out[1],
+                        "done_p50_ms": percentile([t for _, code, t, _ in replies if code == 200], 50),
+                        "done_p99_ms": percentile([t for _, code, t, _ in replies if code == 200], 99),
+                        "rejected_p50_ms": percentile([f[1] for f, _, _, _ in replies if f[0] == 429], 50),
+                        "rejected_with_retry_after": sum(1 for f, _, _, _ in replies if f[0] == 429 and f[2]),
+                    }
+        return out
+
+    result = {"mode": mode, **asyncio.run(go())}
+    slots = app_main.checkin_admission.slots
+    result["admission"] = {
+        "admitted": slots.admitted, "queued": slots.queued, "rejected_queue_full": slots.rejected,
+        "rejected_wait_timeout": slots.timed_out,
+        "limited_student": app_main.checkin_admission.students.limited,
+        "limited_device": app_main.checkin_admission.devices.limited,
+    }
+    if mode == "admission":
+        hammer, storm = result["hammer"], result["storm"]
+        result["ok"] = (
+            hammer["first_statuses"].get(200, 0) <= HAMMER_STUDENTS * CHECKIN_STUDENT_BURST
+            and hammer["server_errors"] == 0 and storm["server_errors"] == 0
+            and hammer["attendances"] == HAMMER_STUDENTS
+            and storm["attendances"] == STORM_STUDENTS
+            and hammer["first_statuses"].get(429, 0) == hammer["rejected_with_retry_after"] > 0
+            and storm["first_statuses"].get(429, 0) == storm["rejected_with_retry_after"] > 0
+            and max(hammer["pool_peak"], storm["pool_peak"]) <= 4
+        )
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=["admission", "off", "all"], default="all")
+    args = ap.parse_args()
+
+    if args.mode != "all":
+        print(json.dumps(run_mode(args.mode), ensure_ascii=False))
+        return
+
+    for mode in ("off", "admission"):
+        out = subprocess.run([sys.executable, "-m", "bench.admission_bench", "--mode", mode],
+                             capture_output=True, text=True, check=True)
+        print(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+İstek başına kimlik doğrulama maliyeti (saf CPU, DB yok):
+
+- jose_decode: her çağrıda tam jwt.decode (eski get_user_from_cookie)
+- legacy_request: eski davranış, bir istekte require_teacher + require_login (2 decode)
+- cache_miss / cache_hit: decode_token, LRU boşken / doluyken
+- request_first / request_memo: get_user_from_cookie, isteğin ilk çağrısı (önbellekten) / aynı istekte tekrar
+- expired: süresi dolmuş token önbellekteyken (düşürülüp reddedilmeli)
+
+    cd backend
+    python -m bench.auth_bench
+"""
+import json
+import time
+import timeit
+
+from jose import jwt
+from starlette.requests import Request
+
+from app.auth import (
+    create_access_token, decode_token, get_user_from_cookie, token_cache, SECRET_KEY, ALGORITHM, COOKIE_NAME,
+)
+
+
+def make_request(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"cookie", f"{COOKIE_NAME}={token}".encode())]})
+
+
+def main(n: int = 50_000):
+    token = create_access_token({"sub": "1", "role": "teacher", "name": "Dr. Yavuz Sümer"})
+
+    def legacy_decode():
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    jose_decode = timeit.timeit(legacy_decode, number=n) / n
+    legacy_request = timeit.timeit(lambda: (legacy_decode(), legacy_decode()), number=n) / n
+
+    # her tur farklı token (imza farklı) -> hep miss
+    tokens = [create_access_token({"sub": str(i), "role": "student", "name": "x"}) for i in range(n // 10)]
+    token_cache.items.clear()
+    t0 = time.perf_counter()
+    for t in tokens:
+        decode_token(t)
+    cache_miss = (time.perf_counter() - t0) / len(tokens)
+
+    decode_token(token)
+    cache_hit = timeit.timeit(lambda: decode_token(token), number=n) / n
+
+    # istek nesnesi kurulumu ölçüme girmesin: önceden üret
+    requests = [make_request(token) for _ in range(n)]
+    it = iter(requests)
+    request_first = timeit.timeit(lambda: get_user_from_cookie(next(it)), number=n) / n
+    req = make_request(token)
+    get_user_from_cookie(req)
+    request_memo = timeit.timeit(lambda: get_user_from_cookie(req), number=n) / n
+
+    expired = create_access_token({"sub": "2", "role": "student", "name": "x"}, expires_minutes=-1)
+    token_cache.put(expired, {"sub": "2", "exp": time.time() - 1})
+    assert decode_token(expired) is None and expired not in token_cache.items
+    assert decode_token(token + "x") is None
+
+    print(json.dumps({
+        "jose_decode_us": round(jose_decode * 1e6, 2),
+        "legacy_request_us": round(legacy_request * 1e6, 2),
+        "cache_miss_us": round(cache_miss * 1e6, 2),
+        "cache_hit_us": round(cache_hit * 1e6, 2),
+        "request_first_us": round(request_first * 1e6, 2),
+        "request_memo_us": round(request_memo * 1e6, 2),
+        "cache_entries": len(token_cache.items),
+        "cache_max": token_cache.maxsize,
+    }))
+
+
+if __name__ == "__main__":
+    main()
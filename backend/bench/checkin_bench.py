@@ -0,0 +1,125 @@
+"""
+Check-in throughput / gecikme benchmark: sync Session, AsyncSession (DB_ASYNC=1)
+ve write-behind kuyruk.
+
+    cd backend
+    python -m bench.checkin_bench            # tüm modları çalıştırır
+    python -m bench.checkin_bench --mode async --students 1000 --concurrency 100
+
+Her mod ayrı bir süreçte, geçici bir SQLite DB ile çalışır (env import sırasında okunduğu için).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_mode(mode: str, students: int, concurrency: int) -> dict:
+    tmp = tempfile.mkdtemp(prefix="yoklama-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["CHECKIN_WRITE_BEHIND"] = "1" if mode == "queue" else "0"
+    os.environ["DB_ASYNC"] = "1" if mode == "async" else "0"
+
+    import httpx
+    from datetime import timedelta
+
+    from app import main
+    from app.cli import init_db
+    from app.database import SessionLocal
+    from app.auth import create_access_token, hash_password, COOKIE_NAME
+    from app.models import User, ClassSession, Attendance
+
+    init_db()
+    db = SessionLocal()
+    pw = hash_password("bench")
+    db.add_all([
+        User(username=f"b{i:06d}", full_name=f"Bench {i}", password_hash=pw, role="student")
+        for i in range(students)
+    ])
+    teacher = db.query(User).filter(User.role == "teacher").first()
+    now = main.utcnow()
+    session = ClassSession(
+        course_name="Bench", session_code="benchcode", teacher_id=teacher.id,
+        is_active=True, started_at=now, expires_at=now + timedelta(hours=1),
+    )
+    db.add(session)
+    db.commit()
+    ids = [u.id for u in db.query(User).filter(User.username.like("b%")).all()]
+    session_id = session.id
+    db.close()
+
+    cookies = [
+        f"{COOKIE_NAME}={create_access_token({'sub': str(i), 'role': 'student', 'name': 'x'})}; "
+        f"{main.DEVICE_COOKIE}=dev{i:029d}"
+        for i in ids
+    ]
+
+    async def go():
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                sem = asyncio.Semaphore(concurrency)
+                latencies = []
+
+                async def post(c):
+                    async with sem:
+                        t = time.perf_counter()
+                        r = await client.post("/s/benchcode/checkin", headers={"Cookie": c})
+                        latencies.append((time.perf_counter() - t) * 1000)
+                        return r
+
+                t0 = time.perf_counter()
+                resps = await asyncio.gather(*[post(c) for c in cookies])
+                t_ack = time.perf_counter() - t0
+                if main.checkin_queue is not None:
+                    await main.checkin_queue.queue.join()
+                t_done = time.perf_counter() - t0
+        return resps, t_ack, t_done, sorted(latencies)
+
+    resps, t_ack, t_done, lat = asyncio.run(go())
+
+    db = SessionLocal()
+    written = db.query(Attendance).filter(Attendance.session_id == session_id).count()
+    db.close()
+
+    return {
+        "mode": mode,
+        "students": students,
+        "concurrency": concurrency,
+        "errors": sum(1 for r in resps if r.status_code >= 400),
+        "written": written,
+        "ack_seconds": round(t_ack, 4),
+        "durable_seconds": round(t_done, 4),
+        "checkins_per_sec": round(written / t_done, 1) if t_done else None,
+        "latency_ms_p50": round(statistics.median(lat), 2),
+        "latency_ms_p99": round(lat[max(0, int(len(lat) * 0.99) - 1)], 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=["sync", "async", "queue", "all"], default="all")
+    ap.add_argument("--students", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=50)
+    args = ap.parse_args()
+
+    if args.mode != "all":
+        print(json.dumps(run_mode(args.mode, args.students, args.concurrency)))
+        return
+
+    for mode in ("sync", "async", "queue"):
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.checkin_bench", "--mode", mode, "--students", str(args.students),
+             "--concurrency", str(args.concurrency)],
+            capture_output=True, text=True, check=True,
+        )
+        print(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
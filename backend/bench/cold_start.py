@@ -0,0 +1,61 @@
+"""
+Soğuk başlangıç ölçümü: `import app.main` süresi ve import sırasında çalışan SQL sayısı
+(0 olmalı), ayrıca `init-db`'nin boş ve dolu DB'de süresi.
+
+    cd backend
+    python -m bench.cold_start
+
+Import sırasında SQL çalışırsa çıkış kodu 1'dir.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+IMPORT_PROBE = """
+import time
+t0 = time.perf_counter()
+from sqlalchemy import event
+from app import database
+n = []
+event.listen(database.engine, "before_cursor_execute", lambda *a: n.append(1))
+import app.main
+print(time.perf_counter() - t0, len(n))
+"""
+
+INIT_PROBE = """
+import time
+from app.cli import init_db
+t0 = time.perf_counter()
+init_db()
+print(time.perf_counter() - t0)
+"""
+
+
+def run(code: str, env: dict) -> list[str]:
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1].split()
+
+
+def main():
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-cold-')}/cold.db"
+    env["DB_INIT_ON_STARTUP"] = "0"
+
+    import_s, statements = run(IMPORT_PROBE, env)
+    init_fresh = run(INIT_PROBE, env)[0]
+    init_seeded = run(INIT_PROBE, env)[0]
+
+    result = {
+        "import_seconds": round(float(import_s), 3),
+        "import_sql_statements": int(statements),
+        "init_db_fresh_seconds": round(float(init_fresh), 3),
+        "init_db_seeded_seconds": round(float(init_seeded), 3),
+    }
+    print(json.dumps(result))
+    sys.exit(0 if result["import_sql_statements"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
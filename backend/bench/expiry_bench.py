@@ -0,0 +1,197 @@
+"""
+Oturum süre dolumu zamanlayıcısı. Uygulama aynı süreçte gerçek bir uvicorn sunucusunda (127.0.0.1)
+çalışır; hoca panelleri websockets ile bağlanır. Açılıştan önce DB'ye:
+
+- stale: bitişi çoktan geçmiş ama is_active=True kalmış oturumlar (açılıştaki DB senkronu kapatmalı)
+- due: WAVES dalga halinde, dalga başına aynı bitiş anı olan oturumlar (ders blokları aynı dakikada biter)
+- future: bir saat sonra bitecek oturumlar (açık kalmalı)
+
+due oturumlarının bir kısmının QR'ı istenir (registry + QR önbelleği dolar, schedule() threadpool'dan
+çağrılır) ve bir kısmına WS paneli bağlanır. Ölçülenler: "session_closed" olayının bitişten sonra
+panele varma gecikmesi, süre dolumu UPDATE sayısı (dalga başına ~1 olmalı), bitişten sonra DB'de
+aktif kalan satır, önbelleklerde kalan kod.
+
+    cd backend
+    python -m bench.expiry_bench
+    python -m bench.expiry_bench --sessions 2000 --waves 4 --stale 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    v = sorted(values)
+    return round(v[min(len(v) - 1, int(len(v) * p / 100))] * 1000, 1)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=1000, help="bitişi bench sırasında gelecek oturum")
+    ap.add_argument("--waves", type=int, default=4)
+    ap.add_argument("--stale", type=int, default=200, help="açılışta bitişi çoktan geçmiş oturum")
+    ap.add_argument("--future", type=int, default=100)
+    ap.add_argument("--sockets", type=int, default=100, help="WS paneli bağlanan due oturumu")
+    ap.add_argument("--qr", type=int, default=100, help="QR'ı istenen due oturumu")
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-expiry-')}/bench.db"
+    os.environ["QR_ROTATE_SECONDS"] = "30"
+
+    from datetime import datetime, timedelta
+
+    import httpx
+    import uvicorn
+    import websockets
+    from sqlalchemy import event, func, insert, select
+
+    from app import main as app_main
+    from app.auth import create_access_token, COOKIE_NAME
+    from app.cli import init_db
+    from app.database import engine, SessionLocal
+    from app.models import User, ClassSession
+    from app.session_expiry import SESSION_EXPIRY_BATCH_SIZE
+
+    init_db()
+    start_in = 6.0  # ilk dalga açılıştan bu kadar saniye sonra
+    with SessionLocal() as db:
+        teacher_id = db.scalar(select(User.id).where(User.role == "teacher"))
+        now = datetime.utcnow()
+        rows = []
+        for i in range(args.stale):
+            rows.append(("stale", i, now - timedelta(hours=1), now - timedelta(minutes=5 + i % 30)))
+        for i in range(args.sessions):
+            wave = i % args.waves
+            rows.append(("due", i, now, now + timedelta(seconds=start_in + wave)))
+        for i in range(args.future):
+            rows.append(("future", i, now, now + timedelta(hours=1)))
+        db.execute(insert(ClassSession), [
+            {"course_name": "Süre", "session_code": f"{kind}{i:06d}", "teacher_id": teacher_id,
+             "is_active": True, "started_at": started, "expires_at": expires}
+            for kind, i, started, expires in rows
+        ])
+        db.commit()
+        due = db.execute(select(ClassSession.id, ClassSession.session_code, ClassSession.expires_at)
+                         .where(ClassSession.session_code.like("due%")).order_by(ClassSession.id)).all()
+
+    updates = [0]
+
+    def on_statement(conn, cursor, statement, *_):
+        if statement.lstrip().upper().startswith("UPDATE CLASS_SESSIONS"):
+            updates[0] += 1
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+
+    teacher_cookie = create_access_token({"sub": str(teacher_id), "role": "teacher", "name": "x"})
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_main.app, host="127.0.0.1", port=port, log_level="warning",
+                                           access_log=False))
+
+    async def go():
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+
+        scheduler = app_main.session_expiry
+        for _ in range(100):
+            if scheduler.closed >= args.stale:
+                break
+            await asyncio.sleep(0.05)
+        resynced = {"scheduled": len(scheduler.deadlines), "stale_closed": scheduler.closed,
+                    "updates": updates[0]}
+
+        watched = due[:: max(1, len(due) // args.sockets)][: args.sockets]
+        qr_codes = [code for _, code, _ in due[1:: max(1, len(due) // args.qr)][: args.qr]]
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            for code in qr_codes:
+                assert (await client.get(f"/qr/{code}.png")).status_code == 200
+        await asyncio.sleep(0.2)  # schedule() çağrıları loop'a ulaşsın
+        cached = {"registry": sum(1 for c in qr_codes if c in app_main.active_sessions.by_code),
+                  "qr": sum(1 for c in qr_codes if (c, "png") in app_main.qr_cache.items)}
+
+        headers = {"Cookie": f"{COOKIE_NAME}={teacher_cookie}"}
+        latencies, events = [], []
+
+        async def panel(session_id, expires_at):
+            async with websockets.connect(f"ws://127.0.0.1:{port}/ws/session/{session_id}",
+                                          additional_headers=headers) as ws:
+                async for frame in ws:
+                    got = datetime.utcnow()
+                    for ev in json.loads(frame):
+                        if ev.get("type") == "session_closed":
+                            latencies.append((got - expires_at).total_seconds())
+                            events.append(ev)
+                            return
+
+        updates_before = updates[0]
+        last = max(expires_at for _, _, expires_at in due)
+        await asyncio.wait_for(asyncio.gather(*(panel(sid, exp) for sid, _, exp in watched)),
+                               timeout=(last - datetime.utcnow()).total_seconds() + 30)
+        await asyncio.sleep(max(0.0, (last - datetime.utcnow()).total_seconds()) + 0.5)
+
+        with SessionLocal() as db:
+            still_active = db.scalar(select(func.count(ClassSession.id)).where(
+                ClassSession.is_active.is_(True), ClassSession.expires_at <= datetime.utcnow()))
+            future_active = db.scalar(select(func.count(ClassSession.id)).where(
+                ClassSession.is_active.is_(True), ClassSession.session_code.like("future%")))
+
+        result = {
+            "sessions": {"stale": args.stale, "due": args.sessions, "waves": args.waves, "future": args.future},
+            "resync": resynced,
+            "closed": scheduler.closed,
+            "batches": scheduler.batches,
+            "due_updates": updates[0] - updates_before,
+            "expected_updates": expected_updates,
+            "sockets": len(watched),
+            "events": len(events),
+            "event_reasons": sorted({ev["reason"] for ev in events}),
+            "event_latency_p50_ms": percentile(latencies, 50),
+            "event_latency_p99_ms": percentile(latencies, 99),
+            "event_latency_max_ms": percentile(latencies, 100),
+            "stale_rows_after": still_active,
+            "future_active": future_active,
+            "cached_before": cached,
+            "cached_after": {"registry": sum(1 for c in qr_codes if c in app_main.active_sessions.by_code),
+                             "qr": sum(1 for c in qr_codes if (c, "png") in app_main.qr_cache.items)},
+            "still_scheduled": len(scheduler.deadlines),
+        }
+        server.should_exit = True
+        await serving
+        return result
+
+    # dalga başına ceil(dalga / batch) UPDATE beklenir; aynı dalga iki uyanışa bölünebilir
+    per_wave = -(-args.sessions // args.waves)
+    expected_updates = args.waves * -(-per_wave // SESSION_EXPIRY_BATCH_SIZE)
+
+    t0 = time.perf_counter()
+    result = asyncio.run(go())
+    result["seconds"] = round(time.perf_counter() - t0, 2)
+    result["ok"] = (
+        result["resync"]["stale_closed"] == args.stale
+        and result["closed"] == args.stale + args.sessions
+        and result["events"] == result["sockets"]
+        and result["event_reasons"] == ["expired"]
+        and result["due_updates"] <= 2 * expected_updates
+        and result["stale_rows_after"] == 0
+        and result["future_active"] == args.future
+        and result["cached_before"]["registry"] == result["cached_before"]["qr"] == args.qr
+        and result["cached_after"] == {"registry": 0, "qr": 0}
+        and result["still_scheduled"] == args.future
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Rapor dışa aktarma ölçümü: N öğrencilik listede ilk byte süresi (TTFB), toplam süre ve
+tepe RSS artışı. "legacy" eski üretimi (SpreadsheetML string birleştirme / .all() + satır
+başına yield), "stream" mevcut /export.{xlsx,csv} route'unu ASGI üzerinden doğrudan ölçer.
+DB bir kez ayrı süreçte doldurulur; her ölçüm temiz bir süreçte yapılır (ru_maxrss süreç başına).
+
+    cd backend
+    python -m bench.export_bench --students 5000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def seed(students: int):
+    from datetime import timedelta
+
+    from sqlalchemy import insert, select
+
+    from app.cli import init_db
+    from app.database import SessionLocal
+    from app.auth import create_access_token
+    from app.models import User, ClassSession, Attendance
+    from app.main import utcnow
+
+    init_db()
+    db = SessionLocal()
+    teacher = db.query(User).filter(User.role == "teacher").first()
+    db.execute(insert(User), [
+        {"username": f"x{i:07d}", "full_name": f"Öğrenci {i}", "password_hash": "-", "role": "student"}
+        for i in range(students)
+    ])
+    now = utcnow()
+    session = ClassSession(course_name="Rapor", session_code="exportbench", teacher_id=teacher.id,
+                           is_active=False, started_at=now - timedelta(hours=1), expires_at=now)
+    db.add(session)
+    db.flush()
+    ids = list(db.scalars(select(User.id).where(User.role == "student")))
+    db.execute(insert(Attendance), [
+        {"session_id": session.id, "student_id": sid, "timestamp": session.started_at + timedelta(minutes=i % 30)}
+        for i, sid in enumerate(ids[::2])
+    ])
+    db.commit()
+    cookie = create_access_token({"sub": str(teacher.id), "role": "teacher", "name": teacher.full_name})
+    sid = session.id
+    db.close()
+    return sid, cookie
+
+
+def legacy_xls(session_id: int) -> bytes:
+    """
+    Eski export_session_excel gövdesi (tüm belge bellekte string olarak).
+    """
+    from app.database import SessionLocal
+    from app.models import User, ClassSession, Attendance
+    from app.main import fmt_tr, compute_status, LATE_MINUTES_DEFAULT
+
+    db = SessionLocal()
+    session = db.query(ClassSession).filter(ClassSession.id == session_id).first()
+    attendances = db.query(Attendance).filter(Attendance.session_id == session.id).all()
+    present = {a.student_id: a for a in attendances}
+    students = db.query(User).filter(User.role == "student").order_by(User.username.asc()).all()
+
+    def esc(x: str):
+        return ((x or "").replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                .replace('"', "&quot;").replace("'", "&apos;"))
+
+    rows = []
+
+    def row(*cells):
+        out = "<Row>"
+        for c in cells:
+            out += f'<Cell><Data ss:Type="String">{esc(str(c))}</Data></Cell>'
+        out += "</Row>"
+        rows.append(out)
+
+    row("ÖğrenciNo", "Ad Soyad", "Saat(TR)", "Durum", "İmza")
+    for s in students:
+        att = present.get(s.id)
+        row(s.username, s.full_name, fmt_tr(att.timestamp) if att else "",
+            compute_status(session, att, LATE_MINUTES_DEFAULT), "")
+    xml = f"<Workbook><Worksheet><Table>{''.join(rows)}</Table></Worksheet></Workbook>"
+    db.close()
+    return xml.encode()
+
+
+def legacy_csv(session_id: int):
+    """
+    Eski export_session_csv: önce tüm satırlar .all() ile, sonra satır başına bir yield.
+    """
+    from app.database import SessionLocal
+    from app.models import User, ClassSession, Attendance
+    from app.main import fmt_tr, compute_status, LATE_MINUTES_DEFAULT
+
+    db = SessionLocal()
+    session = db.query(ClassSession).filter(ClassSession.id == session_id).first()
+    attendances = db.query(Attendance).filter(Attendance.session_id == session.id).all()
+    present = {a.student_id: a for a in attendances}
+    students = db.query(User).filter(User.role == "student").order_by(User.username.asc()).all()
+    db.close()
+
+    yield "\ufeff"
+    for s in students:
+        att = present.get(s.id)
+        yield (f"{s.username};{s.full_name};{fmt_tr(att.timestamp) if att else ''};"
+               f"{compute_status(session, att, LATE_MINUTES_DEFAULT)};\r\n")
+
+
+async def asgi_get(app, path: str, cookie_header: str, on_chunk):
+    """
+    TestClient gövdeyi topladığı için parça zamanları için ASGI app doğrudan sürülür.
+    """
+    import asyncio
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), (b"cookie", cookie_header.encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    status = {}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            on_chunk(message["body"])
+
+    await app(scope, receive, send)
+    return status.get("code")
+
+
+def run_one(mode: str, fmt: str, students: int, db_path: str, session_id: int, cookie: str) -> dict:
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    import asyncio
+    import gc
+
+    from app import main as app_main
+    from app.auth import COOKIE_NAME
+
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    stats = {"bytes": 0, "chunks": 0, "ttfb": None}
+
+    def on_chunk(chunk):
+        if stats["ttfb"] is None:
+            stats["ttfb"] = time.perf_counter() - t0
+        stats["bytes"] += len(chunk)
+        stats["chunks"] += 1
+
+    t0 = time.perf_counter()
+    code = 200
+    if mode == "legacy":
+        for chunk in ([legacy_xls(session_id)] if fmt == "xlsx" else legacy_csv(session_id)):
+            on_chunk(chunk)
+    else:
+        code = asyncio.run(asgi_get(app_main.app, f"/teacher/session/{session_id}/export.{fmt}",
+                                    f"{COOKIE_NAME}={cookie}", on_chunk))
+    total = time.perf_counter() - t0
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "mode": mode,
+        "format": fmt,
+        "students": students,
+        "status_code": code,
+        "ttfb_ms": round((stats["ttfb"] or 0) * 1000, 2),
+        "total_ms": round(total * 1000, 2),
+        "bytes": stats["bytes"],
+        "chunks": stats["chunks"],
+        "peak_rss_growth_kb": rss_after - rss_before,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--students", type=int, default=5000)
+    ap.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    ap.add_argument("--seed", help=argparse.SUPPRESS)
+    ap.add_argument("--one", nargs=4, metavar=("MODE", "DB", "SESSION", "COOKIE"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.seed:
+        os.environ["DATABASE_URL"] = f"sqlite:///{args.seed}"
+        print(json.dumps(seed(args.students)))
+        return
+    if args.one:
+        mode, db_path, session_id, cookie = args.one
+        print(json.dumps(run_one(mode, args.format, args.students, db_path, int(session_id), cookie)))
+        return
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="yoklama-export-"), "bench.db")
+
+    def sub(*extra):
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.export_bench", "--format", args.format,
+             "--students", str(args.students), *extra],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        return out.strip().splitlines()[-1]
+
+    session_id, cookie = json.loads(sub("--seed", db_path))
+    for mode in ("legacy", "stream"):
+        print(sub("--one", mode, db_path, str(session_id), cookie))
+
+
+if __name__ == "__main__":
+    main()
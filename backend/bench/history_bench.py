@@ -0,0 +1,109 @@
+"""
+Geçmiş sayfası ölçümü: bir hocanın N oturumu varken ilk sayfa ve derin bir sayfa
+(keyset cursor ile) aynı sürede ve sabit sayıda SQL ifadesiyle render edilmeli.
+
+    cd backend
+    python -m bench.history_bench --sessions 50000 --deep 500
+
+Sınır aşılırsa çıkış kodu 1'dir.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+MAX_STATEMENTS = 4
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=50000)
+    ap.add_argument("--attendance-per-session", type=int, default=5)
+    ap.add_argument("--deep", type=int, default=500, help="kaç sayfa ileri gidilsin")
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-hist-')}/bench.db"
+
+    from datetime import timedelta
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, insert, select
+
+    from app import main as app_main
+    from app.cli import init_db
+    from app.database import SessionLocal, engine
+    from app.auth import create_access_token, COOKIE_NAME
+    from app.models import User, ClassSession, Attendance
+
+    init_db()
+    db = SessionLocal()
+    teacher = db.query(User).filter(User.role == "teacher").first()
+    student_ids = [u.id for u in db.query(User).filter(User.role == "student").all()]
+    now = app_main.utcnow()
+
+    t0 = time.perf_counter()
+    db.execute(insert(ClassSession), [
+        {"course_name": f"Ders {i % 40}", "session_code": f"h{i:08d}", "teacher_id": teacher.id,
+         "is_active": False, "started_at": now - timedelta(hours=i),
+         "expires_at": now - timedelta(hours=i) + timedelta(minutes=15)}
+        for i in range(args.sessions)
+    ])
+    sessions = db.execute(select(ClassSession.id, ClassSession.started_at)).all()
+    db.execute(insert(Attendance), [
+        {"session_id": sid, "student_id": student_ids[k % len(student_ids)],
+         "timestamp": started + timedelta(minutes=k * 4)}
+        for sid, started in sessions
+        for k in range(min(args.attendance_per_session, len(student_ids)))
+    ])
+    db.commit()
+    seed_s = time.perf_counter() - t0
+    teacher_cookie = create_access_token({"sub": str(teacher.id), "role": "teacher", "name": teacher.full_name})
+    db.close()
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = TestClient(app_main.app)
+    client.cookies.set(COOKIE_NAME, teacher_cookie)
+
+    def page(url):
+        statements.clear()
+        t = time.perf_counter()
+        resp = client.get(url)
+        ms = (time.perf_counter() - t) * 1000
+        m = re.search(r"before=([0-9]+-[0-9]+)", resp.text)
+        return resp.status_code, ms, len(statements), (m.group(1) if m else None)
+
+    status, first_ms, first_stmts, cursor = page("/teacher/history")
+    deep_status, deep_ms, deep_stmts = status, first_ms, first_stmts
+    pages = 1
+    walk_t0 = time.perf_counter()
+    while cursor and pages < args.deep:
+        deep_status, deep_ms, deep_stmts, cursor = page(f"/teacher/history?before={cursor}")
+        pages += 1
+    walk_s = time.perf_counter() - walk_t0
+
+    ok = (status == deep_status == 200
+          and first_stmts <= MAX_STATEMENTS and deep_stmts <= MAX_STATEMENTS)
+    print(json.dumps({
+        "sessions": args.sessions,
+        "seed_s": round(seed_s, 2),
+        "first_page_ms": round(first_ms, 2),
+        "first_page_statements": first_stmts,
+        "pages_walked": pages,
+        "deep_page_ms": round(deep_ms, 2),
+        "deep_page_statements": deep_stmts,
+        "avg_page_ms": round(walk_s * 1000 / max(1, pages - 1), 2),
+        "max_statements": MAX_STATEMENTS,
+    }))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Toplu öğrenci içe aktarma ölçümü. N satırlık bir CSV/XLSX üretilir (birkaç tekrar ve geçersiz
+satırla), geçici SQLite DB'ye `python -m app.cli import-students` ile aynı yoldan yazılır:
+
+- interrupted: ilk K parçadan sonra kesilir (parçalar ayrı transaction'da commit edilmiş olur)
+- resume: aynı dosyayla tekrar; bitmiş parçalar hash'lenmeden atlanır, toplamda her geçerli satır
+  tam bir kez eklenip bir kez hash'lenmeli
+- rerun: bitmiş import tekrar çalıştırılınca hiç hash yok, parça başına 1 SELECT
+
+Argon2 maliyeti varsayılan olarak düşürülür (--real-cost ile gerçek maliyet); böylece hash dışı
+yük (okuma, dedupe, INSERT) görünür. Gerçek maliyette süre ≈ satır × hash süresi / süreç sayısı.
+
+    cd backend
+    python -m bench.import_bench --rows 20000 --format xlsx --workers 4
+"""
+import argparse
+import json
+import os
+import tempfile
+
+
+def write_roster(path: str, rows: int, fmt: str):
+    header = ("Öğrenci No", "Ad Soyad", "Şifre")
+    data = [(f"30{i:06d}", f"Öğrenci {i}", f"Sifre!{i:06d}") for i in range(rows)]
+    data[10] = data[5]                       # dosya içi tekrar
+    data[20] = ("30999999", "", "x")         # eksik ad
+    if fmt == "xlsx":
+        from app.exports import XlsxReport
+        report = XlsxReport("Öğrenciler", [12, 24, 14])
+        report.row(*header, bold=True)
+        for r in data:
+            report.row(int(r[0]), r[1], r[2])   # numara Excel'de sayı olarak
+        os.replace(report.save_temp(), path)
+    else:
+        import csv
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f, delimiter=";")
+            w.writerow(header)
+            w.writerows(data)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    ap.add_argument("--chunk", type=int, default=1000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--interrupt-after", type=int, default=3, help="resume senaryosunda kesilen parça sayısı")
+    ap.add_argument("--real-cost", action="store_true", help="Argon2 maliyetini düşürme")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="yoklama-import-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    if not args.real_cost:
+        os.environ["ARGON2_TIME_COST"] = "1"
+        os.environ["ARGON2_MEMORY_COST"] = "1024"
+        os.environ["ARGON2_PARALLELISM"] = "1"
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    from sqlalchemy import event, func, select
+
+    from app.cli import init_db
+    from app.database import engine, SessionLocal
+    from app.models import User
+    from app.student_import import ImportReport, import_students, read_rows, roster_records
+
+    path = os.path.join(tmp, f"roster.{args.format}")
+    write_roster(path, args.rows, args.format)
+    init_db()
+
+    def count_students():
+        with SessionLocal() as db:
+            return db.scalar(select(func.count(User.id)).where(User.username.like("30%")))
+
+    results = {"rows": args.rows, "format": args.format, "chunk": args.chunk, "workers": args.workers,
+               "argon2": "real" if args.real_cost else "cheap"}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        hashed = [0]
+
+        def hash_map(fn, items):
+            items = list(items)
+            hashed[0] += len(items)
+            return pool.map(fn, items, chunksize=max(1, len(items) // (args.workers * 4)))
+
+        def run(report=None, on_chunk=None):
+            statements = [0]
+
+            def count(*_):
+                statements[0] += 1
+
+            event.listen(engine, "before_cursor_execute", count)
+            hashed[0] = 0
+            r = import_students(roster_records(read_rows(path)), hash_map, chunk_rows=args.chunk,
+                                report=report, on_chunk=on_chunk)
+            event.remove(engine, "before_cursor_execute", count)
+            return {"seconds": round(r.elapsed, 2), "rows_per_s": round(r.rate, 1),
+                    "inserted_per_s": round(r.inserted / r.elapsed, 1) if r.elapsed else 0.0,
+                    "rows": r.rows, "inserted": r.inserted, "existing": r.existing, "duplicates": r.duplicates,
+                    "invalid": r.invalid, "hashed": hashed[0], "statements": statements[0]}
+
+        def interrupt(r):
+            if r.rows >= args.interrupt_after * args.chunk:
+                r.cancelled = True
+
+        # yarıda kesilen import -> aynı dosyayla devam -> bitmiş import'u tekrar
+        results["interrupted"] = run(ImportReport(), interrupt)
+        results["resume"] = run()
+        results["rerun"] = run()
+
+    expected = args.rows - 2   # bir tekrar, bir geçersiz satır
+    results["students"] = count_students()
+    results["ok"] = (
+        results["students"] == expected
+        and results["interrupted"]["inserted"] + results["resume"]["inserted"] == expected
+        and results["interrupted"]["hashed"] + results["resume"]["hashed"] == expected
+        and results["rerun"]["hashed"] == 0
+    )
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Metrik kaydının maliyeti. Aynı süreçte, aynı uygulamada sıcak route'lar metrik kapalı
+(MetricsMiddleware yığında yok, engine event'leri boşta döner) ve açık çalıştırılır. Mod her
+istekte değişir (kapalı, açık, kapalı, ...); ek maliyet, turlardaki açık/kapalı oranlarının medyanı.
+
+- qr_cached: GET /qr/{code}.png (önbellekten, DB'ye 1 sorgu)
+- attend_page: GET /s/{code} (şablon render)
+- checkin_duplicate: POST /s/{code}/checkin, zaten katılmış öğrenci (DB yolu)
+- observe_ns: Histogram.observe tek çağrı maliyeti
+- middleware_us: boş bir ASGI uygulamasının önüne MetricsMiddleware eklemenin istek başı maliyeti
+  (gürültüsüz alt sınır; route sonuçları tek çekirdekli makinede ±%3 oynar)
+
+Hedef: her route'ta ek süre < %5.
+
+    cd backend
+    python -m bench.metrics_overhead --requests 200 --rounds 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import timeit
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--rounds", type=int, default=15)
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-metrics-')}/bench.db"
+    os.environ["CHECKIN_WRITE_BEHIND"] = "0"
+    os.environ["QR_ROTATE_SECONDS"] = "0"
+    # aynı öğrenci yüzlerce kez POST atar: hız sınırı kapalı, ölçülen DB yolu (429 değil)
+    os.environ["CHECKIN_DEVICE_RATE"] = "0"
+    os.environ["CHECKIN_STUDENT_RATE"] = "0"
+
+    from datetime import timedelta
+
+    import httpx
+    from sqlalchemy import select
+
+    from app import main as app_main
+    from app.auth import create_access_token, COOKIE_NAME
+    from app.cli import init_db
+    from app.database import SessionLocal
+    from app.metrics import metrics, request_seconds, MetricsMiddleware
+    from app.models import User, ClassSession
+
+    init_db()
+    with SessionLocal() as db:
+        teacher_id = db.scalar(select(User.id).where(User.role == "teacher"))
+        student_id = db.scalar(select(User.id).where(User.role == "student"))
+        now = app_main.utcnow()
+        db.add(ClassSession(course_name="Metrik", session_code="metrics", teacher_id=teacher_id, is_active=True,
+                            started_at=now, expires_at=now + timedelta(hours=1)))
+        db.commit()
+
+    app = app_main.app
+    stacks = {}
+
+    def build(enabled: bool):
+        kept = app.user_middleware
+        if not enabled:
+            app.user_middleware = [m for m in kept if m.cls is not MetricsMiddleware]
+        stack = app.build_middleware_stack()
+        app.user_middleware = kept
+        return stack
+
+    stacks[True], stacks[False] = build(True), build(False)
+
+    def use(enabled: bool):
+        metrics.enabled = enabled
+        app.middleware_stack = stacks[enabled]
+
+    student = create_access_token({"sub": str(student_id), "role": "student", "name": "x"})
+    cookies = {COOKIE_NAME: student, app_main.DEVICE_COOKIE: "metrics-device-01"}
+    routes = {
+        "qr_cached": ("GET", "/qr/metrics.png"),
+        "attend_page": ("GET", "/s/metrics"),
+        "checkin_duplicate": ("POST", "/s/metrics/checkin"),
+    }
+
+    async def go():
+        samples = {name: {True: [], False: []} for name in routes}
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+                # ısınma + öğrenci bir kez katılsın (sonrakiler "zaten katıldın")
+                use(True)
+                for method, path in routes.values():
+                    for _ in range(20):
+                        assert (await client.request(method, path)).status_code == 200
+
+                # mod her istekte değişir; bir turda iki modun toplam süresi ayrı biriktirilir
+                for _ in range(args.rounds):
+                    for name, (method, path) in routes.items():
+                        spent = {False: 0.0, True: 0.0}
+                        for i in range(2 * args.requests):
+                            enabled = bool(i % 2)
+                            use(enabled)
+                            t0 = time.perf_counter()
+                            await client.request(method, path)
+                            spent[enabled] += time.perf_counter() - t0
+                        for enabled, total in spent.items():
+                            samples[name][enabled].append(total / args.requests)
+        return samples
+
+    samples = asyncio.run(go())
+    use(True)
+
+    result = {"requests": args.requests, "rounds": args.rounds}
+    for name, by_mode in samples.items():
+        off, on = statistics.median(by_mode[False]), statistics.median(by_mode[True])
+        ratio = statistics.median(b / a for a, b in zip(by_mode[False], by_mode[True]))
+        result[name] = {"off_us": round(off * 1e6, 1), "on_us": round(on * 1e6, 1),
+                        "overhead_pct": round((ratio - 1) * 100, 2)}
+
+    n = 200_000
+    observe = timeit.timeit(lambda: request_seconds.observe(("GET", "/bench", 200), 0.003), number=n) / n
+    result["observe_ns"] = round(observe * 1e9)
+
+    class Route:
+        path = "/bench"
+
+    async def bare(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def sink(message):
+        pass
+
+    async def per_request(asgi, n=n // 4):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await asgi({"type": "http", "method": "GET"}, None, sink)
+        return (time.perf_counter() - t0) / n
+
+    wrapped = asyncio.run(per_request(MetricsMiddleware(bare)))
+    result["middleware_us"] = round((wrapped - asyncio.run(per_request(bare))) * 1e6, 2)
+    result["metrics_bytes"] = len(metrics.render())
+    result["ok"] = all(result[name]["overhead_pct"] < 5 for name in routes)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+QR mikro benchmark: her istekte üretim (cold) vs QRCache'ten (cached), PNG ve SVG.
+
+    cd backend
+    python -m bench.qr_bench
+"""
+import json
+import timeit
+
+from app.qr_cache import QRCache, render_qr
+
+URL = "http://127.0.0.1:8000/s/AbCdEf1234"
+
+
+def main(n: int = 200):
+    out = {}
+    for fmt in ("png", "svg"):
+        cold = timeit.timeit(lambda: render_qr(URL, fmt), number=n) / n
+        cache = QRCache()
+        cache.get("AbCdEf1234", URL, fmt)
+        cached = timeit.timeit(lambda: cache.get("AbCdEf1234", URL, fmt), number=n * 100) / (n * 100)
+        out[fmt] = {
+            "cold_ms": round(cold * 1000, 3),
+            "cached_us": round(cached * 1e6, 3),
+            "speedup": round(cold / cached),
+            "bytes": len(render_qr(URL, fmt)),
+        }
+    print(json.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Dönen QR token imzalama / doğrulama maliyeti (saf CPU, DB yok).
+
+    cd backend
+    python -m bench.qr_token_bench
+"""
+import json
+import timeit
+
+from app.qr_tokens import make_token, verify_token
+
+
+def main(n: int = 200_000):
+    rotate = 30
+    window = int(1_700_000_000 // rotate)
+    now = window * rotate + 1
+    good = make_token(42, window)
+    bad = good[:-2] + ("AA" if not good.endswith("AA") else "BB")
+    stale = make_token(42, window - 10)
+
+    sign = timeit.timeit(lambda: make_token(42, window), number=n) / n
+    ok = timeit.timeit(lambda: verify_token(good, now, rotate, 2), number=n) / n
+    forged = timeit.timeit(lambda: verify_token(bad, now, rotate, 2), number=n) / n
+    old = timeit.timeit(lambda: verify_token(stale, now, rotate, 2), number=n) / n
+
+    assert verify_token(good, now, rotate, 2) == 42
+    assert verify_token(bad, now, rotate, 2) is None
+    assert verify_token(stale, now, rotate, 2) is None
+
+    print(json.dumps({
+        "sign_us": round(sign * 1e6, 3),
+        "verify_valid_us": round(ok * 1e6, 3),
+        "verify_forged_us": round(forged * 1e6, 3),
+        "verify_expired_us": round(old * 1e6, 3),
+    }))
+
+
+if __name__ == "__main__":
+    main()
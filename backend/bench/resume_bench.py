@@ -0,0 +1,147 @@
+"""
+Panel yenileme / WS yeniden bağlanma maliyeti: N katılımlı aktif oturumda son K yoklama kaçırılmış.
+
+- dashboard: /teacher render'ı (liste artık sayfaya gömülmüyor; SQL ifade sayısı N'den bağımsız)
+- delta_full: /teacher/session/{id}/attendances cursor'sız, tüm sayfalar (ilk açılış)
+- delta_missed: ?after=<K önceki cursor> -> K olay + geç commit edilen satır (timestamp'i cursor'ın
+  altında, cursor alındıktan sonra yazılmış) + lookback penceresindeki zaten görülmüş satırlar
+- ws_ring: /ws/session/{id}?after=<ilk canlı olayın cursor'ı> -> sonraki K-1 olay bellekteki halkadan
+  (DB'ye gitmeden)
+- ws_db: halka boşken (worker yeniden başlamış) aynı istek -> DB'den K olay + geç commit
+
+    cd backend
+    python -m bench.resume_bench --attended 5000 --missed 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--attended", type=int, default=5000)
+    ap.add_argument("--missed", type=int, default=10)
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-resume-')}/bench.db"
+    os.environ["CHECKIN_WRITE_BEHIND"] = "0"
+    os.environ["QR_ROTATE_SECONDS"] = "0"
+
+    from datetime import timedelta
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, insert, select
+
+    from app import main as app_main
+    from app.auth import create_access_token, COOKIE_NAME
+    from app.cli import init_db
+    from app.database import engine, SessionLocal
+    from app.models import User, ClassSession, Attendance
+
+    init_db()
+    total = args.attended + args.missed
+    with SessionLocal() as db:
+        db.execute(insert(User), [
+            {"username": f"r{i:06d}", "full_name": f"Öğrenci {i}", "password_hash": "-", "role": "student"}
+            for i in range(total + 1)
+        ])
+        ids = list(db.scalars(select(User.id).where(User.username.like("r%")).order_by(User.username)))
+        teacher_id = db.scalar(select(User.id).where(User.role == "teacher"))
+        now = app_main.utcnow()
+        session = ClassSession(course_name="Delta", session_code="resume", teacher_id=teacher_id, is_active=True,
+                               started_at=now - timedelta(minutes=30), expires_at=now + timedelta(hours=1))
+        db.add(session)
+        db.flush()
+        session_id = session.id
+        db.execute(insert(Attendance), [
+            {"session_id": session_id, "student_id": sid, "timestamp": session.started_at + timedelta(seconds=i % 1800)}
+            for i, sid in enumerate(ids[:args.attended])
+        ])
+        db.commit()
+
+    teacher_cookie = create_access_token({"sub": str(teacher_id), "role": "teacher", "name": "x"})
+    statements = []
+
+    def count(*a):
+        statements.append(a[2])
+
+    def measure(fn):
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", count)
+        t0 = time.perf_counter()
+        out = fn()
+        ms = (time.perf_counter() - t0) * 1000
+        event.remove(engine, "before_cursor_execute", count)
+        return out, round(ms, 2), len(statements)
+
+    results = {"attended": args.attended, "missed": args.missed}
+    with TestClient(app_main.app) as client:
+        client.cookies.set(COOKIE_NAME, teacher_cookie)
+        base = f"/teacher/session/{session_id}/attendances"
+
+        r, ms, n = measure(lambda: client.get("/teacher"))
+        results["dashboard"] = {"status": r.status_code, "ms": ms, "statements": n, "bytes": len(r.content)}
+
+        def full():
+            events, cursor, pages = [], None, 0
+            while True:
+                j = client.get(base + (f"?after={cursor}&exact=1" if cursor else "")).json()
+                pages += 1
+                events += j["events"]
+                cursor = j["cursor"]
+                if not j["more"]:
+                    return events, cursor, pages
+
+        (events, cursor, pages), ms, n = measure(full)
+        results["delta_full"] = {"events": len(events), "pages": pages, "ms": ms, "statements": n}
+        seen = {e["username"] for e in events}
+
+        # yazma kuyruğunda bekleyip cursor alındıktan sonra commit edilen satır: timestamp cursor'ın altında
+        late_ts = app_main.decode_cursor(cursor)[0] - timedelta(seconds=5)
+        with SessionLocal() as db:
+            db.execute(insert(Attendance), [{"session_id": session_id, "student_id": ids[total], "timestamp": late_ts}])
+            db.commit()
+
+        # K öğrenci panel kapalıyken katılır (yayın halkaya düşer)
+        for sid in ids[args.attended:]:
+            student = TestClient(app_main.app)
+            student.cookies.set(COOKIE_NAME, create_access_token({"sub": str(sid), "role": "student", "name": "x"}))
+            student.cookies.set(app_main.DEVICE_COOKIE, f"dev-{sid:08d}")
+            assert student.post("/s/resume/checkin").status_code == 200
+
+        r, ms, n = measure(lambda: client.get(f"{base}?after={cursor}"))
+        missed = [e["username"] for e in r.json()["events"] if e["username"] not in seen]
+        results["delta_missed"] = {"events": len(r.json()["events"]), "new": len(missed), "ms": ms, "statements": n}
+
+        def ws_resume(after):
+            with client.websocket_connect(f"/ws/session/{session_id}?after={after}") as ws:
+                return json.loads(ws.receive_text())
+
+        # halkada yalnız yayınlanan olaylar var: ilk canlı olaydan sonrasını iste
+        ring_after = next(e["cursor"] for e in r.json()["events"] if e["username"] == f"r{args.attended:06d}")
+        replayed_before = app_main.ws_manager.replayed
+        frame, ms, n = measure(lambda: ws_resume(ring_after))
+        results["ws_ring"] = {"events": len(frame), "ms": ms, "statements": n,
+                              "replayed": app_main.ws_manager.replayed - replayed_before}
+
+        app_main.ws_manager.forget(session_id)
+        frame_db, ms, n = measure(lambda: ws_resume(cursor))
+        missed_db = [e["username"] for e in frame_db if e["username"] not in seen]
+        results["ws_db"] = {"events": len(frame_db), "new": len(missed_db), "ms": ms, "statements": n}
+
+    # DB yolları geç commit edilen satırı da bulmalı
+    expected = [f"r{i:06d}" for i in range(args.attended, total)]
+    late = f"r{total:06d}"
+    results["ok"] = (
+        results["delta_full"]["events"] == args.attended
+        and missed == [late] + expected
+        and [e["username"] for e in frame] == expected[1:]
+        and missed_db == [late] + expected
+    )
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
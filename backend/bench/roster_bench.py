@@ -0,0 +1,92 @@
+"""
+Ders listesi ölçümü: kurumda N öğrenci varken kayıtlı (enrollment) 60 kişilik bir dersin
+detay sayfası, CSV ve XLSX raporu sınıf büyüklüğüyle ölçeklenmeli. Karşılaştırma için
+aynı DB'de kaydı olmayan bir dersin (eski davranış: tüm öğrenciler) süreleri de verilir.
+
+    cd backend
+    python -m bench.roster_bench --users 50000 --class-size 60
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50000)
+    ap.add_argument("--class-size", type=int, default=60)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='yoklama-roster-')}/bench.db"
+
+    from datetime import timedelta
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert, select
+
+    from app import main as app_main
+    from app.cli import init_db
+    from app.database import SessionLocal
+    from app.auth import create_access_token, COOKIE_NAME
+    from app.models import User, ClassSession, Attendance
+    from app.roster import get_or_create_course, enroll
+
+    init_db()
+    db = SessionLocal()
+    teacher = db.query(User).filter(User.role == "teacher").first()
+    db.execute(insert(User), [
+        {"username": f"r{i:07d}", "full_name": f"Öğrenci {i}", "password_hash": "-", "role": "student"}
+        for i in range(args.users)
+    ])
+    student_ids = list(db.scalars(select(User.id).where(User.role == "student").order_by(User.id)))
+    class_ids = student_ids[::max(1, len(student_ids) // args.class_size)][:args.class_size]
+
+    enrolled = get_or_create_course(db, teacher.id, "Kayıtlı Ders")
+    enroll(db, enrolled, class_ids)
+    legacy = get_or_create_course(db, teacher.id, "Kayıtsız Ders")
+
+    now = app_main.utcnow()
+    sessions = {}
+    for label, course in (("enrolled", enrolled), ("all_students", legacy)):
+        s = ClassSession(course_name=course.name, course_id=course.id, session_code=f"rb-{label}",
+                         teacher_id=teacher.id, is_active=False,
+                         started_at=now - timedelta(hours=1), expires_at=now)
+        db.add(s)
+        db.flush()
+        db.add_all([Attendance(session_id=s.id, student_id=sid, timestamp=s.started_at + timedelta(minutes=i % 20))
+                    for i, sid in enumerate(class_ids[::2])])
+        sessions[label] = s.id
+    db.commit()
+    cookie = create_access_token({"sub": str(teacher.id), "role": "teacher", "name": teacher.full_name})
+    db.close()
+
+    client = TestClient(app_main.app)
+    client.cookies.set(COOKIE_NAME, cookie)
+
+    def timed(url):
+        best = None
+        size = 0
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            resp = client.get(url)
+            ms = (time.perf_counter() - t0) * 1000
+            assert resp.status_code == 200, (url, resp.status_code)
+            size = len(resp.content)
+            best = ms if best is None else min(best, ms)
+        return {"best_ms": round(best, 2), "bytes": size}
+
+    result = {"users": args.users, "class_size": args.class_size}
+    for label, sid in sessions.items():
+        result[label] = {
+            "detail": timed(f"/teacher/session/{sid}"),
+            "csv": timed(f"/teacher/session/{sid}/export.csv"),
+            "xlsx": timed(f"/teacher/session/{sid}/export.xlsx"),
+        }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Çok worker'lı WebSocket yayın testi: uvicorn --workers N ile gerçek süreçler başlatır,
+birden çok hoca soketi açar (worker'lara dağılır), öğrenci yoklamalarının her sokete
+ulaştığını ve gecikmeyi ölçer.
+
+    cd backend
+    python -m bench.ws_fanout_bench --workers 4 --backend unix
+    python -m bench.ws_fanout_bench --burst --write-behind     # yoklamalar aynı anda (ders başı)
+    DATABASE_URL=postgresql://... python -m bench.ws_fanout_bench --backend postgres
+
+Sonuç JSON olarak yazılır; teslim edilmeyen mesaj varsa çıkış kodu 1'dir.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_up(base: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base}/login", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("sunucu ayağa kalkmadı")
+
+
+async def run(base: str, sockets: int, students: int, burst: bool) -> dict:
+    teacher = httpx.AsyncClient(base_url=base)
+    await teacher.post("/login", data={"username": "yavuz", "password": "YavuzSumer@123"})
+    await teacher.post("/teacher/start", data={"course_name": "Fanout", "duration_minutes": 60})
+    html = (await teacher.get("/teacher")).text
+    session_id = int(re.search(r"__SESSION_ID__ = Number\(\"(\d+)\"\)", html).group(1))
+    code = re.search(r"/qr/(\w+)\.png", html).group(1)
+
+    cookie = "; ".join(f"{k}={v}" for k, v in teacher.cookies.items())
+    ws_url = base.replace("http", "ws") + f"/ws/session/{session_id}"
+    conns = [await connect(ws_url, additional_headers={"Cookie": cookie}) for _ in range(sockets)]
+
+    sent_at = {}
+    received = [dict() for _ in conns]
+
+    async def reader(i, ws):
+        async for raw in ws:
+            now = time.perf_counter()
+            data = json.loads(raw)
+            for msg in (data if isinstance(data, list) else [data]):
+                received[i][msg["username"]] = now
+
+    readers = [asyncio.create_task(reader(i, ws)) for i, ws in enumerate(conns)]
+
+    clients = {}
+    for i in range(1, students + 1):
+        no = str(i).zfill(3)
+        c = clients[f"2025{no}"] = httpx.AsyncClient(base_url=base)
+        await c.post("/login", data={"username": f"2025{no}", "password": f"Sifre2025!{no}"})
+        await c.get(f"/s/{code}")
+
+    async def checkin(username, c):
+        sent_at[username] = time.perf_counter()
+        await c.post(f"/s/{code}/checkin")
+
+    if burst:
+        await asyncio.gather(*(checkin(u, c) for u, c in clients.items()))
+    else:
+        for u, c in clients.items():
+            await checkin(u, c)
+    for c in clients.values():
+        await c.aclose()
+
+    await asyncio.sleep(1.0)
+    for t in readers:
+        t.cancel()
+    for ws in conns:
+        await ws.close()
+    await teacher.post("/teacher/stop")
+    await teacher.aclose()
+
+    lat = [
+        (got[u] - sent_at[u]) * 1000
+        for got in received for u in sent_at if u in got
+    ]
+    expected = sockets * len(sent_at)
+    return {
+        "sockets": sockets,
+        "checkins": len(sent_at),
+        "expected": expected,
+        "delivered": len(lat),
+        "latency_ms_p50": round(statistics.median(lat), 2) if lat else None,
+        "latency_ms_p99": round(sorted(lat)[int(len(lat) * 0.99) - 1], 2) if lat else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--backend", choices=["memory", "unix", "postgres"], default="unix")
+    ap.add_argument("--sockets", type=int, default=8)
+    ap.add_argument("--students", type=int, default=20)
+    ap.add_argument("--burst", action="store_true", help="yoklamalar sırayla değil aynı anda")
+    ap.add_argument("--write-behind", action="store_true", help="CHECKIN_WRITE_BEHIND=1 (toplu yazıcı yayınlar)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="yoklama-ws-")
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tmp}/bench.db")
+    env["WS_BROADCAST_BACKEND"] = args.backend
+    env["WS_HUB_DIR"] = os.path.join(tmp, "hub")
+    if args.write_behind:
+        env["CHECKIN_WRITE_BEHIND"] = "1"
+
+    # Şema + seed tek seferde; worker'lar aynı anda seed'e girmesin
+    subprocess.run([sys.executable, "-m", "app.cli", "init-db"], env=env, check=True)
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(args.workers),
+         "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        wait_up(base)
+        # worker'ların hepsi hub'a kaydolsun
+        time.sleep(1.0)
+        result = asyncio.run(run(base, args.sockets, args.students, args.burst))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    result.update({"workers": args.workers, "backend": args.backend, "burst": args.burst,
+                   "write_behind": args.write_behind})
+    print(json.dumps(result))
+    sys.exit(0 if result["delivered"] == result["expected"] else 1)
+
+
+if __name__ == "__main__":
+    main()
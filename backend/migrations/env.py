@@ -0,0 +1,53 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import Base, engine, SYNC_DATABASE_URL
+from app import models  # noqa: F401  (tablolar Base.metadata'ya kaydolsun)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=SYNC_DATABASE_URL.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=SYNC_DATABASE_URL.get_backend_name() == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite ALTER TABLE kısıtlı; kolon/constraint değişiklikleri tablo kopyalanarak yapılır
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # app.cli init_db kendi bağlantısını verir; alembic CLI'dan çağrılırsa uygulamanın engine'i
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
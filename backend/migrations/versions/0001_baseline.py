@@ -0,0 +1,102 @@
+"""baseline: create_all ile kurulan şema (users, courses, class_sessions, attendances,
+enrollments, device_checkins)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("full_name", sa.String(150), nullable=False),
+        sa.Column("password_hash", sa.String(255), nullable=False),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "courses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("teacher_id", "name", name="uq_course_teacher_name"),
+    )
+    op.create_index("ix_courses_id", "courses", ["id"])
+    op.create_index("ix_courses_teacher_id", "courses", ["teacher_id"])
+
+    op.create_table(
+        "class_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("course_name", sa.String(200), nullable=False),
+        sa.Column("session_code", sa.String(32), nullable=False),
+        sa.Column("teacher_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_class_sessions_id", "class_sessions", ["id"])
+    op.create_index("ix_class_sessions_course_name", "class_sessions", ["course_name"])
+    op.create_index("ix_class_sessions_session_code", "class_sessions", ["session_code"], unique=True)
+    op.create_index("ix_class_sessions_course_id", "class_sessions", ["course_id"])
+    op.create_index("ix_class_sessions_teacher_started", "class_sessions", ["teacher_id", "started_at", "id"])
+
+    op.create_table(
+        "attendances",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("class_sessions.id"), nullable=False),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("session_id", "student_id", name="uq_session_student"),
+    )
+    op.create_index("ix_attendances_id", "attendances", ["id"])
+
+    op.create_table(
+        "enrollments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("course_id", "student_id", name="uq_course_student"),
+    )
+    op.create_index("ix_enrollments_id", "enrollments", ["id"])
+    op.create_index("ix_enrollments_student_id", "enrollments", ["student_id"])
+
+    op.create_table(
+        "device_checkins",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("class_sessions.id"), nullable=False),
+        sa.Column("device_id", sa.String(64), nullable=False),
+        sa.Column("student_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("session_id", "device_id", name="uq_session_device"),
+        sa.UniqueConstraint("session_id", "student_id", name="uq_session_student_once"),
+    )
+    op.create_index("ix_device_checkins_id", "device_checkins", ["id"])
+    op.create_index("ix_device_checkins_session_id", "device_checkins", ["session_id"])
+    op.create_index("ix_device_checkins_device_id", "device_checkins", ["device_id"])
+    op.create_index("ix_device_checkins_student_id", "device_checkins", ["student_id"])
+
+
+def downgrade():
+    op.drop_table("device_checkins")
+    op.drop_table("enrollments")
+    op.drop_table("attendances")
+    op.drop_table("class_sessions")
+    op.drop_table("courses")
+    op.drop_table("users")
@@ -0,0 +1,61 @@
+"""sıcak yollar için bileşik / kısmi indeksler, gereksiz tek kolon indekslerinin kaldırılması
+
+- attendances (session_id, timestamp): panel listesi ve canlı akış zaman sırasıyla
+- attendances (student_id): roster birleşimi, öğrenci tarafı aramalar
+- class_sessions (teacher_id, started_at) WHERE is_active: hocanın aktif oturumu
+- class_sessions (expires_at) WHERE is_active: süre dolumu taraması
+- users (role, username): raporlarda öğrenci listesi username sırasıyla
+- ix_*_id: primary key'in kopyası; ix_device_checkins_session_id: uq_session_device'ın ön eki;
+  ix_device_checkins_device_id: tek başına device_id ile sorgu yok
+
+create_all ile kurulmuş eski DB'lerde bazıları zaten olabilir; if_(not_)exists ile idempotent.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+ACTIVE_ONLY = {"sqlite_where": sa.text("is_active = 1"), "postgresql_where": sa.text("is_active")}
+
+REDUNDANT = [
+    ("ix_users_id", "users", ["id"]),
+    ("ix_courses_id", "courses", ["id"]),
+    ("ix_class_sessions_id", "class_sessions", ["id"]),
+    ("ix_attendances_id", "attendances", ["id"]),
+    ("ix_enrollments_id", "enrollments", ["id"]),
+    ("ix_device_checkins_id", "device_checkins", ["id"]),
+    ("ix_device_checkins_session_id", "device_checkins", ["session_id"]),
+    ("ix_device_checkins_device_id", "device_checkins", ["device_id"]),
+]
+
+
+def upgrade():
+    op.create_index("ix_attendances_session_ts", "attendances", ["session_id", "timestamp"], if_not_exists=True)
+    op.create_index("ix_attendances_student_id", "attendances", ["student_id"], if_not_exists=True)
+    op.create_index("ix_class_sessions_teacher_active", "class_sessions", ["teacher_id", "started_at"],
+                    if_not_exists=True, **ACTIVE_ONLY)
+    op.create_index("ix_class_sessions_active_expires", "class_sessions", ["expires_at"],
+                    if_not_exists=True, **ACTIVE_ONLY)
+    op.create_index("ix_users_role_username", "users", ["role", "username"], if_not_exists=True)
+
+    for name, table, _ in REDUNDANT:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+def downgrade():
+    for name, table, cols in REDUNDANT:
+        op.create_index(name, table, cols, if_not_exists=True)
+
+    op.drop_index("ix_users_role_username", table_name="users")
+    op.drop_index("ix_class_sessions_active_expires", table_name="class_sessions")
+    op.drop_index("ix_class_sessions_teacher_active", table_name="class_sessions")
+    op.drop_index("ix_attendances_student_id", table_name="attendances")
+    op.drop_index("ix_attendances_session_ts", table_name="attendances")
@@ -76,17 +76,46 @@
   }
   tick();
 
+  // ✅ Sayfa başına tek anahtar: ağ hatasında tekrar gönderilen istek sunucuda ilk cevabı alır
+  const idempotencyKey = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+  function sleep(ms) { return new Promise(r => setTimeout(r, ms)); }
+
+  async function post(url) {
+    const delays = [500, 1500, 3000];
+    for (let i = 0; ; i++) {
+      try {
+        const res = await fetch(url, {
+          method: "POST",
+          credentials: "include",
+          headers: { "Idempotency-Key": idempotencyKey }
+        });
+        // ✅ 429: sunucunun istediği kadar bekle, aynı anahtarla tekrar dene
+        if (res.status === 429 && i < delays.length) {
+          const after = parseFloat(res.headers.get("Retry-After") || "");
+          await sleep(after > 0 ? Math.min(after * 1000, 10000) : delays[i]);
+          continue;
+        }
+        if (res.status < 500 || i >= delays.length) return res;
+      } catch (e) {
+        if (i >= delays.length) throw e;
+      }
+      await sleep(delays[i]);
+    }
+  }
+
   // ✅ Yoklama al
   async function checkin() {
     setStatus("loading", "İşleniyor…", "Yoklama kaydın alınıyor, lütfen bekle.");
 
-    const url = `/s/${sessionCode}/checkin`;
+    const url = data.qrToken
+      ? `/s/${sessionCode}/checkin?t=${encodeURIComponent(data.qrToken)}`
+      : `/s/${sessionCode}/checkin`;
 
     try {
-      const res = await fetch(url, {
-        method: "POST",
-        credentials: "include"
-      });
+      const res = await post(url);
 
       // ✅ Eğer login'e yönlendirdiyse (cookie yoksa)
       if (res.redirected) {
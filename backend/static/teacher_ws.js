@@ -76,104 +76,209 @@
     return formatTRfromIso(iso);
   }
 
-  function upsertRow({ student_no, full_name, time_tr, timestamp_iso, status }) {
-    if (!tbody) return { isNew: false, finalStatus: status || "ZAMANINDA" };
+  // ✅ Katılan listesi tarayıcıda tutulur (sessionStorage): yenilemede / yeniden bağlanmada
+  // sunucudan yalnız son görülen cursor'dan sonrası istenir.
+  const storePrefix = "yoklama:attendance:";
+  const storeKey = storePrefix + sessionId;
+  const rows = new Map(); // student_no -> satır
+  let cursor = "";
 
-    const key = String(student_no || "");
-    const rowId = `att-row-${key}`;
-    let tr = document.getElementById(rowId);
+  function loadCache() {
+    try {
+      for (let i = sessionStorage.length - 1; i >= 0; i--) {
+        const k = sessionStorage.key(i);
+        if (k && k.startsWith(storePrefix) && k !== storeKey) sessionStorage.removeItem(k);
+      }
+      const saved = JSON.parse(sessionStorage.getItem(storeKey) || "null");
+      if (saved && Array.isArray(saved.rows)) {
+        saved.rows.forEach(r => rows.set(r.student_no, r));
+        cursor = saved.cursor || "";
+      }
+    } catch {
+      rows.clear();
+      cursor = "";
+    }
+  }
 
-    const finalStatus = status ? status : computeStatus(timestamp_iso);
+  let saveTimer = null;
+  function saveCache() {
+    if (saveTimer) return;
+    saveTimer = setTimeout(() => {
+      saveTimer = null;
+      try {
+        sessionStorage.setItem(storeKey, JSON.stringify({ cursor, rows: Array.from(rows.values()) }));
+      } catch {
+        // kota dolduysa önbelleksiz devam
+      }
+    }, 500);
+  }
 
-    // time_tr yoksa ISO'dan üret
-    const timeTR = (time_tr && String(time_tr).trim())
-      ? String(time_tr).trim()
-      : formatTRfromIso(timestamp_iso);
+  function resetCache() {
+    rows.clear();
+    cursor = "";
+    try { sessionStorage.removeItem(storeKey); } catch {}
+  }
 
-    const rowHtml = `
-      <td class="p-2">${student_no || ""}</td>
-      <td class="p-2">${full_name || ""}</td>
-      <td class="p-2">${timeTR}</td>
-      <td class="p-2">${badgeHtml(finalStatus)}</td>
-    `;
+  function toRow(data) {
+    // backend: timestamp + time_tr + status + cursor gönderiyor olmalı
+    const timestamp_iso = data.timestamp || "";
+    return {
+      student_no: String(data.username || ""),
+      full_name: data.full_name || "",
+      time_tr: resolveTimeTR(data),
+      timestamp_iso,
+      status: data.status || computeStatus(timestamp_iso),
+      cursor: data.cursor || ""
+    };
+  }
 
+  function isLate(status) {
+    const st = String(status || "").toUpperCase();
+    return st === "GEÇ" || st === "GEC";
+  }
+
+  function escapeHtml(v) {
+    return String(v || "").replace(/[&<>"']/g, c => ({
+      "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+    }[c]));
+  }
+
+  function rowElement(r) {
+    const rowId = `att-row-${r.student_no}`;
+    let tr = document.getElementById(rowId);
     if (!tr) {
       tr = document.createElement("tr");
       tr.className = "border-t";
       tr.id = rowId;
-      tr.innerHTML = rowHtml;
-      tbody.prepend(tr);
-      return { isNew: true, finalStatus };
-    } else {
-      tr.innerHTML = rowHtml;
-      return { isNew: false, finalStatus };
     }
+    tr.innerHTML = `
+      <td class="p-2">${escapeHtml(r.student_no)}</td>
+      <td class="p-2">${escapeHtml(r.full_name)}</td>
+      <td class="p-2">${escapeHtml(r.time_tr)}</td>
+      <td class="p-2">${badgeHtml(r.status)}</td>
+    `;
+    return tr;
   }
 
-  function incNumber(el, delta) {
-    if (!el) return;
-    const cur = Number((el.textContent || "").trim());
-    const next = (isNaN(cur) ? 0 : cur) + delta;
-    el.textContent = String(next);
+  function renderAll() {
+    if (!tbody) return;
+    const sorted = Array.from(rows.values()).sort((a, b) => (a.cursor < b.cursor ? 1 : a.cursor > b.cursor ? -1 : 0));
+    const frag = document.createDocumentFragment();
+    sorted.forEach(r => frag.appendChild(rowElement(r)));
+    tbody.replaceChildren(frag);
   }
 
-  function decNumber(el, delta) {
-    incNumber(el, -delta);
+  function recount() {
+    let late = 0;
+    rows.forEach(r => { if (isLate(r.status)) late += 1; });
+    if (typeof window.__setStats === "function") {
+      window.__setStats(rows.size, late);
+    } else {
+      if (elPresent) elPresent.textContent = String(rows.size);
+      if (elLate) elLate.textContent = String(late);
+    }
   }
 
-  // WS bağlantısı
-  const proto = window.location.protocol === "https:" ? "wss" : "ws";
-  const wsUrl = `${proto}://${window.location.host}/ws/session/${sessionId}`;
-  const ws = new WebSocket(wsUrl);
-
-  ws.addEventListener("open", () => {
-    setInterval(() => {
-      if (ws.readyState === 1) ws.send("ping");
-    }, 25000);
-  });
+  // Olayları uygular; aynı öğrenci ikinci kez gelirse (replay ile canlı yayın çakışması) yeni satır açılmaz
+  function apply(events, bulk) {
+    events.forEach(ev => {
+      const r = toRow(ev);
+      if (!r.student_no) return;
+      if (r.cursor > cursor) cursor = r.cursor;
+      const isNew = !rows.has(r.student_no);
+      rows.set(r.student_no, r);
+      if (!bulk && tbody) {
+        const tr = rowElement(r);
+        if (isNew) tbody.prepend(tr);
+      }
+    });
+    if (bulk) renderAll();
+    recount();
+    saveCache();
+  }
 
-  ws.addEventListener("message", (evt) => {
-    let data;
-    try {
-      data = JSON.parse(evt.data);
-    } catch {
-      return;
+  // İlk istek kayıtlı cursor'la gider (sunucu geç commit'ler için biraz geriden başlar);
+  // sonraki sayfalar sunucunun döndürdüğü cursor'la, exact=1 (saf keyset) ile istenir.
+  async function catchUp() {
+    let retried = false;
+    let page = "";
+    for (;;) {
+      const after = page || cursor;
+      const url = `/teacher/session/${sessionId}/attendances` +
+        (after ? `?after=${encodeURIComponent(after)}` + (page ? "&exact=1" : "") : "");
+      let res;
+      try {
+        res = await fetch(url, { credentials: "same-origin" });
+      } catch {
+        return;
+      }
+      if (res.status === 400 && !retried) {
+        // bozuk cursor: önbelleği bırak, baştan al
+        retried = true;
+        page = "";
+        resetCache();
+        continue;
+      }
+      if (!res.ok) return;
+      const j = await res.json();
+      apply(j.events || [], true);
+      if (!j.more || !(j.events || []).length) return;
+      page = j.cursor;
     }
+  }
 
-    const student_no = data.username || "";
-    const full_name = data.full_name || "";
+  // WS bağlantısı: kopunca artan beklemeyle yeniden bağlanır, ?after=cursor ile yalnız kaçırılanları alır
+  const proto = window.location.protocol === "https:" ? "wss" : "ws";
+  let retry = 0;
+  let closed = false;
 
-    // backend: timestamp + time_tr + status gönderiyor olmalı
-    const timestamp_iso = data.timestamp || "";
-    const time_tr = resolveTimeTR(data);
+  // ✅ Oturum kapandı (süre doldu / hoca durdurdu): tekrar bağlanma, sayfa "aktif oturum yok" hâline dönsün
+  function sessionClosed(ws) {
+    if (closed) return;
+    closed = true;
+    ws.close(1000);
+    setTimeout(() => window.location.reload(), 1500);
+  }
 
-    let status = data.status || "";
-    if (!status) status = computeStatus(timestamp_iso);
+  function connect() {
+    const wsUrl = `${proto}://${window.location.host}/ws/session/${sessionId}` +
+      (cursor ? `?after=${encodeURIComponent(cursor)}` : "");
+    const ws = new WebSocket(wsUrl);
+    let pingTimer = null;
 
-    const { isNew, finalStatus } = upsertRow({
-      student_no,
-      full_name,
-      time_tr,
-      timestamp_iso,
-      status
+    ws.addEventListener("open", () => {
+      retry = 0;
+      pingTimer = setInterval(() => {
+        if (ws.readyState === 1) ws.send("ping");
+      }, 25000);
     });
 
-    if (isNew) {
-      // Eğer teacher_dashboard.html içinde helper varsa
-      if (typeof window.__updateStats === "function") {
-        const isLate = String(finalStatus).toUpperCase() === "GEÇ" || String(finalStatus).toUpperCase() === "GEC";
-        window.__updateStats(1, isLate ? 1 : 0);
-      } else {
-        incNumber(elPresent, 1);
-        decNumber(elAbsent, 1);
-        if (String(finalStatus).toUpperCase() === "GEÇ" || String(finalStatus).toUpperCase() === "GEC") {
-          incNumber(elLate, 1);
-        }
+    ws.addEventListener("message", (evt) => {
+      let data;
+      try {
+        data = JSON.parse(evt.data);
+      } catch {
+        return;
       }
-    }
-  });
 
-  ws.addEventListener("close", () => {
-    // şimdilik boş
-  });
+      // Sunucu olayları toplu gönderir: frame = olay listesi (yeniden bağlanmada kaçırılanlar da)
+      const events = Array.isArray(data) ? data : [data];
+      const attendance = events.filter(ev => ev && ev.type !== "session_closed");
+      if (attendance.length) apply(attendance, attendance.length > 20);
+      if (attendance.length < events.length) sessionClosed(ws);
+    });
+
+    ws.addEventListener("close", (evt) => {
+      if (pingTimer) clearInterval(pingTimer);
+      // yetki yok / oturum başkasının: tekrar deneme
+      if (closed || evt.code === 4401 || evt.code === 4403) return;
+      const delay = Math.min(15000, 1000 * Math.pow(2, retry));
+      retry += 1;
+      setTimeout(connect, delay);
+    });
+  }
+
+  loadCache();
+  if (rows.size) renderAll();
+  catchUp().then(connect);
 })();
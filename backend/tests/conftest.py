@@ -0,0 +1,93 @@
+"""
+Ortak test düzeni. app modülleri ayarları import anında okur: ortam burada, app import
+edilmeden önce kurulur. Varsayılan DB geçici SQLite; TEST_DATABASE_URL ile BOŞ bir Postgres
+test DB'sine karşı da çalışır (sorgu planı testleri o zaman Postgres planlarını denetler).
+
+    cd backend
+    python -m pytest -q
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+TMP_DIR = tempfile.mkdtemp(prefix="yoklama-test-")
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{TMP_DIR}/test.db"
+os.environ["DB_INIT_ON_STARTUP"] = "0"
+os.environ["WS_BROADCAST_BACKEND"] = "memory"
+# bellek içi kısayollar (yazma kuyruğu, dönen QR token'ı, hız sınırı) ayrı testlerde açıkça kurulur
+os.environ["CHECKIN_WRITE_BEHIND"] = "0"
+os.environ["QR_ROTATE_SECONDS"] = "0"
+os.environ["CHECKIN_DEVICE_RATE"] = "0"
+os.environ["CHECKIN_STUDENT_RATE"] = "0"
+# seed hash'leri testte ucuz olsun
+os.environ["ARGON2_TIME_COST"] = "1"
+os.environ["ARGON2_MEMORY_COST"] = "1024"
+
+
+@pytest.fixture(scope="session")
+def app_main():
+    from app import main
+    from app.cli import init_db
+
+    init_db()
+    return main
+
+
+@pytest.fixture
+def db(app_main):
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client_for(app_main):
+    """
+    client_for(user_id, role, device_id=None) -> TestClient (lifespan çalışmaz).
+    """
+    from fastapi.testclient import TestClient
+
+    from app.auth import COOKIE_NAME
+    from tests.helpers import cookie_for
+
+    def make(user_id: int, role: str, device_id: str | None = None) -> TestClient:
+        client = TestClient(app_main.app)
+        client.cookies.set(COOKIE_NAME, cookie_for(user_id, role))
+        if device_id:
+            client.cookies.set(app_main.DEVICE_COOKIE, device_id)
+        return client
+
+    return make
+
+
+@pytest.fixture
+def statements(app_main):
+    """
+    Blok içinde çalışan SQL ifadeleri:
+
+        with statements() as seen:
+            ...
+        assert len(seen) <= N
+    """
+    from sqlalchemy import event
+
+    from app.database import engine
+
+    @contextmanager
+    def capture():
+        seen = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            seen.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield seen
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return capture
@@ -0,0 +1,45 @@
+"""
+Test verisi kurucuları; app modülleri çağrı anında import edilir (ortam conftest'te kurulur).
+"""
+from datetime import timedelta
+
+
+def cookie_for(user_id: int, role: str) -> str:
+    from app.auth import create_access_token
+
+    return create_access_token({"sub": str(user_id), "role": role, "name": "test"})
+
+
+def make_user(db, username: str, role: str = "student", full_name: str | None = None) -> int:
+    from app.models import User
+
+    user = User(username=username, full_name=full_name or username, password_hash="-", role=role)
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def make_students(db, prefix: str, count: int) -> list[int]:
+    from sqlalchemy import insert, select
+
+    from app.models import User
+
+    db.execute(insert(User), [
+        {"username": f"{prefix}{i:06d}", "full_name": f"Öğrenci {i}", "password_hash": "-", "role": "student"}
+        for i in range(count)
+    ])
+    db.commit()
+    return list(db.scalars(select(User.id).where(User.username.like(f"{prefix}%")).order_by(User.username)))
+
+
+def make_session(db, teacher_id: int, code: str, active: bool = True, minutes: int = 60, **fields) -> int:
+    from app.main import utcnow
+    from app.models import ClassSession
+
+    now = utcnow()
+    session = ClassSession(course_name=fields.pop("course_name", "Test"), session_code=code, teacher_id=teacher_id,
+                           is_active=active, started_at=fields.pop("started_at", now),
+                           expires_at=fields.pop("expires_at", now + timedelta(minutes=minutes)), **fields)
+    db.add(session)
+    db.commit()
+    return session.id
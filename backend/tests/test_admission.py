@@ -0,0 +1,20 @@
+def test_limited_device_does_not_spend_student_tokens(monkeypatch):
+    from app import admission
+
+    checkin = admission.CheckinAdmission()
+    checkin.students = admission.TokenBuckets(rate=1.0, burst=2)
+    checkin.devices = admission.TokenBuckets(rate=1.0, burst=1)
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+
+    assert checkin.rate_limit("phone-a", 7) is None
+    # cihaz kovası boş: öğrencinin kalan jetonu harcanmaz
+    for _ in range(5):
+        assert checkin.rate_limit("phone-a", 7) == 1
+    assert checkin.rate_limit("phone-b", 7) is None
+    assert checkin.devices.limited == 5 and checkin.students.limited == 0
+
+    # öğrenci kovası boş: yeni cihazın jetonu da harcanmaz
+    assert checkin.rate_limit("phone-c", 7) == 1
+    now[0] += 1.0
+    assert checkin.rate_limit("phone-c", 7) is None
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import socket
+
+
+def hub_with_peer(tmp_path):
+    hub = tmp_path / "hub"
+    os.makedirs(hub)
+    peer = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    peer.bind(str(hub / "worker-peer.sock"))
+    peer.setblocking(False)
+    return str(hub), peer
+
+
+def read_all(peer) -> list[dict]:
+    out = []
+    while True:
+        try:
+            out.append(json.loads(peer.recv(65536)))
+        except BlockingIOError:
+            return out
+
+
+async def drain(peer, backend) -> list[dict]:
+    """
+    Alıcı okudukça bekleyen sıra add_writer ile boşalır.
+    """
+    got = []
+    for _ in range(200):
+        got += read_all(peer)
+        if not any(p.queue for p in backend.peers.values()):
+            await asyncio.sleep(0.01)
+            return got + read_all(peer)
+        await asyncio.sleep(0.01)
+    return got
+
+
+def test_unix_backend_queues_when_peer_is_full(tmp_path):
+    from app.broadcast import UnixSocketBackend
+
+    hub, peer = hub_with_peer(tmp_path)
+
+    async def go():
+        local = []
+
+        async def deliver(session_id, message):
+            local.append(message["i"])
+
+        backend = UnixSocketBackend(hub)
+        await backend.start(deliver)
+        # writer'ı yield etmeden yayınlayan toplu yazıcı gibi: alıcı kuyruğu (max_dgram_qlen) aşılır
+        for i in range(300):
+            await backend.publish(1, {"i": i})
+        got = await drain(peer, backend)
+        await backend.stop()
+        return local, got, backend.dropped
+
+    local, got, dropped = asyncio.run(go())
+    assert local == list(range(300))  # yerel soketler datagram'a gerek duymaz
+    assert [m["hello"] for m in got if "hello" in m]
+    assert [m["message"]["i"] for m in got if "message" in m] == list(range(300))
+    assert dropped == 0
+
+
+def test_unix_backend_counts_drops_past_queue_limit(tmp_path):
+    from app.broadcast import UnixSocketBackend
+
+    hub, peer = hub_with_peer(tmp_path)
+
+    async def go():
+        async def deliver(session_id, message):
+            pass
+
+        backend = UnixSocketBackend(hub, queue_max=20)
+        await backend.start(deliver)
+        for i in range(300):
+            await backend.publish(1, {"i": i})
+        got = await drain(peer, backend)
+        await backend.stop()
+        return got, backend.dropped
+
+    got, dropped = asyncio.run(go())
+    delivered = [m["message"]["i"] for m in got if "message" in m]
+    assert dropped > 0
+    assert len(delivered) + dropped == 300
+    assert delivered == sorted(delivered)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+
+
+class FakeNotify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class FakeConn:
+    """
+    psycopg2 bağlantısı yerine: okuyucu için gerçek bir fd (socketpair), poll() ve notifies.
+    """
+
+    def __init__(self):
+        self.sock, self.remote = socket.socketpair()
+        self.executed = []
+        self.notifies = []
+        self.broken = False
+        self.closed = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def poll(self):
+        import psycopg2
+
+        self.sock.recv(1024)
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def notify(self, payload: str):
+        self.notifies.append(FakeNotify(payload))
+        self.remote.send(b"x")
+
+    def close(self):
+        self.closed = 1
+        self.sock.close()
+        self.remote.close()
+
+
+def test_pg_backend_relistens_after_connection_loss(monkeypatch):
+    from app import broadcast
+
+    monkeypatch.setattr(broadcast, "WS_PG_RECONNECT_MIN_SECONDS", 0.01)
+    conns = []
+    failures = [1]  # kopuştan sonraki ilk bağlantı denemesi de başarısız
+
+    def connect():
+        if len(conns) >= 2 and failures:
+            failures.pop()
+            raise OSError("connection refused")
+        conns.append(FakeConn())
+        return conns[-1]
+
+    backend = broadcast.PostgresNotifyBackend(engine=None)
+    monkeypatch.setattr(backend, "_connect", connect)
+
+    async def go():
+        got = []
+
+        async def deliver(session_id, message):
+            got.append(message["n"])
+
+        await backend.start(deliver)
+        listen = backend.conn
+        listen.notify(json.dumps({"session_id": 1, "message": {"n": 1}}))
+        await asyncio.sleep(0.05)
+
+        listen.broken = True
+        listen.remote.send(b"x")
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if backend.conn is not None and backend.conn is not listen:
+                break
+        relisten = backend.conn
+        relisten.notify(json.dumps({"session_id": 1, "message": {"n": 2}}))
+        await asyncio.sleep(0.05)
+        await backend.stop()
+        return got, listen, relisten
+
+    got, listen, relisten = asyncio.run(go())
+    assert got == [1, 2]
+    assert backend.listen_lost == 1
+    assert listen.closed and relisten is not listen
+    assert relisten.executed == ['LISTEN "yoklama_ws"']
+    assert not failures
@@ -0,0 +1,77 @@
+"""
+Eşzamanlı yoklama doğruluğu: 500 istek aynı anda uygulamaya gönderilir.
+
+- 150 öğrenci kendi telefonundan: aynı Idempotency-Key ile 2 istek (ağ tekrarı) + yeni anahtarla 1 (çift dokunuş)
+- 25 öğrenci bu telefonlardan 25'ini ödünç alır: aynı anahtarla 2 istek (telefon sahibiyle yarışır)
+"""
+import asyncio
+from collections import Counter, defaultdict
+
+from tests.helpers import cookie_for, make_session, make_students, make_user
+
+SOLO = 150
+BORROWERS = 25
+# çakışmasız tek yoklama: oturum (önbellek boşsa) + cihaz kilidi ve yoklama INSERT ... ON CONFLICT + öğrenci satırı
+MAX_SINGLE_CHECKIN_STATEMENTS = 4
+
+
+def test_concurrent_checkins_keep_exact_counts(db, app_main, statements):
+    import httpx
+    from sqlalchemy import func, select
+
+    from app.auth import COOKIE_NAME
+    from app.models import Attendance, DeviceCheckin
+
+    teacher_id = make_user(db, "conc-teacher", role="teacher")
+    ids = make_students(db, "conc-", SOLO + BORROWERS + 1)
+    session_id = make_session(db, teacher_id, "conc0001")
+    make_session(db, teacher_id, "conc0002")
+
+    solo, borrowers, spare = ids[:SOLO], ids[SOLO:SOLO + BORROWERS], ids[-1]
+    device = {sid: f"conc-dev-{sid:08d}" for sid in solo}
+    plan = []  # (student_id, device_id, key)
+    for sid in solo:
+        plan += [(sid, device[sid], f"a-{sid}"), (sid, device[sid], f"a-{sid}"), (sid, device[sid], f"b-{sid}")]
+    shared = dict(zip(borrowers, solo[::SOLO // BORROWERS]))  # ödünç alan -> telefon sahibi
+    for sid, owner in shared.items():
+        plan += [(sid, device[owner], f"a-{sid}"), (sid, device[owner], f"a-{sid}")]
+
+    async def go():
+        async with app_main.app.router.lifespan_context(app_main.app):
+            transport = httpx.ASGITransport(app=app_main.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                async def post(code, sid, dev, key):
+                    headers = {"Cookie": f"{COOKIE_NAME}={cookie_for(sid, 'student')}; "
+                                         f"{app_main.DEVICE_COOKIE}={dev}",
+                               "Idempotency-Key": key}
+                    r = await client.post(f"/s/{code}/checkin", headers=headers)
+                    return r.status_code, r.text
+
+                replies = await asyncio.gather(*(post("conc0001", *p) for p in plan))
+                with statements() as seen:
+                    single = await post("conc0002", spare, "conc-dev-single", "single")
+        return replies, single, seen
+
+    replies, single, seen = asyncio.run(go())
+
+    db.expire_all()
+    attended = set(db.scalars(select(Attendance.student_id).where(Attendance.session_id == session_id)))
+    locks = db.scalar(select(func.count(DeviceCheckin.id)).where(DeviceCheckin.session_id == session_id))
+
+    by_key = defaultdict(set)
+    for (sid, _, key), reply in zip(plan, replies):
+        by_key[(sid, key)].add(reply)
+    ok_keys = {k for k, rs in by_key.items() if any("✅" in body for _, body in rs)}
+    statuses = Counter(code for code, _ in replies)
+
+    assert not [code for code in statuses if code >= 500], statuses
+    assert len(attended) == SOLO
+    assert locks == SOLO
+    # paylaşılan her telefonda sahibiyle ödünç alandan tam biri yoklamada
+    assert all((owner in attended) != (sid in attended) for sid, owner in shared.items())
+    # aynı anahtarlı istekler aynı cevabı almış
+    assert all(len(rs) == 1 for rs in by_key.values())
+    assert {sid for sid, _ in ok_keys} == attended
+
+    assert single[0] == 200 and "✅" in single[1]
+    assert len(seen) <= MAX_SINGLE_CHECKIN_STATEMENTS
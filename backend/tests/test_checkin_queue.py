@@ -0,0 +1,112 @@
+"""
+Write-behind kuyruğu: cevap commit sonucudur. Yazılamayan yoklama "alındı" almaz; başka worker'da /
+restart öncesi alınmış kilit submit'te DB'ye gitmeden, batch'teki ON CONFLICT ile çözülür.
+"""
+import asyncio
+
+from tests.helpers import make_session, make_students, make_user
+
+
+async def noop(rows):
+    pass
+
+
+def run_queue(queue, body):
+    async def go():
+        queue.start()
+        try:
+            return await body()
+        finally:
+            await queue.stop()
+
+    return asyncio.run(go())
+
+
+def test_reply_waits_for_commit(db, app_main, statements):
+    from sqlalchemy import select
+
+    from app.checkin_queue import CheckinQueue
+    from app.models import Attendance
+
+    teacher_id = make_user(db, "cq-teacher-ok", role="teacher")
+    a, b = make_students(db, "cqok-", 2)
+    session_id = make_session(db, teacher_id, "cqok0001")
+    queue = CheckinQueue(noop, batch_ms=20)
+
+    async def body():
+        with statements() as seen:
+            first = queue.submit(session_id, a, "cq-dev-a", app_main.utcnow())
+            again = queue.submit(session_id, a, "cq-dev-a", app_main.utcnow())  # çift dokunuş
+            other = queue.submit(session_id, b, "cq-dev-b", app_main.utcnow())
+        assert not seen  # submit DB'ye gitmez
+        return [await queue.outcome(f) for f in (first, again, other)]
+
+    assert run_queue(queue, body) == ["ok", "duplicate", "ok"]
+    assert set(db.scalars(select(Attendance.student_id).where(Attendance.session_id == session_id))) == {a, b}
+    assert not queue.pending
+
+
+def test_locks_taken_elsewhere_are_settled_by_the_batch(db, app_main):
+    from app.checkin_queue import CheckinQueue
+    from app.models import DeviceCheckin
+
+    teacher_id = make_user(db, "cq-teacher-lock", role="teacher")
+    owner, borrower, other_phone = make_students(db, "cqlock-", 3)
+    session_id = make_session(db, teacher_id, "cqlk0001")
+    # başka worker'ın yazdığı kilitler: bu kuyruğun indeksi boş
+    db.add_all([DeviceCheckin(session_id=session_id, device_id="cq-shared", student_id=owner),
+                DeviceCheckin(session_id=session_id, device_id="cq-own", student_id=other_phone)])
+    db.commit()
+    queue = CheckinQueue(noop, batch_ms=20)
+
+    async def body():
+        borrowed = queue.submit(session_id, borrower, "cq-shared", app_main.utcnow())
+        repeated = queue.submit(session_id, other_phone, "cq-new", app_main.utcnow())
+        results = [await queue.outcome(borrowed), await queue.outcome(repeated)]
+        # sonuçtan sonra indeks doğru: ödünç cihaz kimseye yazılmadı, öğrenci yoklamada
+        results.append(queue.submit(session_id, other_phone, "cq-new", app_main.utcnow()))
+        return results
+
+    assert run_queue(queue, body) == ["device_used", "duplicate", "duplicate"]
+    assert queue.lost_lock == 1
+
+
+def test_failed_batch_is_not_acknowledged(db, app_main, monkeypatch):
+    from app.checkin_queue import CheckinQueue
+
+    teacher_id = make_user(db, "cq-teacher-fail", role="teacher")
+    (student,) = make_students(db, "cqfail-", 1)
+    session_id = make_session(db, teacher_id, "cqfl0001")
+    queue = CheckinQueue(noop, batch_ms=0, retries=1, backoff_ms=1)
+
+    def broken(db, batch):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(queue, "_write", broken)
+
+    async def body():
+        pending = queue.submit(session_id, student, "cq-dev-fail", app_main.utcnow())
+        result = await queue.outcome(pending)
+        monkeypatch.undo()
+        assert queue.submit(session_id, student, "cq-dev-fail", app_main.utcnow()) == "failing"
+        while queue.failing:  # DB'ye tekrar ulaşılınca kuyruk açılır
+            await asyncio.sleep(0.01)
+        # indeksten düştü: tekrar okutunca yeniden yazılır
+        again = queue.submit(session_id, student, "cq-dev-fail", app_main.utcnow())
+        return result, await queue.outcome(again)
+
+    assert run_queue(queue, body) == ("failed", "ok")
+    assert queue.failed == 1 and queue.retried == 1
+
+    # route: yazılamayan / gecikmiş yoklamaya "alındı" denmez
+    monkeypatch.setattr(app_main, "checkin_queue", queue)
+    monkeypatch.setattr(queue, "commit_timeout", 0.01)
+
+    async def replies():
+        failed = asyncio.get_running_loop().create_future()
+        failed.set_result("failed")
+        late = asyncio.get_running_loop().create_future()
+        return [await app_main.queued_checkin_reply("Ders", f) for f in (failed, late)]
+
+    assert [status for status, _ in asyncio.run(replies())] == [503, 503]
+    assert queue.timed_out == 1
@@ -0,0 +1,48 @@
+"""
+Soğuk başlangıç: `import app.main` DB'ye dokunmamalı; init-db tekrar çalışınca seed'i yeniden yazmamalı.
+Her ölçüm temiz bir süreçte (app modülleri ayarları import anında okur). Süreler için bench/cold_start.py.
+"""
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+from sqlalchemy import event
+from app import database
+n = []
+event.listen(database.engine, "before_cursor_execute", lambda *a: n.append(1))
+import app.main
+print(len(n))
+"""
+
+INIT_PROBE = """
+from sqlalchemy import event
+from app import database
+from app.cli import init_db
+writes = []
+event.listen(database.engine, "before_cursor_execute",
+             lambda conn, cur, stmt, *a: writes.append(stmt) if stmt.lstrip().upper().startswith("INSERT") else None)
+init_db()
+print(len(writes))
+"""
+
+
+def probe(code: str, db_path) -> int:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_INIT_ON_STARTUP="0")
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=BACKEND_DIR, capture_output=True, text=True,
+                         check=True)
+    return int(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_runs_no_sql(tmp_path):
+    db_path = tmp_path / "cold.db"
+    assert probe(IMPORT_PROBE, db_path) == 0
+    assert not db_path.exists()
+
+
+def test_init_db_seeds_once(tmp_path):
+    db_path = tmp_path / "init.db"
+    assert probe(INIT_PROBE, db_path) > 0
+    assert probe(INIT_PROBE, db_path) == 0
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from tests.helpers import make_session, make_students, make_user
+
+# /teacher render'ı katılan sayısından bağımsız sabit sayıda SQL çalıştırmalı (eski hali: öğrenci başına bir SELECT)
+MAX_STATEMENTS = 5
+
+
+def attend(db, session_id: int, student_ids: list[int], started_at, late_after: int):
+    from sqlalchemy import insert
+
+    from app.models import Attendance
+
+    db.execute(insert(Attendance), [
+        {"session_id": session_id, "student_id": sid,
+         "timestamp": started_at + timedelta(minutes=1 if i < late_after else 20)}
+        for i, sid in enumerate(student_ids)
+    ])
+    db.commit()
+
+
+def dashboard(client_for, statements, teacher_id: int):
+    client = client_for(teacher_id, "teacher")
+    with statements() as seen:
+        resp = client.get("/teacher")
+    assert resp.status_code == 200
+    return resp, seen
+
+
+def test_dashboard_statements_do_not_grow_with_attendance(db, app_main, client_for, statements):
+    counts = {}
+    for n in (3, 400):
+        teacher_id = make_user(db, f"dash-teacher-{n}", role="teacher")
+        started_at = app_main.utcnow() - timedelta(minutes=30)
+        session_id = make_session(db, teacher_id, f"dash{n:04d}", started_at=started_at)
+        attend(db, session_id, make_students(db, f"dash{n}-", n), started_at, late_after=n // 2)
+        _, seen = dashboard(client_for, statements, teacher_id)
+        counts[n] = len(seen)
+
+    assert counts[400] == counts[3]
+    assert counts[400] <= MAX_STATEMENTS
+
+
+def test_dashboard_counts_use_late_rule(db, app_main, client_for, statements):
+    teacher_id = make_user(db, "dash-teacher-counts", role="teacher")
+    started_at = app_main.utcnow() - timedelta(minutes=30)
+    session_id = make_session(db, teacher_id, "dashcnt1", started_at=started_at)
+    attend(db, session_id, make_students(db, "dashcnt-", 12), started_at, late_after=7)
+
+    resp, _ = dashboard(client_for, statements, teacher_id)
+    assert 'id="present-count">12<' in resp.text
+    assert 'id="late-count">5<' in resp.text
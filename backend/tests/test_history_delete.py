@@ -0,0 +1,96 @@
+import time
+from datetime import timedelta
+
+from tests.helpers import make_students, make_user
+
+SMALL, LARGE = 5, 600
+
+
+def make_history(db, app_main, teacher_id: int, sessions: int, student_ids: list[int]) -> list[int]:
+    from sqlalchemy import insert, select
+
+    from app.models import Attendance, ClassSession, DeviceCheckin
+
+    now = app_main.utcnow()
+    db.execute(insert(ClassSession), [
+        {"course_name": "Sil", "session_code": f"h{teacher_id}x{i:06d}", "teacher_id": teacher_id, "is_active": False,
+         "started_at": now - timedelta(hours=i + 1), "expires_at": now - timedelta(hours=i + 1) + timedelta(minutes=15)}
+        for i in range(sessions)
+    ])
+    ids = list(db.scalars(select(ClassSession.id).where(ClassSession.teacher_id == teacher_id)))
+    db.execute(insert(Attendance), [
+        {"session_id": sid, "student_id": st, "timestamp": now} for sid in ids for st in student_ids
+    ])
+    db.execute(insert(DeviceCheckin), [
+        {"session_id": sid, "student_id": st, "device_id": f"dev-{st}"} for sid in ids for st in student_ids
+    ])
+    db.commit()
+    return ids
+
+
+def rows_left(db, session_ids: list[int]) -> int:
+    from sqlalchemy import func, select
+
+    from app.models import Attendance, ClassSession, DeviceCheckin
+
+    db.expire_all()
+    return sum(
+        db.scalar(select(func.count()).select_from(model).where(column.in_(session_ids)))
+        for model, column in ((ClassSession, ClassSession.id), (Attendance, Attendance.session_id),
+                              (DeviceCheckin, DeviceCheckin.session_id))
+    )
+
+
+def test_delete_all_statements_do_not_grow_with_history(db, app_main, client_for, statements):
+    student_ids = make_students(db, "hdel-", 3)
+    counts = {}
+    for n in (SMALL, LARGE):
+        teacher_id = make_user(db, f"hdel-teacher-{n}", role="teacher")
+        ids = make_history(db, app_main, teacher_id, n, student_ids)
+        client = client_for(teacher_id, "teacher")
+        with statements() as seen:
+            resp = client.post("/teacher/history/delete-all", follow_redirects=False)
+        assert resp.status_code == 302
+        assert rows_left(db, ids) == 0
+        counts[n] = len(seen)
+
+    assert counts[LARGE] == counts[SMALL]
+
+
+def test_delete_all_in_background_chunks(db, app_main, client_for, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import history_purge
+    from app.auth import COOKIE_NAME
+    from tests.helpers import cookie_for, make_session
+
+    started = []
+
+    def start_during_purge(db, teacher_id, chunk_size, up_to):
+        # silme sürerken hoca yeni ders başlatır: iş başladığında yoktu, silinmemeli
+        if not started:
+            started.append(make_session(db, teacher_id, "hdelnew01"))
+        return purge_chunk(db, teacher_id, chunk_size, up_to)
+
+    purge_chunk = history_purge.purge_chunk
+    monkeypatch.setattr(history_purge, "purge_chunk", start_during_purge)
+    monkeypatch.setattr(app_main, "HISTORY_DELETE_SYNC_MAX", 0)
+    monkeypatch.setattr(app_main.history_purger, "chunk_size", 100)
+    teacher_id = make_user(db, "hdel-teacher-bg", role="teacher")
+    other_id = make_user(db, "hdel-teacher-other", role="teacher")
+    student_ids = make_students(db, "hdelbg-", 2)
+    ids = make_history(db, app_main, teacher_id, 450, student_ids)
+    kept = make_history(db, app_main, other_id, 3, student_ids)
+
+    with TestClient(app_main.app) as client:
+        client.cookies.set(COOKIE_NAME, cookie_for(teacher_id, "teacher"))
+        assert client.post("/teacher/history/delete-all", follow_redirects=False).status_code == 302
+        deadline = time.monotonic() + 30
+        while not (status := client.get("/teacher/history/delete-all/status").json())["done"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+    assert status == {"total": 450, "deleted": 450, "done": True, "error": None}
+    assert rows_left(db, ids) == 0
+    assert rows_left(db, kept) == 3 * (1 + 2 + 2)
+    assert rows_left(db, started) == 1
@@ -0,0 +1,163 @@
+"""
+Sorgu planı kontrolü: sıcak yollardaki (panel, yoklama, geçmiş, detay, raporlar, toplu export, silme,
+süre dolumu) gerçek SQL ifadeleri uygulama üzerinden yakalanır ve her biri EXPLAIN edilir. Bir
+tabloda tam tarama (SQLite: "SCAN <tablo>", Postgres: "Seq Scan") olan adım başarısız olur.
+
+Postgres'te küçük tablolarda seq scan zaten daha ucuz olduğundan enable_seqscan=off ile
+"kullanılabilir bir indeks yolu var mı" sorulur (TEST_DATABASE_URL ile BOŞ bir test DB'si).
+"""
+import json
+import re
+
+import pytest
+
+from tests.helpers import make_students, make_user
+
+# Kasıtlı tam taramalar: (adım etiketi, tablo). Eklenen her satır gerekçelendirilmeli.
+ALLOWED_SCANS: set[tuple[str, str]] = {
+    # açılışta tüm aktif oturumların bitişleri okunur: kısmi indeks (yalnız is_active satırlar) baştan sona
+    # gezilir, kapalı geçmiş okunmaz
+    ("session_expiry_resync", "class_sessions"),
+}
+
+STEPS = [
+    "teacher_start", "student_attend", "student_checkin", "student_checkin_duplicate", "dashboard",
+    "attendance_delta", "attendance_delta_cursor", "history", "history_cursor", "session_detail",
+    "export_csv", "export_xlsx", "export_bulk", "session_expiry_resync", "session_expiry_close",
+    "teacher_stop", "delete_single", "delete_all",
+]
+
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)")
+SQLITE_FULL_INDEX_SCAN = re.compile(r"^SCAN (\w+) USING (?:COVERING )?INDEX")
+
+
+def sqlite_plan(conn, statement, params):
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).fetchall()
+    details = [r[-1] for r in rows]
+    scans = []
+    for d in details:
+        m = SQLITE_SCAN.match(d) or SQLITE_FULL_INDEX_SCAN.match(d)
+        if m and d != "SCAN CONSTANT ROW":
+            scans.append(m.group(1))
+    return details, scans
+
+
+def postgres_plan(conn, statement, params):
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    details, scans = [], []
+
+    def walk(node):
+        details.append(f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip())
+        if node["Node Type"] == "Seq Scan":
+            scans.append(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return details, scans
+
+
+def exercise(app_main, db, client_for, captured):
+    """
+    Uygulamanın sıcak yollarını çalıştırır; her adımın SQL'i etiketle yakalanır.
+    """
+    from app.models import ClassSession
+    from app.roster import get_or_create_course, enroll
+    from app.session_expiry import active_deadlines, close_expired
+
+    teacher_id = make_user(db, "plan-teacher", role="teacher")
+    students = make_students(db, "plan-", 5)
+    course = get_or_create_course(db, teacher_id, "Plan")
+    enroll(db, course, students)
+    db.commit()
+
+    t = client_for(teacher_id, "teacher")
+    s = client_for(students[0], "student", device_id="plan-device-0001")
+
+    def step(label, fn):
+        captured["label"] = label
+        resp = fn()
+        assert resp.status_code < 500, (label, resp.status_code)
+
+    step("teacher_start", lambda: t.post("/teacher/start", data={"course_name": "Plan", "duration_minutes": 30},
+                                         follow_redirects=False))
+    captured["label"] = None
+    session = (db.query(ClassSession).filter(ClassSession.teacher_id == teacher_id)
+               .order_by(ClassSession.id.desc()).first())
+    code, sid = session.session_code, session.id
+
+    # kayıt önbelleği boşken DB yolu da görülsün
+    app_main.active_sessions.by_code.clear()
+    step("student_attend", lambda: s.get(f"/s/{code}"))
+    app_main.active_sessions.by_code.clear()
+    step("student_checkin", lambda: s.post(f"/s/{code}/checkin"))
+    step("student_checkin_duplicate", lambda: s.post(f"/s/{code}/checkin"))
+    step("dashboard", lambda: t.get("/teacher"))
+    step("attendance_delta", lambda: t.get(f"/teacher/session/{sid}/attendances"))
+    step("attendance_delta_cursor",
+         lambda: t.get(f"/teacher/session/{sid}/attendances?after=20000101000000000000-0000000000"))
+    step("history", lambda: t.get("/teacher/history"))
+    step("history_cursor", lambda: t.get("/teacher/history?before=20990101000000000000-999999"))
+    step("session_detail", lambda: t.get(f"/teacher/session/{sid}"))
+    step("export_csv", lambda: t.get(f"/teacher/session/{sid}/export.csv"))
+    step("export_xlsx", lambda: t.get(f"/teacher/session/{sid}/export.xlsx"))
+    step("export_bulk", lambda: t.get("/teacher/export/bulk?course=Plan&format=csv"))
+    # süre dolumu zamanlayıcısı (lifespan çalışmıyor; fonksiyonlar doğrudan)
+    captured["label"] = "session_expiry_resync"
+    active_deadlines(db)
+    captured["label"] = "session_expiry_close"
+    close_expired(db, [sid], app_main.utcnow())
+    step("teacher_stop", lambda: t.post("/teacher/stop", follow_redirects=False))
+    step("delete_single", lambda: t.post(f"/teacher/session/{sid}/delete", follow_redirects=False))
+    step("delete_all", lambda: t.post("/teacher/history/delete-all", follow_redirects=False))
+    captured["label"] = None
+
+
+@pytest.fixture(scope="module")
+def plans(app_main, client_for):
+    """
+    adım etiketi -> [(sql, plan, tam taranan tablolar)]
+    """
+    from sqlalchemy import event
+
+    from app.database import SessionLocal, engine
+
+    captured = {"label": None, "statements": []}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if captured["label"] and not executemany and re.match(r"\s*(SELECT|UPDATE|DELETE|WITH)", statement, re.I):
+            captured["statements"].append((captured["label"], statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with SessionLocal() as db:
+            exercise(app_main, db, client_for, captured)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    explain = postgres_plan if engine.dialect.name == "postgresql" else sqlite_plan
+    result = {}
+    seen = set()
+    with engine.connect() as conn:
+        for label, statement, params in captured["statements"]:
+            if (label, statement) in seen:
+                continue
+            seen.add((label, statement))
+            details, scans = explain(conn, statement, params)
+            result.setdefault(label, []).append((" ".join(statement.split()), details, scans))
+        conn.rollback()
+    return result
+
+
+@pytest.mark.parametrize("label", STEPS)
+def test_no_full_table_scans(plans, label):
+    assert plans.get(label), f"{label}: SQL yakalanmadı"
+    bad = [
+        {"sql": sql[:2000], "plan": details, "tables": [t for t in scans if (label, t) not in ALLOWED_SCANS]}
+        for sql, details, scans in plans[label]
+        if any((label, t) not in ALLOWED_SCANS for t in scans)
+    ]
+    assert not bad, json.dumps(bad, ensure_ascii=False, indent=2)
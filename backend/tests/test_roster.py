@@ -0,0 +1,53 @@
+"""
+Rapor listesi ders başına: kaydı olan dersin oturumunda listede olmayan öğrenci "YOK" yazılmaz,
+kaydı olmayan ders yalnız kendi oturumları için tüm öğrencilere düşer.
+"""
+import csv
+import io
+
+from tests.helpers import make_session, make_students, make_user
+
+
+def bulk_rows(client, course: str = "") -> dict[str, list[str]]:
+    resp = client.get(f"/teacher/export/bulk?format=csv&course={course}")
+    assert resp.status_code == 200
+    rows = list(csv.reader(io.StringIO(resp.text.lstrip("﻿")), delimiter=";"))
+    return {r[0]: r[2:-1] for r in rows[1:]}
+
+
+def test_bulk_export_falls_back_per_course(db, app_main, client_for):
+    from app.roster import enroll, get_or_create_course
+
+    teacher_id = make_user(db, "roster-teacher", role="teacher")
+    enrolled = make_students(db, "rosterA-", 2)
+    make_students(db, "rosterX-", 1)  # hiçbir derse kayıtlı değil
+    course_a = get_or_create_course(db, teacher_id, "Kayıtlı")
+    course_b = get_or_create_course(db, teacher_id, "Kayıtsız")
+    enroll(db, course_a, enrolled)
+    db.commit()
+    make_session(db, teacher_id, "rostera01", course_name="Kayıtlı", course_id=course_a.id)
+    make_session(db, teacher_id, "rosterb01", course_name="Kayıtsız", course_id=course_b.id)
+
+    rows = bulk_rows(client_for(teacher_id, "teacher"))
+    # Kayıtsız dersin oturumu: tüm öğrenciler listede, herkes YOK
+    assert rows["rosterX-000000"] == ["", "YOK"]
+    assert rows["rosterA-000000"] == ["YOK", "YOK"]
+    # yalnız kayıtlı ders seçilince liste kayıtlılar
+    rows = bulk_rows(client_for(teacher_id, "teacher"), "Kayıtlı")
+    assert set(rows) == {"rosterA-000000", "rosterA-000001"}
+
+
+def test_unlinked_session_uses_course_with_same_name(db, app_main):
+    from app.models import ClassSession
+    from app.roster import enroll, get_or_create_course
+
+    teacher_id = make_user(db, "roster-teacher-old", role="teacher")
+    students = make_students(db, "rosterOld-", 3)
+    course = get_or_create_course(db, teacher_id, "Eski Ders")
+    enroll(db, course, students)
+    db.commit()
+    # enrollment öncesi açılmış oturum: course_id boş
+    session_id = make_session(db, teacher_id, "rosterold1", course_name="Eski Ders")
+
+    total, present, late = app_main.attendance_counts(db, db.get(ClassSession, session_id))
+    assert (total, present, late) == (3, 0, 0)
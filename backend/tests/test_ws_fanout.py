@@ -0,0 +1,180 @@
+"""
+Çok worker'lı WebSocket yayını: uvicorn --workers 4 (unix backend) gerçek süreçlerle başlatılır,
+hoca soketleri worker'lara dağılır; her yoklama her sokete ulaşmalı. Gecikme ölçümü için
+bench/ws_fanout_bench.py. Aynı yayın yolundan giden kontrol mesajıyla durdurulan oturum da
+her worker'ın kaydından hemen düşmeli.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+from tests.helpers import cookie_for
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 4
+SOCKETS = 8
+STUDENTS = 120
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def server(app_main):
+    import httpx
+    from sqlalchemy import create_engine, insert, select
+
+    from app import auth
+    from app.models import User
+
+    tmp = tempfile.mkdtemp(prefix="yoklama-ws-test-")
+    url = f"sqlite:///{tmp}/ws.db"
+    env = dict(os.environ, DATABASE_URL=url, WS_BROADCAST_BACKEND="unix", WS_HUB_DIR=os.path.join(tmp, "hub"),
+               SECRET_KEY=auth.SECRET_KEY, CHECKIN_WRITE_BEHIND="1")
+    subprocess.run([sys.executable, "-m", "app.cli", "init-db"], env=env, cwd=BACKEND_DIR, check=True,
+                   capture_output=True)
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"username": f"ws{i:05d}", "full_name": f"Öğrenci {i}", "password_hash": "-", "role": "student"}
+            for i in range(STUDENTS)
+        ])
+        students = list(conn.scalars(select(User.id).where(User.username.like("ws%")).order_by(User.id)))
+        teacher_id = conn.scalar(select(User.id).where(User.role == "teacher"))
+    engine.dispose()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(WORKERS),
+         "--log-level", "warning"],
+        env=env, cwd=BACKEND_DIR,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(f"{base}/login", timeout=1.0)
+                break
+            except httpx.HTTPError:
+                assert time.monotonic() < deadline, "sunucu ayağa kalkmadı"
+                time.sleep(0.2)
+        time.sleep(1.0)  # worker'ların hepsi hub'a kaydolsun
+        yield {"base": base, "teacher_id": teacher_id, "students": students}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+async def fanout(server, code: str, students: list[int], concurrent: bool) -> tuple[int, int]:
+    """
+    SOCKETS hoca soketi açar, öğrencileri tek tek ya da aynı anda yoklamaya sokar;
+    (beklenen, teslim edilen) olay sayısı döner.
+    """
+    import httpx
+    from websockets.asyncio.client import connect
+
+    from app.auth import COOKIE_NAME
+    from app.main import DEVICE_COOKIE
+
+    base = server["base"]
+    teacher = httpx.AsyncClient(base_url=base, cookies={COOKIE_NAME: cookie_for(server["teacher_id"], "teacher")})
+    await teacher.post("/teacher/start", data={"course_name": code, "duration_minutes": 60})
+    html = (await teacher.get("/teacher")).text
+    session_id = int(html.split('__SESSION_ID__ = Number("', 1)[1].split('"', 1)[0])
+    session_code = html.split("/qr/", 1)[1].split(".png", 1)[0]
+
+    headers = {"Cookie": f"{COOKIE_NAME}={cookie_for(server['teacher_id'], 'teacher')}"}
+    ws_url = base.replace("http", "ws") + f"/ws/session/{session_id}"
+    conns = [await connect(ws_url, additional_headers=headers) for _ in range(SOCKETS)]
+    received = [set() for _ in conns]
+
+    async def reader(i, ws):
+        async for raw in ws:
+            data = json.loads(raw)
+            for msg in (data if isinstance(data, list) else [data]):
+                if "username" in msg:
+                    received[i].add(msg["username"])
+
+    readers = [asyncio.create_task(reader(i, ws)) for i, ws in enumerate(conns)]
+
+    async def checkin(client, student_id):
+        r = await client.post(f"/s/{session_code}/checkin",
+                              cookies={COOKIE_NAME: cookie_for(student_id, "student"),
+                                       DEVICE_COOKIE: f"ws-dev-{code}-{student_id}"})
+        assert r.status_code == 200, r.text
+
+    limits = httpx.Limits(max_connections=len(students))
+    async with httpx.AsyncClient(base_url=base, limits=limits) as client:
+        if concurrent:
+            await asyncio.gather(*(checkin(client, sid) for sid in students))
+        else:
+            for sid in students:
+                await checkin(client, sid)
+
+    deadline = time.monotonic() + 10
+    while sum(len(r) for r in received) < SOCKETS * len(students) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    for t in readers:
+        t.cancel()
+    for ws in conns:
+        await ws.close()
+    await teacher.post("/teacher/stop")
+    await teacher.aclose()
+    return SOCKETS * len(students), sum(len(r) for r in received)
+
+
+def test_sequential_checkins_reach_every_socket(server):
+    expected, delivered = asyncio.run(fanout(server, "seq", server["students"][:20], concurrent=False))
+    assert delivered == expected
+
+
+def test_concurrent_burst_reaches_every_socket(server):
+    expected, delivered = asyncio.run(fanout(server, "burst", server["students"], concurrent=True))
+    assert delivered == expected
+
+
+def test_stopped_session_is_dropped_on_every_worker(server):
+    import httpx
+
+    from app.auth import COOKIE_NAME
+    from app.main import DEVICE_COOKIE
+
+    base, students = server["base"], server["students"]
+    # her istek yeni bağlantı: istekler worker'lara dağılır, hepsinin kaydı dolar
+    limits = httpx.Limits(max_keepalive_connections=0)
+
+    async def go():
+        teacher = httpx.AsyncClient(base_url=base, cookies={COOKIE_NAME: cookie_for(server["teacher_id"], "teacher")})
+        await teacher.post("/teacher/start", data={"course_name": "stop", "duration_minutes": 60})
+        html = (await teacher.get("/teacher")).text
+        session_code = html.split("/qr/", 1)[1].split(".png", 1)[0]
+
+        async def checkin(client, student_id):
+            r = await client.post(f"/s/{session_code}/checkin",
+                                  cookies={COOKIE_NAME: cookie_for(student_id, "student"),
+                                           DEVICE_COOKIE: f"ws-dev-stop-{student_id}"})
+            return r.status_code
+
+        async with httpx.AsyncClient(base_url=base, limits=limits) as client:
+            before = [await checkin(client, sid) for sid in students[:40]]
+            await teacher.post("/teacher/stop")
+            await teacher.aclose()
+            await asyncio.sleep(0.3)  # kontrol mesajı worker'lara ulaşsın (DB kontrolü 30 sn sonra)
+            after = [await checkin(client, sid) for sid in students[40:80]]
+        return before, after
+
+    before, after = asyncio.run(go())
+    assert set(before) == {200}
+    assert set(after) == {400}